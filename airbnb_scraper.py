@@ -1,26 +1,312 @@
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, FeatureNotFound, NavigableString
 import json
+import hashlib
+import os
 import time
 from datetime import datetime, timedelta
 import re
-from urllib.parse import quote
+import unicodedata
+import tempfile
+from urllib.parse import quote, urlparse
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-import schedule
+from http_cache import CachedSession, get_response_cache
+from http_pool import get_http_adapter, get_http_pool_stats
+from weather_store import get_weather_store
+from monitoring_scheduler import get_monitoring_scheduler, next_weekend
+from mail_queue import get_mail_queue
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick é opcional: sem ele a busca volta para substrings
+    ahocorasick = None
 import threading
 import base64
 from io import BytesIO
 
+class PatternGroup:
+    """
+    Grupo de padrões regex pré-compilados, em ordem de prioridade, cada um com
+    uma tag. scan() devolve os candidatos de todos os padrões já marcados com a
+    tag de quem os encontrou e conta, por padrão, quantos candidatos gerou e
+    quantos foram aceitos (para podar padrões que nunca casam).
+    
+    Os padrões não são unidos em uma única alternância: no módulo re isso
+    desliga a busca rápida pelo prefixo literal de cada padrão ("R$", "Total")
+    e a varredura combinada ficou 2-3x mais lenta que as buscas separadas.
+    """
+
+    def __init__(self, name, patterns, flags=re.IGNORECASE):
+        self.name = name
+        self.tags = [tag for tag, _ in patterns]
+        self.compiled = {tag: re.compile(pattern, flags) for tag, pattern in patterns}
+        self._hits = dict.fromkeys(self.tags, 0)
+        self._matches = dict.fromkeys(self.tags, 0)
+        self._scans = 0
+        self._lock = threading.Lock()
+
+    def scan(self, text, first_only=False):
+        """
+        Gera (tag, grupos) na ordem de prioridade dos padrões e, dentro de cada
+        padrão, na ordem do texto (como re.findall). Com first_only, só a primeira
+        ocorrência de cada padrão (como re.search). Como é um gerador, parar no
+        primeiro candidato válido evita varrer os padrões seguintes.
+        """
+        text = text or ''
+        with self._lock:
+            self._scans += 1
+
+        for tag in self.tags:
+            pattern = self.compiled[tag]
+            if first_only:
+                match = pattern.search(text)
+                matches = [match] if match else []
+            else:
+                matches = pattern.finditer(text)
+            for match in matches:
+                with self._lock:
+                    self._matches[tag] += 1
+                yield tag, match.groups()
+
+    def hit(self, tag):
+        """Registra que o candidato do padrão foi aceito"""
+        with self._lock:
+            self._hits[tag] += 1
+
+    def stats(self):
+        """Varreduras do grupo e, por padrão, candidatos gerados e aceitos"""
+        with self._lock:
+            return {'scans': self._scans, 'matches': dict(self._matches), 'hits': dict(self._hits)}
+
+# Registro de padrões usados pelo scraper, compilados uma única vez
+PATTERN_BANK = {
+    'search_price': PatternGroup('search_price', [
+        ('brl', r'R\$\s*(\d{1,4}(?:[.,]\d{3})*(?:[.,]\d{2})?)'),  # R$ 1.234,56 ou R$ 1234
+        ('per_night', r'(\d{2,4})\s*(?:por\s*noite|/\s*noite)'),  # 150 por noite
+        ('total', r'Total\s*R\$\s*(\d+)'),  # Total R$ 300
+        ('reais', r'(\d{2,4})\s*reais?'),  # 200 reais
+        ('dollar', r'\$\s*(\d{2,4})'),  # $ 150
+        ('isolated', r'(?:^|\s)(\d{2,4})(?=\s*$|\s*por|\s*/)'),  # números isolados
+    ], re.IGNORECASE | re.MULTILINE),
+    'search_rating': PatternGroup('search_rating', [
+        ('reviews_pt', r'(\d+[.,]\d+)\s*\(\s*(\d+)\s*avalia[çc][õo]es?\)'),  # 4.5 (123 avaliações)
+        ('star_after', r'(\d+[.,]\d+)\s*★\s*\(\s*(\d+)\s*\)'),  # 4.5 ★ (123)
+        ('star_before', r'★\s*(\d+[.,]\d+)\s*\(\s*(\d+)\s*\)'),  # ★ 4.5 (123)
+        ('estrelas', r'(\d+[.,]\d+)\s*estrelas?\s*\(\s*(\d+)\s*\)'),  # 4.5 estrelas (123)
+    ]),
+    'listing_total_price': PatternGroup('listing_total_price', [
+        ('por_2_noites', r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*por\s*2\s*noites'),
+        ('total_suffix', r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*total'),
+        ('total_prefix', r'Total\s*R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)'),
+        ('json_total_price', r'"totalPrice"[^}]*"amount"[^}]*([0-9]+)'),
+        ('json_total', r'"total"[^}]*([0-9]{3,6})'),
+        ('para_noites', r'([0-9]{1,3}(?:\.[0-9]{3})+)\s*para\s*[0-9]+\s*noites?'),
+    ]),
+    'listing_night_price': PatternGroup('listing_night_price', [
+        ('por_noite', r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*por\s*noite'),
+        ('barra_noite', r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*/\s*noite'),
+        ('json_base_price', r'"basePrice"[^}]*"amount"[^}]*([0-9]+)'),
+        ('json_price', r'"price"[^}]*"amount"[^}]*([0-9]+)'),
+        ('numero_por_noite', r'([0-9]{2,4})\s*por\s*noite'),
+    ]),
+    'listing_guests': PatternGroup('listing_guests', [
+        ('hospedes', r'(\d+)\s+hóspedes?'),
+        ('ate_pessoas', r'até\s+(\d+)\s+pessoas?'),
+        ('acomoda', r'acomoda\s+(\d+)\s+pessoas?'),
+        ('pessoas', r'(\d+)\s+pessoas?'),
+        ('guests', r'(\d+)\s+guests?'),
+    ]),
+    'listing_bedrooms': PatternGroup('listing_bedrooms', [
+        ('quartos', r'(\d+)\s+quartos?'),
+        ('bedrooms', r'(\d+)\s+bedrooms?'),
+        ('suites', r'(\d+)\s+suítes?'),
+        ('dormitorios', r'(\d+)\s+dormitórios?'),
+    ]),
+    'listing_bathrooms': PatternGroup('listing_bathrooms', [
+        ('banheiros', r'(\d+)\s+banheiros?'),
+        ('bathrooms', r'(\d+)\s+bathrooms?'),
+        ('lavabos', r'(\d+)\s+lavabos?'),
+    ]),
+    'listing_property_type': PatternGroup('listing_property_type', [
+        ('tipo_pt', r'(Casa|Apartamento|Chalé|Pousada|Hotel|Quarto|Studio|Loft|Cobertura|Flat)\s+(?:inteira?|completa?|privada?)?'),
+        ('tipo_en', r'(?:Entire|Private)\s+(house|apartment|home|condo|villa|cabin|chalet)'),
+        ('residencia', r'(Residência|Moradia|Imóvel)\s+(?:inteira?|completa?)'),
+    ]),
+    'location': PatternGroup('location', [
+        # Cidade seguida do estado
+        ('cidade_estado', r'([A-ZÁÊÇÕ][a-záêçõ]+(?:\s+[A-ZÁÊÇÕ][a-záêçõ]+)*),\s*(?:RJ|Rio de Janeiro|SP|São Paulo|MG|Minas Gerais|ES|Espírito Santo|PR|Paraná|SC|Santa Catarina|RS|Rio Grande do Sul|BA|Bahia|PE|Pernambuco|CE|Ceará)'),
+        # Cidades conhecidas do Rio de Janeiro
+        ('cidade_conhecida', r'(Itacuruçá|Mangaratiba|Angra dos Reis|Paraty|Búzios|Cabo Frio|Arraial do Cabo|Saquarema|Maricá|Niterói|Rio de Janeiro)'),
+        # Padrão geral para cidades brasileiras
+        ('cidade_uf', r'([A-ZÁÊÇÕ][a-záêçõ]+(?:\s+[a-záêçõ]+)*(?:\s+[A-ZÁÊÇÕ][a-záêçõ]+)*),\s*[A-Z]{2}'),
+    ]),
+}
+
+# Padrões simples usados dentro de laços
+WORD_PATTERN = re.compile(r'\w+')
+RATING_PATTERN = re.compile(r'(\d+[.,]\d+)')
+ROOMS_URL_PATTERN = re.compile(r'/rooms/[0-9]+')
+NIGHTS_IN_CITY_PATTERN = re.compile(r'\d+\s+noites?\s+em\s+([A-ZÁÊÇÕ][a-záêçõ]+(?:\s+[a-záêçõ]+)*(?:\s+[A-ZÁÊÇÕ][a-záêçõ]+)*)', re.IGNORECASE)
+BRL_PRICE_TEXT_PATTERN = re.compile(r'R\$\s*[0-9]')
+BRL_PRICE_PATTERN = re.compile(r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)')
+PAGE_RATING_TEXT_PATTERN = re.compile(r'[0-9]\.[0-9]')
+PAGE_RATING_PATTERN = re.compile(r'([0-9]\.[0-9])')
+DETAIL_TEXT_PATTERN = re.compile(r'\d+\s+(quartos?|banheiros?|hóspedes?|guests?|bedrooms?|bathrooms?)')
+DETAIL_BEDROOMS_PATTERN = re.compile(r'(\d+)\s+(?:quartos?|bedrooms?|dormitórios?)', re.IGNORECASE)
+DETAIL_BATHROOMS_PATTERN = re.compile(r'(\d+)\s+(?:banheiros?|bathrooms?)', re.IGNORECASE)
+DETAIL_GUESTS_PATTERN = re.compile(r'(\d+)\s+(?:hóspedes?|guests?|pessoas?)', re.IGNORECASE)
+
+def get_pattern_stats():
+    """
+    Estatísticas de uso dos padrões do scraper (para identificar padrões que nunca casam)
+    """
+    return {name: group.stats() for name, group in PATTERN_BANK.items()}
+
+class HostRateLimiter:
+    """
+    Limitador de requisições por host: garante um intervalo mínimo entre
+    requisições ao mesmo domínio, mesmo quando disparadas por várias threads
+    """
+
+    def __init__(self, min_interval=2.0):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Bloqueia até o próximo horário livre para o host da URL"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+class ListingDedupeIndex:
+    """
+    Índice de duplicatas dos anúncios coletados em uma execução.
+    A chave principal é o ID do quarto no Airbnb (/rooms/<id>) extraído de
+    listing_url; sem URL, usa o título normalizado + preço. Guarda contagem
+    de acertos (duplicatas) e falhas (anúncios novos) por busca.
+    """
+
+    ROOM_ID_PATTERN = re.compile(r'/rooms/(?:plus/|luxury/)?(\d+)')
+
+    def __init__(self):
+        self._room_ids = set()
+        # chave título+preço -> ID do quarto (None quando o anúncio não tinha URL)
+        self._title_keys = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def room_id(cls, listing_url):
+        """Extrai o ID canônico do quarto a partir da URL do anúncio"""
+        if not listing_url:
+            return None
+        match = cls.ROOM_ID_PATTERN.search(listing_url)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def title_key(title, price):
+        """Título sem acentos/pontuação e em minúsculas, junto com o preço"""
+        normalized = unicodedata.normalize('NFKD', title or '')
+        normalized = ''.join(c for c in normalized if not unicodedata.combining(c)).lower()
+        normalized = re.sub(r'[^a-z0-9]+', ' ', normalized).strip()
+        try:
+            price = round(float(price or 0), 2)
+        except (TypeError, ValueError):
+            price = 0.0
+        return hash((normalized, price))
+
+    def add(self, listing, search_name='default'):
+        """
+        Registra o anúncio e retorna True se for novo, False se for duplicata
+        """
+        room_id = self.room_id(listing.get('listing_url'))
+        title_key = self.title_key(listing.get('title'), listing.get('price_per_night'))
+
+        with self._lock:
+            if room_id:
+                # Mesmo quarto, ou anúncio sem URL já visto com o mesmo título e preço
+                duplicate = room_id in self._room_ids or (
+                    title_key in self._title_keys and self._title_keys[title_key] is None
+                )
+            else:
+                duplicate = title_key in self._title_keys
+
+            stats = self._stats.setdefault(search_name, {'hits': 0, 'misses': 0})
+            if duplicate:
+                stats['hits'] += 1
+                return False
+
+            stats['misses'] += 1
+            if room_id:
+                self._room_ids.add(room_id)
+            self._title_keys.setdefault(title_key, room_id)
+            return True
+
+    def stats(self):
+        """Contagem de duplicatas (hits) e anúncios novos (misses) por busca"""
+        with self._lock:
+            return {name: dict(values) for name, values in self._stats.items()}
+
+class KeywordMatcher:
+    """
+    Localiza, em uma única passada por texto, todas as palavras-chave do
+    scraper (praia, amenidades, tipos de ambiente, características visuais)
+    usando um autômato Aho-Corasick montado uma vez. A comparação ignora
+    maiúsculas/minúsculas e devolve, por grupo, as palavras encontradas na
+    mesma ordem da lista original (a evidência usada nos scores de confiança).
+    """
+
+    def __init__(self, keyword_groups):
+        self.groups = {name: list(keywords) for name, keywords in keyword_groups.items()}
+        self._keywords = {keyword.lower() for keywords in self.groups.values() for keyword in keywords}
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self._keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+
+    def _scan(self, text):
+        """Palavras-chave (em minúsculas) presentes no texto"""
+        text = (text or '').lower()
+        if not text:
+            return set()
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(text)}
+        return {keyword for keyword in self._keywords if keyword in text}
+
+    def find(self, *texts):
+        """
+        Procura as palavras-chave em cada texto (separadamente) e devolve
+        {grupo: [palavras encontradas, na ordem da lista do grupo]}
+        """
+        found = set()
+        for text in texts:
+            found |= self._scan(text)
+        return {
+            name: [keyword for keyword in keywords if keyword.lower() in found]
+            for name, keywords in self.groups.items()
+        }
+
 class AirbnbClimateScraper:
     def __init__(self, email_config=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        self.session = requests.Session()
+        # Sessão com cache de respostas em disco (páginas repetidas não voltam à rede)
+        # e pool de conexões compartilhado pelo processo
+        self.session = CachedSession(get_response_cache(), adapter=get_http_adapter())
         self.session.headers.update(self.headers)
         self.email_config = email_config or {
             'smtp_server': 'smtp.gmail.com',
@@ -34,6 +320,35 @@ class AirbnbClimateScraper:
             'pé na areia', 'primeira linha', 'orla', 'waterfront', 'beachfront',
             'ocean view', 'sea view', 'beach view', 'praia em frente'
         ]
+        # Todas as listas de palavras-chave em um único autômato
+        self.keyword_matcher = KeywordMatcher({
+            'beach': self.beach_keywords,
+            'image_beach': ['beach', 'ocean', 'sea', 'praia', 'mar', 'water', 'coast'],
+            'amenity': ['piscina', 'pool', 'wifi', 'ar condicionado', 'churrasqueira', 'garagem', 'vista', 'varanda'],
+            'room_type': ['bedroom', 'kitchen', 'bathroom', 'living', 'pool', 'beach', 'garden', 'balcony'],
+            'visual': ['modern', 'rustic', 'luxury', 'cozy', 'spacious', 'bright', 'dark', 'colorful']
+        })
+        # Buscas concorrentes da análise competitiva
+        self.search_workers = int(os.getenv('SCRAPER_SEARCH_WORKERS', '3'))
+        self.search_deadline = float(os.getenv('SCRAPER_SEARCH_DEADLINE', '45'))
+        # Períodos analisados ao mesmo tempo na análise de vários períodos
+        self.period_workers = int(os.getenv('SCRAPER_PERIOD_WORKERS', '2'))
+        self.rate_limiter = HostRateLimiter(float(os.getenv('SCRAPER_HOST_INTERVAL', '2')))
+        self._thread_local = threading.local()
+        # Parser do BeautifulSoup (lxml é bem mais rápido que html.parser)
+        self.html_parser = os.getenv('SCRAPER_HTML_PARSER', 'lxml')
+    
+    def _get_thread_session(self):
+        """
+        Retorna uma sessão HTTP exclusiva da thread atual (requests.Session não é thread-safe)
+        O cache de respostas e o pool de conexões são os mesmos para todas as threads
+        """
+        session = getattr(self._thread_local, 'session', None)
+        if session is None:
+            session = CachedSession(get_response_cache(), adapter=get_http_adapter())
+            session.headers.update(self.headers)
+            self._thread_local.session = session
+        return session
     
     def get_airbnb_prices(self, checkin_date, checkout_date, adults=2):
         """
@@ -58,7 +373,7 @@ class AirbnbClimateScraper:
             response.raise_for_status()
             
             # Procurar por dados de preços na página
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = self._parse_html(response.content)
             
             # Buscar por elementos que contenham preços
             price_elements = soup.find_all(['span', 'div'], text=re.compile(r'R\$\s*\d+'))
@@ -103,9 +418,11 @@ class AirbnbClimateScraper:
             print(f"Erro ao buscar preços do Airbnb: {e}")
             return []
     
-    def analyze_listing_images_and_description(self, listing_element):
+    def analyze_listing_images_and_description(self, listing_element, texts=None, img_elements=None):
         """
         Analisa imagens e descrição de um anúncio para verificar se é frente à praia
+        texts e img_elements podem vir já extraídos (_extract_container_fields) para
+        evitar percorrer o container de novo
         """
         beach_indicators = {
             'is_beachfront': False,
@@ -115,32 +432,26 @@ class AirbnbClimateScraper:
         
         try:
             # Analisar descrição do anúncio
-            description_elements = listing_element.find_all(text=True)
+            description_elements = texts if texts is not None else listing_element.find_all(text=True)
             full_text = ' '.join(description_elements).lower()
             
             # Verificar palavras-chave relacionadas à praia
-            beach_score = 0
-            found_keywords = []
-            
-            for keyword in self.beach_keywords:
-                if keyword.lower() in full_text:
-                    beach_score += 1
-                    found_keywords.append(keyword)
+            found_keywords = self.keyword_matcher.find(full_text)['beach']
+            beach_score = len(found_keywords)
             
             # Analisar URLs de imagens para indicadores visuais
-            img_elements = listing_element.find_all('img')
+            if img_elements is None:
+                img_elements = listing_element.find_all('img')
             image_indicators = []
             
             for img in img_elements:
                 src = img.get('src', '')
-                alt = img.get('alt', '').lower()
+                alt = img.get('alt', '')
                 
                 # Verificar se alt text ou URL contém indicadores de praia
-                beach_terms = ['beach', 'ocean', 'sea', 'praia', 'mar', 'water', 'coast']
-                for term in beach_terms:
-                    if term in alt or term in src.lower():
-                        image_indicators.append(f"Imagem com indicador: {term}")
-                        beach_score += 0.5
+                for term in self.keyword_matcher.find(alt, src)['image_beach']:
+                    image_indicators.append(f"Imagem com indicador: {term}")
+                    beach_score += 0.5
             
             # Calcular score de confiança
             confidence_score = min(beach_score * 10, 100)  # Máximo 100%
@@ -234,17 +545,10 @@ class AirbnbClimateScraper:
                 # Extrair palavras-chave da URL da imagem
                 img_url = listing_data['image_url'].lower()
                 
-                # Identificar tipos de ambiente nas URLs
-                room_types = ['bedroom', 'kitchen', 'bathroom', 'living', 'pool', 'beach', 'garden', 'balcony']
-                for room_type in room_types:
-                    if room_type in img_url:
-                        features['image_types'].append(room_type)
-                
-                # Identificar características visuais nas URLs
-                visual_keywords = ['modern', 'rustic', 'luxury', 'cozy', 'spacious', 'bright', 'dark', 'colorful']
-                for keyword in visual_keywords:
-                    if keyword in img_url:
-                        features['image_keywords'].append(keyword)
+                # Identificar tipos de ambiente e características visuais nas URLs
+                found = self.keyword_matcher.find(img_url)
+                features['image_types'].extend(found['room_type'])
+                features['image_keywords'].extend(found['visual'])
                         
         except Exception as e:
             print(f"Erro ao extrair características de imagem: {e}")
@@ -329,16 +633,8 @@ class AirbnbClimateScraper:
                 comp_features.update([ev.lower() for ev in comp_listing['beach_evidence']])
                 
             # Analisar títulos para amenidades
-            amenity_keywords = ['piscina', 'pool', 'wifi', 'ar condicionado', 'churrasqueira', 'garagem', 'vista', 'varanda']
-            
-            ref_title = ref_listing.get('title', '').lower()
-            comp_title = comp_listing.get('title', '').lower()
-            
-            for amenity in amenity_keywords:
-                if amenity in ref_title:
-                    ref_features.add(amenity)
-                if amenity in comp_title:
-                    comp_features.add(amenity)
+            ref_features.update(self.keyword_matcher.find(ref_listing.get('title', ''))['amenity'])
+            comp_features.update(self.keyword_matcher.find(comp_listing.get('title', ''))['amenity'])
             
             # Calcular similaridade
             if ref_features and comp_features:
@@ -369,10 +665,16 @@ class AirbnbClimateScraper:
             
         return min(score, 100)
     
-    def get_competitive_analysis(self, checkin_date, checkout_date, adults=2, reference_listing=None):
+    def get_competitive_analysis(self, checkin_date, checkout_date, adults=2, reference_listing=None, deadline=None, progress=None):
         """
         Análise competitiva detalhada dos anúncios em Itacuruçá com análise de similaridade
         Agora usa múltiplas estratégias de busca para encontrar mais concorrentes
+        
+        As buscas rodam em paralelo (pool limitado a search_workers) e os resultados
+        são combinados à medida que chegam. Ao estourar o prazo total (deadline, em
+        segundos) a análise segue com os resultados parciais já recebidos.
+        progress(stage, message, **data), se informado, recebe um evento
+        'search_completed' a cada busca concluída.
         """
         base_url = "https://www.airbnb.com.br/s/Itacuru%C3%A7%C3%A1--Mangaratiba/homes"
         
@@ -468,43 +770,59 @@ class AirbnbClimateScraper:
         
         competitive_data = []
         similar_listings = []
+        deadline = self.search_deadline if deadline is None else deadline
+        searches_completed = 0
+        timed_out = False
+        # Índice de duplicatas compartilhado por todas as buscas desta execução
+        dedupe_index = ListingDedupeIndex()
         
         try:
             # Executar múltiplas buscas para capturar mais concorrentes
             all_listings = []  # Lista para coletar todos os anúncios
             
-            for config in search_configs:
-                # Usar URL customizada se especificada, senão usar base_url
-                search_url = config.get('url', base_url)
-                print(f"🔍 Executando {config['name']}: {search_url}")
-                print(f"📅 Parâmetros: checkin={checkin_date}, checkout={checkout_date}, adults={adults}")
-                
-                response = self.session.get(search_url, params=config['params'], timeout=30)
-                response.raise_for_status()
-                
-                print(f"✅ Resposta recebida - Status: {response.status_code}")
-                print(f"📄 Tamanho da resposta: {len(response.content)} bytes")
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Processar esta busca
-                search_listings = self._process_search_results(soup, config['name'])
-                
-                # Adicionar resultados evitando duplicatas globais
-                for new_listing in search_listings:
-                    duplicate = False
-                    for existing in all_listings:
-                        if (existing['title'] == new_listing['title'] and 
-                            existing['price_per_night'] == new_listing['price_per_night']):
-                            duplicate = True
-                            break
-                    if not duplicate:
-                        all_listings.append(new_listing)
-                
-                # Pequena pausa entre buscas
-                time.sleep(2)
+            print(f"📅 Parâmetros: checkin={checkin_date}, checkout={checkout_date}, adults={adults}")
+            executor = ThreadPoolExecutor(max_workers=max(1, min(self.search_workers, len(search_configs))))
+            futures = {
+                executor.submit(self._run_search, config, base_url): config['name']
+                for config in search_configs
+            }
+            
+            try:
+                # Combinar resultados à medida que cada busca termina
+                for future in as_completed(futures, timeout=deadline):
+                    search_name = futures[future]
+                    try:
+                        search_listings = future.result()
+                    except Exception as e:
+                        print(f"❌ Erro na {search_name}: {e}")
+                        if progress:
+                            progress('search_completed', f'{search_name} falhou', search=search_name,
+                                     checkin=checkin_date, error=str(e))
+                        continue
+                    
+                    searches_completed += 1
+                    
+                    # Adicionar resultados evitando duplicatas globais
+                    new_count = 0
+                    for new_listing in search_listings:
+                        if dedupe_index.add(new_listing, search_name):
+                            all_listings.append(new_listing)
+                            new_count += 1
+                    
+                    if progress:
+                        progress('search_completed', f'{search_name}: {new_count} anúncios novos', search=search_name,
+                                 checkin=checkin_date, found=len(search_listings), new=new_count,
+                                 completed=searches_completed, total=len(search_configs))
+            except FuturesTimeoutError:
+                timed_out = True
+                print(f"⏱️ Prazo de {deadline:.0f}s esgotado: {searches_completed}/{len(search_configs)} buscas concluídas, usando resultados parciais")
+            finally:
+                # Não bloquear a requisição web esperando buscas atrasadas
+                executor.shutdown(wait=False, cancel_futures=True)
             
             print(f"📊 Total de anúncios únicos coletados: {len(all_listings)}")
+            for search_name, counts in dedupe_index.stats().items():
+                print(f"   🔄 {search_name}: {counts['misses']} novos, {counts['hits']} duplicados")
             
             # Se um anúncio de referência foi fornecido, analisar similaridade
             if reference_listing and all_listings:
@@ -547,200 +865,283 @@ class AirbnbClimateScraper:
             'listings': competitive_data,
             'total_found': len(all_listings) if 'all_listings' in locals() else 0,
             'similar_count': len(similar_listings) if reference_listing else 0,
-            'similarity_enabled': reference_listing is not None
+            'similarity_enabled': reference_listing is not None,
+            'searches_completed': searches_completed,
+            'searches_total': len(search_configs),
+            'partial': timed_out,
+            'dedupe_stats': dedupe_index.stats()
         }
         
         return result
     
-    def _process_search_results(self, soup, search_name):
+    def _run_search(self, config, base_url):
         """
-        Processa os resultados de uma busca específica
+        Executa uma configuração de busca (usada pelas threads da análise competitiva)
         """
-        listings = []
+        # Usar URL customizada se especificada, senão usar base_url
+        search_url = config.get('url', base_url)
+        self.rate_limiter.wait(search_url)
+        print(f"🔍 Executando {config['name']}: {search_url}")
         
-        # Buscar por containers de anúncios com diferentes seletores
-        listing_containers = []
+        response = self._get_thread_session().get(search_url, params=config['params'], timeout=30)
+        response.raise_for_status()
         
-        # Tentar diferentes seletores para encontrar anúncios
-        selectors = [
-            {'tag': ['div', 'article'], 'class': re.compile(r'listing|card|property')},
-            {'tag': 'div', 'attrs': {'data-testid': re.compile(r'listing|card')}},
-            {'tag': 'div', 'attrs': {'itemprop': 'itemListElement'}},
-            {'tag': 'div', 'class': re.compile(r'c1yo0219')},  # Classe comum do Airbnb
-            {'tag': 'a', 'attrs': {'aria-label': re.compile(r'.*')}}
-        ]
+        print(f"✅ {config['name']} - Status: {response.status_code}, {len(response.content)} bytes")
         
-        for selector in selectors:
-            if 'attrs' in selector:
-                containers = soup.find_all(selector['tag'], attrs=selector['attrs'])
-            else:
-                containers = soup.find_all(selector['tag'], class_=selector['class'])
-            
+        soup = self._parse_html(response.content)
+        
+        # Processar esta busca
+        return self._process_search_results(soup, config['name'])
+    
+    # Seletores de containers de anúncio, em ordem de prioridade
+    CONTAINER_SELECTORS = [
+        {'tag': ['div', 'article'], 'class': re.compile(r'listing|card|property')},
+        {'tag': 'div', 'attrs': {'data-testid': re.compile(r'listing|card')}},
+        {'tag': 'div', 'attrs': {'itemprop': 'itemListElement'}},
+        {'tag': 'div', 'class': re.compile(r'c1yo0219')},  # Classe comum do Airbnb
+        {'tag': 'a', 'attrs': {'aria-label': re.compile(r'.*')}}
+    ]
+    
+    def _parse_html(self, content, parser=None):
+        """
+        Monta a árvore HTML com o parser configurado (lxml por padrão, bem mais
+        rápido que o html.parser); cai para html.parser se o lxml não estiver instalado
+        """
+        try:
+            return BeautifulSoup(content, parser or self.html_parser)
+        except FeatureNotFound:
+            return BeautifulSoup(content, 'html.parser')
+    
+    @staticmethod
+    def _selector_matches(selector, tag):
+        """Verifica se a tag atende a um dos CONTAINER_SELECTORS"""
+        tags = selector['tag'] if isinstance(selector['tag'], list) else [selector['tag']]
+        if tag.name not in tags:
+            return False
+        if 'attrs' in selector:
+            for attr, expected in selector['attrs'].items():
+                value = tag.get(attr)
+                if value is None:
+                    return False
+                if hasattr(expected, 'search'):
+                    if not expected.search(value if isinstance(value, str) else ' '.join(value)):
+                        return False
+                elif value != expected:
+                    return False
+            return True
+        classes = tag.get('class') or []
+        if not classes:
+            return False
+        pattern = selector['class']
+        return any(pattern.search(c) for c in classes) or bool(pattern.search(' '.join(classes)))
+    
+    def _find_listing_containers(self, soup):
+        """
+        Devolve os containers do seletor de maior prioridade que encontrou algo.
+        O seletor principal (o caso comum) usa find_all direto; se ele falhar, os
+        demais são testados juntos em uma única passada pela árvore
+        """
+        primary = self.CONTAINER_SELECTORS[0]
+        containers = soup.find_all(primary['tag'], class_=primary['class'])
+        if containers:
+            return primary, containers
+        
+        fallbacks = self.CONTAINER_SELECTORS[1:]
+        tag_names = set()
+        for selector in fallbacks:
+            tag_names.update(selector['tag'] if isinstance(selector['tag'], list) else [selector['tag']])
+        
+        matches = [[] for _ in fallbacks]
+        for tag in soup.find_all(list(tag_names)):
+            for index, selector in enumerate(fallbacks):
+                if self._selector_matches(selector, tag):
+                    matches[index].append(tag)
+        
+        for selector, containers in zip(fallbacks, matches):
             if containers:
-                listing_containers = containers
-                print(f"📋 {search_name} - Encontrados {len(containers)} containers com seletor: {selector}")
+                return selector, containers
+        return None, []
+    
+    def _extract_container_fields(self, container):
+        """
+        Extrai em uma única passada pelos descendentes do container o título,
+        textos, link e imagem do anúncio
+        """
+        texts = []
+        title = None
+        # Primeiro link/imagem encontrado para cada critério, na ordem de prioridade
+        links = {}
+        images = {}
+        img_elements = []
+        
+        for node in container.descendants:
+            if isinstance(node, NavigableString):
+                if type(node) is NavigableString:
+                    texts.append(str(node))
+                    if title is None and WORD_PATTERN.search(node):
+                        title = node.strip()
+                continue
+            
+            if node.name == 'a':
+                href = node.get('href')
+                if href is not None:
+                    if '/rooms/' in href:
+                        links.setdefault('rooms', node)
+                    if '/plus/' in href:
+                        links.setdefault('plus', node)
+                    if '/luxury/' in href:
+                        links.setdefault('luxury', node)
+                    links.setdefault('any', node)
+                if node.get('data-testid') == 'listing-link':
+                    links.setdefault('testid', node)
+            elif node.name == 'img':
+                img_elements.append(node)
+                if 'pictures' in (node.get('src') or ''):
+                    images.setdefault('src_pictures', node)
+                if 'pictures' in (node.get('data-src') or ''):
+                    images.setdefault('data_src_pictures', node)
+                if 'airbnb' in (node.get('src') or ''):
+                    images.setdefault('src_airbnb', node)
+                if 'pictures' in (node.get('data-original') or ''):
+                    images.setdefault('data_original_pictures', node)
+                if 'pictures' in (node.get('srcset') or ''):
+                    images.setdefault('srcset_pictures', node)
+                images.setdefault('any', node)
+        
+        # URL do anúncio
+        listing_url = ""
+        for key in ('rooms', 'testid', 'plus', 'luxury', 'any'):
+            link_elem = links.get(key)
+            if link_elem is None:
+                continue
+            href = link_elem.get('href')
+            if href and ('/rooms/' in href or '/plus/' in href or '/luxury/' in href):
+                if href.startswith('/'):
+                    listing_url = f"https://www.airbnb.com.br{href}"
+                elif href.startswith('http'):
+                    listing_url = href
                 break
         
+        if not listing_url:
+            # Buscar por URLs que contenham /rooms/ no HTML bruto
+            url_match = ROOMS_URL_PATTERN.search(str(container))
+            if url_match:
+                listing_url = f"https://www.airbnb.com.br{url_match.group(0)}"
+        
+        # Imagem do anúncio
+        image_url = ""
+        for key in ('src_pictures', 'data_src_pictures', 'src_airbnb', 'data_original_pictures', 'srcset_pictures', 'any'):
+            img_elem = images.get(key)
+            if img_elem is None:
+                continue
+            # Tentar diferentes atributos de imagem
+            src = (img_elem.get('src') or 
+                  img_elem.get('data-src') or 
+                  img_elem.get('data-original') or 
+                  img_elem.get('data-lazy-src') or
+                  img_elem.get('data-srcset'))
+            
+            # Se srcset existe, pegar a primeira URL
+            if not src and img_elem.get('srcset'):
+                src = img_elem.get('srcset').split(',')[0].split(' ')[0]
+            
+            if src:
+                src = src.strip()
+                
+                # Verificar se é uma URL válida do Airbnb
+                if (src.startswith('http') and 
+                    ('pictures' in src or 'airbnb' in src or 'muscache' in src)):
+                    image_url = src
+                    break
+                elif src.startswith('//'):
+                    if 'pictures' in src or 'airbnb' in src or 'muscache' in src:
+                        image_url = f"https:{src}"
+                        break
+                elif src.startswith('/') and ('pictures' in src):
+                    image_url = f"https://a0.muscache.com{src}"
+                    break
+        
+        return {
+            'title': title,
+            'texts': texts,
+            'text': ''.join(texts),
+            'listing_url': listing_url,
+            'image_url': image_url,
+            'img_elements': img_elements
+        }
+    
+    def _process_search_results(self, soup, search_name):
+        """
+        Processa os resultados de uma busca específica
+        """
+        listings = []
+        dedupe_index = ListingDedupeIndex()
+        
+        # Buscar por containers de anúncios com diferentes seletores (uma única passada)
+        selector, listing_containers = self._find_listing_containers(soup)
+        
         if not listing_containers:
             print(f"❌ {search_name} - Nenhum container de anúncio encontrado")
             return listings
         
+        print(f"📋 {search_name} - Encontrados {len(listing_containers)} containers com seletor: {selector}")
         print(f"🏠 {search_name} - Processando {min(len(listing_containers), 20)} anúncios...")
         
         for i, container in enumerate(listing_containers[:20]):  # Analisar até 20 anúncios
             try:
+                fields = self._extract_container_fields(container)
+                
                 # Extrair informações básicas
-                title_elem = container.find(text=re.compile(r'\w+'))
-                title = title_elem.strip() if title_elem else f"Anúncio {i+1}"
+                title = fields['title'] or f"Anúncio {i+1}"
+                listing_url = fields['listing_url']
+                image_url = fields['image_url']
                 
                 # Extrair preço com diferentes padrões mais específicos
                 price = 0
-                container_text = container.get_text()
+                container_text = fields['text']
                 
-                # Padrões de preço mais específicos para Airbnb
-                price_patterns = [
-                    r'R\$\s*(\d{1,4}(?:[.,]\d{3})*(?:[.,]\d{2})?)',  # R$ 1.234,56 ou R$ 1234
-                    r'(\d{2,4})\s*(?:por\s*noite|/\s*noite)',  # 150 por noite
-                    r'Total\s*R\$\s*(\d+)',  # Total R$ 300
-                    r'(\d{2,4})\s*reais?',  # 200 reais
-                    r'\$\s*(\d{2,4})',  # $ 150
-                    r'(?:^|\s)(\d{2,4})(?=\s*$|\s*por|\s*/)',  # números isolados
-                ]
-                
-                for pattern in price_patterns:
-                    matches = re.findall(pattern, container_text, re.IGNORECASE | re.MULTILINE)
-                    for match in matches:
-                        try:
-                            # Limpar e converter o preço
-                            price_str = str(match).replace('.', '').replace(',', '.')
-                            potential_price = float(price_str)
-                            
-                            # Validar se o preço está em uma faixa razoável (R$ 50 - R$ 2000 por noite)
-                            if 50 <= potential_price <= 2000:
-                                price = potential_price
-                                print(f"💰 Preço encontrado: R${price} (padrão: {pattern})")
-                                break
-                        except (ValueError, TypeError):
-                            continue
+                # Uma varredura com todos os padrões de preço (em ordem de prioridade)
+                price_patterns = PATTERN_BANK['search_price']
+                for tag, groups in price_patterns.scan(container_text):
+                    try:
+                        # Limpar e converter o preço
+                        price_str = str(groups[0]).replace('.', '').replace(',', '.')
+                        potential_price = float(price_str)
                         
-                    if price > 0:
-                        break
+                        # Validar se o preço está em uma faixa razoável (R$ 50 - R$ 2000 por noite)
+                        if 50 <= potential_price <= 2000:
+                            price = potential_price
+                            price_patterns.hit(tag)
+                            print(f"💰 Preço encontrado: R${price} (padrão: {tag})")
+                            break
+                    except (ValueError, TypeError):
+                        continue
                 
                 # Analisar se é frente à praia
-                beach_analysis = self.analyze_listing_images_and_description(container)
+                beach_analysis = self.analyze_listing_images_and_description(
+                    container, texts=fields['texts'], img_elements=fields['img_elements']
+                )
                 
                 # Extrair avaliações se disponível
                 rating = 0
                 reviews_count = 0
                 
                 # Buscar padrões de avaliação
-                rating_patterns = [
-                    r'(\d+[.,]\d+)\s*\(\s*(\d+)\s*avalia[çc][õo]es?\)',  # 4.5 (123 avaliações)
-                    r'(\d+[.,]\d+)\s*★\s*\(\s*(\d+)\s*\)',  # 4.5 ★ (123)
-                    r'★\s*(\d+[.,]\d+)\s*\(\s*(\d+)\s*\)',  # ★ 4.5 (123)
-                    r'(\d+[.,]\d+)\s*estrelas?\s*\(\s*(\d+)\s*\)'  # 4.5 estrelas (123)
-                ]
-                
-                for pattern in rating_patterns:
-                    match = re.search(pattern, container_text, re.IGNORECASE)
-                    if match:
-                        rating = float(match.group(1).replace(',', '.'))
-                        reviews_count = int(match.group(2))
-                        break
+                rating_patterns = PATTERN_BANK['search_rating']
+                for tag, groups in rating_patterns.scan(container_text, first_only=True):
+                    rating = float(groups[0].replace(',', '.'))
+                    reviews_count = int(groups[1])
+                    rating_patterns.hit(tag)
+                    break
                 
                 # Se não encontrou o padrão completo, tentar só a nota
                 if rating == 0:
-                    rating_match = re.search(r'(\d+[.,]\d+)', container_text)
+                    rating_match = RATING_PATTERN.search(container_text)
                     if rating_match:
                         potential_rating = float(rating_match.group(1).replace(',', '.'))
                         if 1 <= potential_rating <= 5:  # Validar se é uma nota válida
                             rating = potential_rating
                 
-                # Extrair URL do anúncio - tentar múltiplos seletores
-                listing_url = ""
-                
-                # Tentar diferentes seletores para encontrar o link
-                link_selectors = [
-                    'a[href*="/rooms/"]',  # Link direto para room
-                    'a[data-testid="listing-link"]',  # Link com data-testid
-                    'a[href*="/plus/"]',  # Airbnb Plus
-                    'a[href*="/luxury/"]',  # Airbnb Luxe
-                    'a[href]'  # Qualquer link como fallback
-                ]
-                
-                for selector in link_selectors:
-                    try:
-                        link_elem = container.select_one(selector)
-                        if link_elem:
-                            href = link_elem.get('href')
-                            if href and ('/rooms/' in href or '/plus/' in href or '/luxury/' in href):
-                                if href.startswith('/'):
-                                    listing_url = f"https://www.airbnb.com.br{href}"
-                                elif href.startswith('http'):
-                                    listing_url = href
-                                break
-                    except Exception:
-                        continue
-                    
-                    # Se ainda não encontrou, tentar buscar no HTML bruto
-                    if not listing_url:
-                        # Buscar por URLs que contenham /rooms/
-                        url_pattern = r'/rooms/[0-9]+'
-                        url_match = re.search(url_pattern, str(container))
-                        if url_match:
-                            href = url_match.group(0)
-                            listing_url = f"https://www.airbnb.com.br{href}"
-                    
-                    # Extrair imagem do anúncio - tentar múltiplos seletores
-                    image_url = ""
-                    
-                    # Tentar diferentes seletores para encontrar imagens
-                    img_selectors = [
-                        'img[src*="pictures"]',  # Imagens do Airbnb
-                        'img[data-src*="pictures"]',  # Lazy loading
-                        'img[src*="airbnb"]',  # URLs do Airbnb
-                        'img[data-original*="pictures"]',  # Outro tipo de lazy loading
-                        'img[srcset*="pictures"]',  # Responsive images
-                        'img',  # Fallback para qualquer imagem
-                    ]
-                    
-                    for selector in img_selectors:
-                        try:
-                            img_elem = container.select_one(selector)
-                            if img_elem:
-                                # Tentar diferentes atributos de imagem
-                                src = (img_elem.get('src') or 
-                                      img_elem.get('data-src') or 
-                                      img_elem.get('data-original') or 
-                                      img_elem.get('data-lazy-src') or
-                                      img_elem.get('data-srcset'))
-                                
-                                # Se srcset existe, pegar a primeira URL
-                                if not src and img_elem.get('srcset'):
-                                    srcset = img_elem.get('srcset')
-                                    if srcset:
-                                        src = srcset.split(',')[0].split(' ')[0]
-                                
-                                if src:
-                                    # Limpar e validar URL
-                                    src = src.strip()
-                                    
-                                    # Verificar se é uma URL válida do Airbnb
-                                    if (src.startswith('http') and 
-                                        ('pictures' in src or 'airbnb' in src or 'muscache' in src)):
-                                        image_url = src
-                                        break
-                                    elif src.startswith('//'):
-                                        if 'pictures' in src or 'airbnb' in src or 'muscache' in src:
-                                            image_url = f"https:{src}"
-                                            break
-                                    elif src.startswith('/') and ('pictures' in src):
-                                        image_url = f"https://a0.muscache.com{src}"
-                                        break
-                        except Exception as e:
-                            print(f"⚠️ Erro ao extrair imagem com seletor {selector}: {e}")
-                            continue
-                    
                 if price > 0:  # Só adicionar se encontrou preço
                     listing_data = {
                         'title': title[:100],  # Limitar tamanho
@@ -755,15 +1156,8 @@ class AirbnbClimateScraper:
                         'image_url': image_url
                     }
                     
-                    # Verificar se já existe (evitar duplicatas simples)
-                    duplicate = False
-                    for existing in listings:
-                        if (existing['title'] == listing_data['title'] and 
-                            existing['price_per_night'] == listing_data['price_per_night']):
-                            duplicate = True
-                            break
-                    
-                    if not duplicate:
+                    # Verificar se já existe (ID do quarto ou título + preço)
+                    if dedupe_index.add(listing_data, search_name):
                         listings.append(listing_data)
                         print(f"✅ {search_name} - Anúncio {i+1}: {title[:50]}... - R${price}/noite")
                         if listing_url:
@@ -777,7 +1171,7 @@ class AirbnbClimateScraper:
                         else:
                             print(f"⚠️ Imagem não encontrada para: {title[:50]}...")
                             # Debug adicional: verificar se há imagens no container
-                            all_imgs = container.find_all('img')
+                            all_imgs = fields['img_elements']
                             print(f"📊 Total de elementos img encontrados: {len(all_imgs)}")
                             for idx, img in enumerate(all_imgs[:3]):  # Mostrar apenas as 3 primeiras
                                 img_src = img.get('src') or img.get('data-src') or 'N/A'
@@ -1030,9 +1424,31 @@ class AirbnbClimateScraper:
         
         return strategies.get(market_position, strategies['moderate_competition'])
     
-    def get_weather_forecast(self, municipality=None):
+    def get_weather_forecast(self, municipality=None, force_refresh=False):
         """
         Consulta a previsão do tempo para o município especificado
+        A previsão vem do armazenamento compartilhado (weather_store) enquanto estiver
+        válida; só vai ao ClimaTempo quando não houver cópia ou com force_refresh
+        """
+        municipality_name = municipality or 'Itacuruçá'
+        store = get_weather_store()
+        
+        if store and not force_refresh:
+            stored_forecast = store.get_forecast(municipality_name)
+            if stored_forecast:
+                print(f"🌤️ Previsão do tempo para {municipality_name} servida do armazenamento")
+                return stored_forecast
+        
+        weather_data = self._fetch_weather_forecast(municipality, refresh=force_refresh)
+        if store and weather_data:
+            store.save_forecast(municipality_name, weather_data)
+        return weather_data
+    
+    def _fetch_weather_forecast(self, municipality=None, refresh=False):
+        """
+        Busca e processa a página de 15 dias do ClimaTempo para o município
+        Com refresh, a página vem da rede mesmo que o cache HTTP tenha uma cópia
+        válida (as datas são contadas a partir de hoje, então a página tem que ser atual)
         """
         if municipality:
             # Buscar URL do ClimaTempo para o município
@@ -1043,10 +1459,10 @@ class AirbnbClimateScraper:
         
         try:
             print(f"🌤️ Buscando previsão do tempo para: {municipality or 'Itacuruçá'}")
-            response = self.session.get(climatempo_url, timeout=30)
+            response = self.session.get(climatempo_url, timeout=30, refresh=refresh)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = self._parse_html(response.content)
             
             # Buscar informações de chuva
             weather_data = []
@@ -1054,7 +1470,7 @@ class AirbnbClimateScraper:
             # Procurar por elementos que contenham probabilidade de chuva
             rain_elements = soup.find_all(text=re.compile(r'\d+%.*chuva|chuva.*\d+%', re.IGNORECASE))
             
-            for i, element in enumerate(rain_elements[:7]):  # Próximos 7 dias
+            for i, element in enumerate(rain_elements[:15]):  # Próximos 15 dias
                 rain_match = re.search(r'(\d+)%', element)
                 if rain_match:
                     rain_probability = int(rain_match.group(1))
@@ -1107,6 +1523,12 @@ class AirbnbClimateScraper:
             
             municipality_lower = municipality.lower().strip()
             
+            # URL já resolvida antes (inclusive por busca dinâmica)
+            store = get_weather_store()
+            stored_url = store.get_url(municipality) if store else None
+            if stored_url:
+                return stored_url
+            
             # Buscar URL exata
             if municipality_lower in city_urls:
                 print(f"🎯 URL encontrada para {municipality}")
@@ -1124,13 +1546,15 @@ class AirbnbClimateScraper:
             
             response = self.session.get(search_url, timeout=10)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = self._parse_html(response.content)
                 # Buscar por links de cidades nos resultados
                 city_links = soup.find_all('a', href=re.compile(r'/previsao-do-tempo/.*cidade.*'))
                 if city_links:
                     first_result = city_links[0]['href']
                     full_url = f"https://www.climatempo.com.br{first_result}"
                     print(f"🎯 URL encontrada dinamicamente: {full_url}")
+                    if store:
+                        store.save_url(municipality, full_url)
                     return full_url
             
             # Fallback para Itacuruçá
@@ -1260,20 +1684,39 @@ class AirbnbClimateScraper:
     def send_email_report(self, analysis_results, competitive_data, pricing_suggestion):
         """
         Envia relatório por email com análise de preços e concorrência
+        O relatório vai para a fila de emails (montagem do HTML e envio em segundo
+        plano); sem fila disponível, envia direto
         """
         if not self.email_config.get('sender_email') or not self.email_config.get('sender_password'):
             print("❌ Configuração de email não definida. Configure sender_email e sender_password.")
             return False
         
+        # Horário da análise, não do envio (a fila pode enviar bem depois, após novas tentativas)
+        generated_at = datetime.now()
+        subject = f"📊 Relatório de Preços Airbnb - {generated_at.strftime('%d/%m/%Y %H:%M')}"
+        mail_queue = get_mail_queue(render_email_report)
+        if mail_queue is not None:
+            try:
+                mail_queue.submit(self.email_config, subject, {
+                    'analysis_results': analysis_results,
+                    'competitive_data': competitive_data,
+                    'pricing_suggestion': pricing_suggestion,
+                    'generated_at': generated_at.isoformat()
+                })
+                print(f"📬 Relatório na fila de envio para {self.email_config['recipient_email']}")
+                return True
+            except Exception as e:
+                print(f"⚠️ Erro ao enfileirar email, enviando direto: {e}")
+        
         try:
             # Criar mensagem
             msg = MIMEMultipart()
             msg['From'] = self.email_config['sender_email']
             msg['To'] = self.email_config['recipient_email']
-            msg['Subject'] = f"📊 Relatório de Preços Airbnb - {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+            msg['Subject'] = subject
             
             # Criar corpo do email em HTML
-            html_body = self._create_email_html(analysis_results, competitive_data, pricing_suggestion)
+            html_body = self._create_email_html(analysis_results, competitive_data, pricing_suggestion, generated_at)
             
             msg.attach(MIMEText(html_body, 'html', 'utf-8'))
             
@@ -1293,10 +1736,13 @@ class AirbnbClimateScraper:
             print(f"❌ Erro ao enviar email: {e}")
             return False
     
-    def _create_email_html(self, analysis_results, competitive_data, pricing_suggestion):
+    @staticmethod
+    def _create_email_html(analysis_results, competitive_data, pricing_suggestion, generated_at=None):
         """
         Cria o corpo HTML do email com o relatório
+        generated_at é o horário da análise (padrão: agora)
         """
+        generated_at = generated_at or datetime.now()
         html = f"""
         <!DOCTYPE html>
         <html>
@@ -1317,7 +1763,7 @@ class AirbnbClimateScraper:
         <body>
             <div class="header">
                 <h1>🏖️ Relatório de Preços - Hotel Mont Blanc Itacuruçá</h1>
-                <p>Análise automática gerada em {datetime.now().strftime('%d/%m/%Y às %H:%M')}</p>
+                <p>Análise automática gerada em {generated_at.strftime('%d/%m/%Y às %H:%M')}</p>
             </div>
         """
         
@@ -1420,20 +1866,27 @@ class AirbnbClimateScraper:
         
         return html
     
-    def analyze_specific_listing(self, listing_url, checkin_date, checkout_date, adults=2):
+    def analyze_specific_listing(self, listing_url, checkin_date, checkout_date, adults=2, with_dates=False):
         """
         Analisa um anúncio específico do Airbnb baseado no URL fornecido
+        Com with_dates, a página é pedida com check_in/check_out/adults (o preço
+        exibido é o dessas datas) pela sessão da thread atual
         """
         try:
             print(f"📋 Extraindo dados do anúncio: {listing_url}")
             
             # Fazer requisição para o anúncio específico
-            response = self.session.get(listing_url)
+            if with_dates:
+                response = self._get_thread_session().get(listing_url, params={
+                    'check_in': checkin_date, 'check_out': checkout_date, 'adults': adults
+                })
+            else:
+                response = self.session.get(listing_url)
             if response.status_code != 200:
                 print(f"❌ Erro ao acessar o anúncio: {response.status_code}")
                 return []
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = self._parse_html(response.content)
             
             # Extrair informações do anúncio
             listing_data = {
@@ -1454,163 +1907,44 @@ class AirbnbClimateScraper:
                 'bathrooms': 1
             }
             
+            nights = self._calculate_nights(checkin_date, checkout_date)
+            
+            # Primeiro, ler os dados do estado JSON embutido na página
+            structured = self._extract_structured_listing(response.text)
+            if structured:
+                print(f"🧩 Estado JSON embutido encontrado: {', '.join(sorted(structured))}")
+            
             # Extrair título
-            title_element = soup.find('h1') or soup.find('title')
-            if title_element:
-                listing_data['title'] = title_element.get_text(strip=True)[:100]
+            if structured.get('title'):
+                listing_data['title'] = structured['title'][:100]
+            else:
+                title_element = soup.find('h1') or soup.find('title')
+                if title_element:
+                    listing_data['title'] = title_element.get_text(strip=True)[:100]
             
             # Extrair município/localização
-            municipality = self._extract_municipality(soup)
+            municipality = structured.get('municipality') or self._extract_municipality(soup)
             listing_data['municipality'] = municipality
             print(f"🏙️ Município identificado: {municipality}")
             
-            # Extrair informações adicionais do anúncio
-            self._extract_listing_details(soup, listing_data)
+            # Extrair informações adicionais do anúncio (texto/DOM só para os campos que o JSON não trouxe)
+            detail_fields = ('max_guests', 'bedrooms', 'bathrooms', 'property_type')
+            missing_fields = [field for field in detail_fields if field not in structured]
+            if missing_fields:
+                page_details = dict(listing_data)
+                self._extract_listing_details(soup, page_details)
+                for field in missing_fields:
+                    listing_data[field] = page_details[field]
+            for field in detail_fields:
+                if field in structured:
+                    listing_data[field] = structured[field]
             
             # Extrair preço do Airbnb com padrões mais específicos
             page_text = soup.get_text()
-            page_html = str(soup)
-            price_found = False
-            nights = self._calculate_nights(checkin_date, checkout_date)
+            price_found = self._apply_structured_price(structured, nights, listing_data)
             
-            print(f"🔍 Buscando preços na página do Airbnb...")
-            
-            # Padrões específicos para valores totais do Airbnb
-            total_patterns = [
-                r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*por\s*2\s*noites',
-                r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*total',
-                r'Total\s*R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)',
-                r'"totalPrice"[^}]*"amount"[^}]*([0-9]+)',
-                r'"total"[^}]*([0-9]{3,6})',
-                r'([0-9]{1,3}(?:\.[0-9]{3})+)\s*para\s*[0-9]+\s*noites?'
-            ]
-            
-            # Primeiro, tentar encontrar o valor total
-            for pattern in total_patterns:
-                total_match = re.search(pattern, page_text, re.IGNORECASE)
-                if total_match:
-                    try:
-                        total_str = total_match.group(1)
-                        # Tratar formato brasileiro (1.079,00)
-                        if ',' in total_str and '.' in total_str:
-                            total_str = total_str.replace('.', '').replace(',', '.')
-                        elif ',' in total_str:
-                            total_str = total_str.replace(',', '.')
-                        elif '.' in total_str and len(total_str.split('.')[-1]) == 3:
-                            # Formato 1.079 (sem centavos)
-                            total_str = total_str.replace('.', '')
-                        
-                        total_price = float(total_str)
-                        
-                        if nights > 0 and 100 <= total_price <= 50000:
-                            price_per_night = total_price / nights
-                            listing_data['price_per_night'] = price_per_night
-                            listing_data['daily_rate_display'] = f"R$ {price_per_night:.2f} por noite"
-                            listing_data['total_price'] = total_price
-                            listing_data['extraction_method'] = f"Total encontrado: R$ {total_price:.2f} / {nights} noites"
-                            print(f"💰 Valor total encontrado: R$ {total_price:.2f} para {nights} noites")
-                            print(f"💰 Valor da diária: R$ {price_per_night:.2f} por noite")
-                            price_found = True
-                            break
-                    except (ValueError, ZeroDivisionError):
-                        continue
-            
-            # Se não encontrou total, buscar preço por noite
             if not price_found:
-                night_patterns = [
-                    r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*por\s*noite',
-                    r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)\s*/\s*noite',
-                    r'"basePrice"[^}]*"amount"[^}]*([0-9]+)',
-                    r'"price"[^}]*"amount"[^}]*([0-9]+)',
-                    r'([0-9]{2,4})\s*por\s*noite'
-                ]
-                
-                for pattern in night_patterns:
-                    night_match = re.search(pattern, page_text, re.IGNORECASE)
-                    if night_match:
-                        try:
-                            price_str = night_match.group(1)
-                            # Tratar formato brasileiro
-                            if ',' in price_str and '.' in price_str:
-                                price_str = price_str.replace('.', '').replace(',', '.')
-                            elif ',' in price_str:
-                                price_str = price_str.replace(',', '.')
-                            elif '.' in price_str and len(price_str.split('.')[-1]) == 3:
-                                price_str = price_str.replace('.', '')
-                            
-                            price = float(price_str)
-                            
-                            if 50 <= price <= 5000:
-                                listing_data['price_per_night'] = price
-                                listing_data['daily_rate_display'] = f"R$ {price:.2f} por noite"
-                                listing_data['total_price'] = price * nights
-                                listing_data['extraction_method'] = f"Preço por noite encontrado diretamente"
-                                print(f"💰 Valor da diária encontrado: R$ {price:.2f} por noite")
-                                print(f"💰 Total do período: R$ {price * nights:.2f}")
-                                price_found = True
-                                break
-                        except ValueError:
-                            continue
-            
-            # Se ainda não encontrou, buscar em elementos específicos do DOM
-            if not price_found:
-                print("🔍 Buscando em elementos específicos do DOM...")
-                price_elements = soup.find_all(text=re.compile(r'R\$\s*[0-9]'))
-                for element in price_elements[:20]:  # Limitar busca
-                    price_match = re.search(r'R\$\s*([0-9]{1,3}(?:\.[0-9]{3})*(?:,[0-9]{2})?)', element)
-                    if price_match:
-                        try:
-                            price_str = price_match.group(1)
-                            if ',' in price_str and '.' in price_str:
-                                price_str = price_str.replace('.', '').replace(',', '.')
-                            elif ',' in price_str:
-                                price_str = price_str.replace(',', '.')
-                            elif '.' in price_str and len(price_str.split('.')[-1]) == 3:
-                                price_str = price_str.replace('.', '')
-                            
-                            price = float(price_str)
-                            
-                            # Verificar se é um preço razoável
-                            if 50 <= price <= 5000:
-                                # Assumir que é preço por noite se estiver na faixa típica
-                                if price <= 2000:
-                                    listing_data['price_per_night'] = price
-                                    listing_data['daily_rate_display'] = f"R$ {price:.2f} por noite"
-                                    listing_data['total_price'] = price * nights
-                                    listing_data['extraction_method'] = f"Extraído do DOM"
-                                    print(f"💰 Valor encontrado no DOM: R$ {price:.2f} por noite")
-                                    price_found = True
-                                    break
-                                # Se for valor alto, assumir que é total
-                                elif nights > 0:
-                                    price_per_night = price / nights
-                                    if 50 <= price_per_night <= 2000:
-                                        listing_data['price_per_night'] = price_per_night
-                                        listing_data['daily_rate_display'] = f"R$ {price_per_night:.2f} por noite"
-                                        listing_data['total_price'] = price
-                                        listing_data['extraction_method'] = f"Total do DOM: R$ {price:.2f} / {nights} noites"
-                                        print(f"💰 Total encontrado no DOM: R$ {price:.2f} para {nights} noites")
-                                        print(f"💰 Valor da diária: R$ {price_per_night:.2f} por noite")
-                                        price_found = True
-                                        break
-                        except ValueError:
-                            continue
-            
-            # Se não encontrou preço, mostrar debug
-            if not price_found:
-                print("❌ Não foi possível extrair o preço da página")
-                print("🔍 Primeiros 500 caracteres da página:")
-                print(page_text[:500])
-                print("\n🔍 Buscando por 'R$' na página:")
-                r_matches = re.findall(r'R\$[^\n]{0,50}', page_text)
-                for i, match in enumerate(r_matches[:5]):
-                    print(f"  {i+1}. {match}")
-                
-                # Tentar extrair qualquer número que possa ser um preço
-                print("\n🔍 Números encontrados na página:")
-                numbers = re.findall(r'[0-9]{2,5}(?:[.,][0-9]{2,3})?', page_text)
-                for i, num in enumerate(numbers[:20]):
-                    print(f"  {i+1}. {num}")
+                price_found = self._extract_price_from_page(soup, page_text, nights, listing_data)
             
             # Adicionar informações detalhadas do período
             if price_found:
@@ -1637,18 +1971,19 @@ class AirbnbClimateScraper:
                 }
             
             # Extrair rating e reviews
-            rating_element = soup.find(text=re.compile(r'[0-9]\.[0-9]'))
-            if rating_element:
-                rating_match = re.search(r'([0-9]\.[0-9])', rating_element)
-                if rating_match:
-                    listing_data['rating'] = float(rating_match.group(1))
+            if structured.get('reviews'):
+                listing_data['reviews'] = structured['reviews']
+            if structured.get('rating'):
+                listing_data['rating'] = structured['rating']
+            else:
+                rating_element = soup.find(text=PAGE_RATING_TEXT_PATTERN)
+                if rating_element:
+                    rating_match = PAGE_RATING_PATTERN.search(rating_element)
+                    if rating_match:
+                        listing_data['rating'] = float(rating_match.group(1))
             
             # Verificar se é frente à praia
-            page_text_lower = page_text.lower()
-            beach_evidence = []
-            for keyword in self.beach_keywords:
-                if keyword.lower() in page_text_lower:
-                    beach_evidence.append(keyword)
+            beach_evidence = self.keyword_matcher.find(page_text)['beach']
             
             if beach_evidence:
                 listing_data['is_beachfront'] = True
@@ -1667,6 +2002,284 @@ class AirbnbClimateScraper:
             print(f"❌ Erro ao analisar anúncio específico: {str(e)}")
             return []
     
+    # Scripts com estado JSON embutido nas páginas do Airbnb
+    STATE_SCRIPT_PATTERN = re.compile(r'<script\b([^>]*)>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+    STATE_SCRIPT_MARKERS = ('__NEXT_DATA__', 'data-deferred-state', 'data-state', 'application/json', 'application/ld+json')
+    
+    @staticmethod
+    def _parse_brl_amount(text):
+        """
+        Converte um valor em reais ("R$ 1.079", "1.079,50", "450") para float
+        """
+        match = re.search(r'[0-9][0-9.,]*', text or '')
+        if not match:
+            return None
+        value = match.group(0).rstrip('.,')
+        # Tratar formato brasileiro (1.079,00)
+        if ',' in value and '.' in value:
+            value = value.replace('.', '').replace(',', '.')
+        elif ',' in value:
+            value = value.replace(',', '.')
+        elif '.' in value and len(value.split('.')[-1]) == 3:
+            # Formato 1.079 (sem centavos)
+            value = value.replace('.', '')
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    
+    def _extract_structured_listing(self, html):
+        """
+        Lê os dados do anúncio direto dos blocos JSON embutidos na página
+        (__NEXT_DATA__, data-deferred-state, ld+json), sem passar pelo texto renderizado.
+        Cada bloco é decodificado uma única vez; retorna só os campos encontrados.
+        """
+        structured = {}
+        if not html:
+            return structured
+        
+        blobs = []
+        for match in self.STATE_SCRIPT_PATTERN.finditer(html):
+            attrs, content = match.group(1), match.group(2).strip()
+            if not content or not any(marker in attrs for marker in self.STATE_SCRIPT_MARKERS):
+                continue
+            try:
+                blobs.append(json.loads(content))
+            except ValueError:
+                continue
+        
+        if not blobs:
+            return structured
+        
+        def number(value):
+            return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+        
+        # Percorrer em largura: as chaves mais rasas têm prioridade
+        queue = deque(blobs)
+        while queue:
+            node = queue.popleft()
+            if isinstance(node, list):
+                queue.extend(node)
+                continue
+            if not isinstance(node, dict):
+                continue
+            
+            sharing = node.get('sharingConfig')
+            if isinstance(sharing, dict):
+                if isinstance(sharing.get('title'), str):
+                    structured.setdefault('title', sharing['title'].strip())
+                if isinstance(sharing.get('location'), str) and sharing['location'].strip():
+                    structured.setdefault('municipality', sharing['location'].strip().title())
+                if isinstance(sharing.get('propertyType'), str) and sharing['propertyType'].strip():
+                    structured.setdefault('property_type', sharing['propertyType'].strip())
+                if number(sharing.get('personCapacity')):
+                    structured.setdefault('max_guests', int(sharing['personCapacity']))
+                if number(sharing.get('starRating')):
+                    structured.setdefault('rating', float(sharing['starRating']))
+                if number(sharing.get('reviewCount')) is not None:
+                    structured.setdefault('reviews', int(sharing['reviewCount']))
+            
+            for key, value in node.items():
+                if isinstance(value, (dict, list)):
+                    if key == 'structuredDisplayPrice' and isinstance(value, dict) and 'price' not in structured:
+                        price = self._read_structured_price(value)
+                        if price:
+                            structured['price'] = price
+                    queue.append(value)
+                elif key == 'listingTitle' and isinstance(value, str) and value.strip():
+                    structured.setdefault('title', value.strip())
+                elif key in ('localizedCity', 'city', 'addressLocality') and isinstance(value, str) and value.strip():
+                    structured.setdefault('municipality', value.strip().title())
+                elif key == 'personCapacity' and number(value) and 1 <= value <= 20:
+                    structured.setdefault('max_guests', int(value))
+                elif key in ('avgRating', 'starRating', 'guestSatisfactionOverall', 'ratingValue') and number(value):
+                    if 1 <= float(value) <= 5:
+                        structured.setdefault('rating', float(value))
+                elif key in ('reviewCount', 'visibleReviewCount', 'reviewsCount') and number(value) is not None:
+                    structured.setdefault('reviews', int(value))
+                elif key in ('bedrooms', 'bathrooms') and number(value) is not None and 0 <= value <= 10:
+                    structured.setdefault(key, int(value))
+        
+        return structured
+    
+    def _read_structured_price(self, display_price):
+        """
+        Interpreta o structuredDisplayPrice do Airbnb: valor e se é total do período ou diária
+        """
+        line = display_price.get('primaryLine') or {}
+        if not isinstance(line, dict):
+            return None
+        
+        amount_text = line.get('discountedPrice') or line.get('price') or line.get('accessibilityLabel')
+        amount = self._parse_brl_amount(amount_text)
+        if not amount:
+            return None
+        
+        qualifier = f"{line.get('qualifier') or ''} {line.get('accessibilityLabel') or ''}".lower()
+        is_total = 'total' in qualifier or bool(re.search(r'\d+\s*(?:noites|nights)', qualifier))
+        return {'amount': amount, 'is_total': is_total}
+    
+    def _apply_structured_price(self, structured, nights, listing_data):
+        """
+        Preenche os campos de preço com o valor do estado JSON, se houver um valor plausível
+        """
+        price = structured.get('price')
+        if not price:
+            return False
+        
+        amount = price['amount']
+        if price['is_total']:
+            if nights > 0 and 100 <= amount <= 50000:
+                price_per_night = amount / nights
+                listing_data['price_per_night'] = price_per_night
+                listing_data['daily_rate_display'] = f"R$ {price_per_night:.2f} por noite"
+                listing_data['total_price'] = amount
+                listing_data['extraction_method'] = f"Estado JSON: R$ {amount:.2f} / {nights} noites"
+                print(f"💰 Valor total (JSON): R$ {amount:.2f} para {nights} noites")
+                return True
+        elif 50 <= amount <= 5000:
+            listing_data['price_per_night'] = amount
+            listing_data['daily_rate_display'] = f"R$ {amount:.2f} por noite"
+            listing_data['total_price'] = amount * nights
+            listing_data['extraction_method'] = "Estado JSON: preço por noite"
+            print(f"💰 Valor da diária (JSON): R$ {amount:.2f} por noite")
+            return True
+        
+        return False
+    
+    def _extract_price_from_page(self, soup, page_text, nights, listing_data):
+        """
+        Extrai o preço por regex sobre o texto da página (total, por noite e DOM)
+        Usado quando o estado JSON embutido não traz o preço
+        """
+        price_found = False
+        
+        print(f"🔍 Buscando preços na página do Airbnb...")
+        
+        # Padrões específicos para valores totais do Airbnb (uma varredura)
+        total_patterns = PATTERN_BANK['listing_total_price']
+        
+        # Primeiro, tentar encontrar o valor total
+        for tag, groups in total_patterns.scan(page_text, first_only=True):
+            try:
+                total_str = groups[0]
+                # Tratar formato brasileiro (1.079,00)
+                if ',' in total_str and '.' in total_str:
+                    total_str = total_str.replace('.', '').replace(',', '.')
+                elif ',' in total_str:
+                    total_str = total_str.replace(',', '.')
+                elif '.' in total_str and len(total_str.split('.')[-1]) == 3:
+                    # Formato 1.079 (sem centavos)
+                    total_str = total_str.replace('.', '')
+                
+                total_price = float(total_str)
+                
+                if nights > 0 and 100 <= total_price <= 50000:
+                    price_per_night = total_price / nights
+                    listing_data['price_per_night'] = price_per_night
+                    listing_data['daily_rate_display'] = f"R$ {price_per_night:.2f} por noite"
+                    listing_data['total_price'] = total_price
+                    listing_data['extraction_method'] = f"Total encontrado: R$ {total_price:.2f} / {nights} noites"
+                    print(f"💰 Valor total encontrado: R$ {total_price:.2f} para {nights} noites")
+                    print(f"💰 Valor da diária: R$ {price_per_night:.2f} por noite")
+                    price_found = True
+                    total_patterns.hit(tag)
+                    break
+            except (ValueError, ZeroDivisionError):
+                continue
+        
+        # Se não encontrou total, buscar preço por noite
+        if not price_found:
+            night_patterns = PATTERN_BANK['listing_night_price']
+            
+            for tag, groups in night_patterns.scan(page_text, first_only=True):
+                try:
+                    price_str = groups[0]
+                    # Tratar formato brasileiro
+                    if ',' in price_str and '.' in price_str:
+                        price_str = price_str.replace('.', '').replace(',', '.')
+                    elif ',' in price_str:
+                        price_str = price_str.replace(',', '.')
+                    elif '.' in price_str and len(price_str.split('.')[-1]) == 3:
+                        price_str = price_str.replace('.', '')
+                    
+                    price = float(price_str)
+                    
+                    if 50 <= price <= 5000:
+                        listing_data['price_per_night'] = price
+                        listing_data['daily_rate_display'] = f"R$ {price:.2f} por noite"
+                        listing_data['total_price'] = price * nights
+                        listing_data['extraction_method'] = f"Preço por noite encontrado diretamente"
+                        print(f"💰 Valor da diária encontrado: R$ {price:.2f} por noite")
+                        print(f"💰 Total do período: R$ {price * nights:.2f}")
+                        price_found = True
+                        night_patterns.hit(tag)
+                        break
+                except ValueError:
+                    continue
+        
+        # Se ainda não encontrou, buscar em elementos específicos do DOM
+        if not price_found:
+            print("🔍 Buscando em elementos específicos do DOM...")
+            price_elements = soup.find_all(text=BRL_PRICE_TEXT_PATTERN)
+            for element in price_elements[:20]:  # Limitar busca
+                price_match = BRL_PRICE_PATTERN.search(element)
+                if price_match:
+                    try:
+                        price_str = price_match.group(1)
+                        if ',' in price_str and '.' in price_str:
+                            price_str = price_str.replace('.', '').replace(',', '.')
+                        elif ',' in price_str:
+                            price_str = price_str.replace(',', '.')
+                        elif '.' in price_str and len(price_str.split('.')[-1]) == 3:
+                            price_str = price_str.replace('.', '')
+                        
+                        price = float(price_str)
+                        
+                        # Verificar se é um preço razoável
+                        if 50 <= price <= 5000:
+                            # Assumir que é preço por noite se estiver na faixa típica
+                            if price <= 2000:
+                                listing_data['price_per_night'] = price
+                                listing_data['daily_rate_display'] = f"R$ {price:.2f} por noite"
+                                listing_data['total_price'] = price * nights
+                                listing_data['extraction_method'] = f"Extraído do DOM"
+                                print(f"💰 Valor encontrado no DOM: R$ {price:.2f} por noite")
+                                price_found = True
+                                break
+                            # Se for valor alto, assumir que é total
+                            elif nights > 0:
+                                price_per_night = price / nights
+                                if 50 <= price_per_night <= 2000:
+                                    listing_data['price_per_night'] = price_per_night
+                                    listing_data['daily_rate_display'] = f"R$ {price_per_night:.2f} por noite"
+                                    listing_data['total_price'] = price
+                                    listing_data['extraction_method'] = f"Total do DOM: R$ {price:.2f} / {nights} noites"
+                                    print(f"💰 Total encontrado no DOM: R$ {price:.2f} para {nights} noites")
+                                    print(f"💰 Valor da diária: R$ {price_per_night:.2f} por noite")
+                                    price_found = True
+                                    break
+                    except ValueError:
+                        continue
+        
+        # Se não encontrou preço, mostrar debug
+        if not price_found:
+            print("❌ Não foi possível extrair o preço da página")
+            print("🔍 Primeiros 500 caracteres da página:")
+            print(page_text[:500])
+            print("\n🔍 Buscando por 'R$' na página:")
+            r_matches = re.findall(r'R\$[^\n]{0,50}', page_text)
+            for i, match in enumerate(r_matches[:5]):
+                print(f"  {i+1}. {match}")
+            
+            # Tentar extrair qualquer número que possa ser um preço
+            print("\n🔍 Números encontrados na página:")
+            numbers = re.findall(r'[0-9]{2,5}(?:[.,][0-9]{2,3})?', page_text)
+            for i, num in enumerate(numbers[:20]):
+                print(f"  {i+1}. {num}")
+        
+        return price_found
+    
     def _extract_listing_details(self, soup, listing_data):
         """
         Extrai detalhes adicionais do anúncio como quartos, banheiros, hóspedes e tipo de propriedade
@@ -1675,90 +2288,63 @@ class AirbnbClimateScraper:
             page_text = soup.get_text()
             
             # Extrair capacidade de hóspedes
-            guest_patterns = [
-                r'(\d+)\s+hóspedes?',
-                r'até\s+(\d+)\s+pessoas?',
-                r'acomoda\s+(\d+)\s+pessoas?',
-                r'(\d+)\s+pessoas?',
-                r'(\d+)\s+guests?'
-            ]
-            
-            for pattern in guest_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    guests = int(match.group(1))
-                    if 1 <= guests <= 20:  # Validação razoável
-                        listing_data['max_guests'] = guests
-                        print(f"👥 Capacidade: {guests} hóspedes")
-                        break
+            guest_patterns = PATTERN_BANK['listing_guests']
+            for tag, groups in guest_patterns.scan(page_text, first_only=True):
+                guests = int(groups[0])
+                if 1 <= guests <= 20:  # Validação razoável
+                    listing_data['max_guests'] = guests
+                    guest_patterns.hit(tag)
+                    print(f"👥 Capacidade: {guests} hóspedes")
+                    break
             
             # Extrair número de quartos
-            bedroom_patterns = [
-                r'(\d+)\s+quartos?',
-                r'(\d+)\s+bedrooms?',
-                r'(\d+)\s+suítes?',
-                r'(\d+)\s+dormitórios?'
-            ]
-            
-            for pattern in bedroom_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    bedrooms = int(match.group(1))
-                    if 0 <= bedrooms <= 10:  # Validação razoável
-                        listing_data['bedrooms'] = bedrooms
-                        print(f"🛏️ Quartos: {bedrooms}")
-                        break
+            bedroom_patterns = PATTERN_BANK['listing_bedrooms']
+            for tag, groups in bedroom_patterns.scan(page_text, first_only=True):
+                bedrooms = int(groups[0])
+                if 0 <= bedrooms <= 10:  # Validação razoável
+                    listing_data['bedrooms'] = bedrooms
+                    bedroom_patterns.hit(tag)
+                    print(f"🛏️ Quartos: {bedrooms}")
+                    break
             
             # Extrair número de banheiros
-            bathroom_patterns = [
-                r'(\d+)\s+banheiros?',
-                r'(\d+)\s+bathrooms?',
-                r'(\d+)\s+lavabos?'
-            ]
-            
-            for pattern in bathroom_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    bathrooms = int(match.group(1))
-                    if 0 <= bathrooms <= 10:  # Validação razoável
-                        listing_data['bathrooms'] = bathrooms
-                        print(f"🚿 Banheiros: {bathrooms}")
-                        break
+            bathroom_patterns = PATTERN_BANK['listing_bathrooms']
+            for tag, groups in bathroom_patterns.scan(page_text, first_only=True):
+                bathrooms = int(groups[0])
+                if 0 <= bathrooms <= 10:  # Validação razoável
+                    listing_data['bathrooms'] = bathrooms
+                    bathroom_patterns.hit(tag)
+                    print(f"🚿 Banheiros: {bathrooms}")
+                    break
             
             # Extrair tipo de propriedade
-            property_patterns = [
-                r'(Casa|Apartamento|Chalé|Pousada|Hotel|Quarto|Studio|Loft|Cobertura|Flat)\s+(?:inteira?|completa?|privada?)?',
-                r'(?:Entire|Private)\s+(house|apartment|home|condo|villa|cabin|chalet)',
-                r'(Residência|Moradia|Imóvel)\s+(?:inteira?|completa?)'
-            ]
-            
-            for pattern in property_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    property_type = match.group(1).strip().title()
-                    # Mapear tipos em inglês para português
-                    type_mapping = {
-                        'House': 'Casa',
-                        'Apartment': 'Apartamento',
-                        'Home': 'Casa',
-                        'Condo': 'Apartamento',
-                        'Villa': 'Casa',
-                        'Cabin': 'Chalé',
-                        'Chalet': 'Chalé'
-                    }
-                    listing_data['property_type'] = type_mapping.get(property_type, property_type)
-                    print(f"🏠 Tipo: {listing_data['property_type']}")
-                    break
+            property_patterns = PATTERN_BANK['listing_property_type']
+            for tag, groups in property_patterns.scan(page_text, first_only=True):
+                property_type = groups[0].strip().title()
+                # Mapear tipos em inglês para português
+                type_mapping = {
+                    'House': 'Casa',
+                    'Apartment': 'Apartamento',
+                    'Home': 'Casa',
+                    'Condo': 'Apartamento',
+                    'Villa': 'Casa',
+                    'Cabin': 'Chalé',
+                    'Chalet': 'Chalé'
+                }
+                listing_data['property_type'] = type_mapping.get(property_type, property_type)
+                property_patterns.hit(tag)
+                print(f"🏠 Tipo: {listing_data['property_type']}")
+                break
             
             # Buscar também em elementos específicos do DOM
             # Procurar por elementos que contenham informações estruturadas
-            detail_elements = soup.find_all(['span', 'div', 'li'], text=re.compile(r'\d+\s+(quartos?|banheiros?|hóspedes?|guests?|bedrooms?|bathrooms?)'))
+            detail_elements = soup.find_all(['span', 'div', 'li'], text=DETAIL_TEXT_PATTERN)
             
             for element in detail_elements:
                 element_text = element.get_text(strip=True)
                 
                 # Quartos
-                bedroom_match = re.search(r'(\d+)\s+(?:quartos?|bedrooms?|dormitórios?)', element_text, re.IGNORECASE)
+                bedroom_match = DETAIL_BEDROOMS_PATTERN.search(element_text)
                 if bedroom_match and listing_data['bedrooms'] == 1:  # Só atualizar se ainda for o valor padrão
                     bedrooms = int(bedroom_match.group(1))
                     if 0 <= bedrooms <= 10:
@@ -1766,7 +2352,7 @@ class AirbnbClimateScraper:
                         print(f"🛏️ Quartos (DOM): {bedrooms}")
                 
                 # Banheiros
-                bathroom_match = re.search(r'(\d+)\s+(?:banheiros?|bathrooms?)', element_text, re.IGNORECASE)
+                bathroom_match = DETAIL_BATHROOMS_PATTERN.search(element_text)
                 if bathroom_match and listing_data['bathrooms'] == 1:  # Só atualizar se ainda for o valor padrão
                     bathrooms = int(bathroom_match.group(1))
                     if 0 <= bathrooms <= 10:
@@ -1774,7 +2360,7 @@ class AirbnbClimateScraper:
                         print(f"🚿 Banheiros (DOM): {bathrooms}")
                 
                 # Hóspedes
-                guest_match = re.search(r'(\d+)\s+(?:hóspedes?|guests?|pessoas?)', element_text, re.IGNORECASE)
+                guest_match = DETAIL_GUESTS_PATTERN.search(element_text)
                 if guest_match and listing_data['max_guests'] == 2:  # Só atualizar se ainda for o valor padrão
                     guests = int(guest_match.group(1))
                     if 1 <= guests <= 20:
@@ -1795,22 +2381,14 @@ class AirbnbClimateScraper:
             for h2 in h2_elements:
                 h2_text = h2.get_text(strip=True)
                 # Padrão para capturar "2 noites em Mangaratiba" ou similar
-                nights_pattern = r'\d+\s+noites?\s+em\s+([A-ZÁÊÇÕ][a-záêçõ]+(?:\s+[a-záêçõ]+)*(?:\s+[A-ZÁÊÇÕ][a-záêçõ]+)*)'
-                match = re.search(nights_pattern, h2_text, re.IGNORECASE)
+                match = NIGHTS_IN_CITY_PATTERN.search(h2_text)
                 if match:
                     municipality = match.group(1).strip().title()
                     print(f"🎯 Município extraído do h2: {municipality}")
                     return municipality
             
-            # Buscar por padrões de localização no HTML
-            location_patterns = [
-                # Buscar por elementos com informações de localização
-                r'([A-ZÁÊÇÕ][a-záêçõ]+(?:\s+[A-ZÁÊÇÕ][a-záêçõ]+)*),\s*(?:RJ|Rio de Janeiro|SP|São Paulo|MG|Minas Gerais|ES|Espírito Santo|PR|Paraná|SC|Santa Catarina|RS|Rio Grande do Sul|BA|Bahia|PE|Pernambuco|CE|Ceará)',
-                # Padrão mais específico para cidades do Rio de Janeiro
-                r'(Itacuruçá|Mangaratiba|Angra dos Reis|Paraty|Búzios|Cabo Frio|Arraial do Cabo|Saquarema|Maricá|Niterói|Rio de Janeiro)',
-                # Padrão geral para cidades brasileiras
-                r'([A-ZÁÊÇÕ][a-záêçõ]+(?:\s+[a-záêçõ]+)*(?:\s+[A-ZÁÊÇÕ][a-záêçõ]+)*),\s*[A-Z]{2}'
-            ]
+            # Padrões de localização (cidade + estado, cidades conhecidas, cidade + UF)
+            location_patterns = PATTERN_BANK['location']
             
             page_text = soup.get_text()
             
@@ -1831,23 +2409,21 @@ class AirbnbClimateScraper:
                 if element:
                     element_text = element.get_text() if hasattr(element, 'get_text') else str(element.get('content', ''))
                     
-                    for pattern in location_patterns:
-                        match = re.search(pattern, element_text, re.IGNORECASE)
-                        if match:
-                            municipality = match.group(1).strip()
-                            # Normalizar nome da cidade
-                            municipality = municipality.title()
-                            print(f"🎯 Município extraído: {municipality}")
-                            return municipality
+                    for tag, groups in location_patterns.scan(element_text, first_only=True):
+                        municipality = groups[0].strip()
+                        # Normalizar nome da cidade
+                        municipality = municipality.title()
+                        location_patterns.hit(tag)
+                        print(f"🎯 Município extraído: {municipality}")
+                        return municipality
             
             # Se não encontrou nos elementos específicos, buscar no texto geral
-            for pattern in location_patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE)
-                if match:
-                    municipality = match.group(1).strip()
-                    municipality = municipality.title()
-                    print(f"🎯 Município extraído do texto geral: {municipality}")
-                    return municipality
+            for tag, groups in location_patterns.scan(page_text, first_only=True):
+                municipality = groups[0].strip()
+                municipality = municipality.title()
+                location_patterns.hit(tag)
+                print(f"🎯 Município extraído do texto geral: {municipality}")
+                return municipality
             
             # Fallback para Itacuruçá se não conseguir identificar
             print("⚠️ Não foi possível identificar o município, usando Itacuruçá como padrão")
@@ -1857,10 +2433,50 @@ class AirbnbClimateScraper:
             print(f"❌ Erro ao extrair município: {str(e)}")
             return "Itacuruçá"
     
-    def run_competitive_analysis(self, checkin_date, checkout_date, my_listing_beachfront=True, adults=2, specific_listing_url=None):
+    def get_listing_fingerprint(self, listing_url, checkin_date, checkout_date, adults=2, my_listing_beachfront=True):
+        """
+        Impressão digital das entradas de uma análise competitiva: campos do
+        estado JSON embutido no anúncio, previsão do tempo do período, favoritos
+        e parâmetros da análise. Se nada disso mudou, a análise daria o mesmo
+        resultado. Retorna None quando a página não tem estado JSON (nesse caso
+        não dá para comparar sem o parsing completo).
+        """
+        try:
+            response = self.session.get(listing_url)
+            if response.status_code != 200:
+                return None
+            
+            structured = self._extract_structured_listing(response.text)
+            if not structured:
+                return None
+            
+            weather_data = self.get_weather_forecast(structured.get('municipality'))
+            relevant_weather = [
+                (w['date'], w['rain_probability']) for w in weather_data
+                if checkin_date <= w['date'] <= checkout_date
+            ]
+            
+            payload = {
+                'listing': structured,
+                'weather': relevant_weather,
+                'favorites': sorted(
+                    json.dumps(f, sort_keys=True, default=str) for f in (getattr(self, 'favorite_competitors', None) or [])
+                ),
+                'period': [checkin_date, checkout_date, adults, bool(my_listing_beachfront)]
+            }
+            return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+            
+        except Exception as e:
+            print(f"❌ Erro ao calcular impressão digital do anúncio: {e}")
+            return None
+    
+    def run_competitive_analysis(self, checkin_date, checkout_date, my_listing_beachfront=True, adults=2, specific_listing_url=None, progress=None):
         """
         Executa análise competitiva completa e envia relatório por email
+        progress(stage, message, **data), se informado, recebe um evento por etapa:
+        listing_extracted, weather_fetched, pricing_computed e email_sent
         """
+        progress = progress or (lambda *args, **kwargs: None)
         if not specific_listing_url:
             raise ValueError("Link do anúncio é obrigatório para análise")
             
@@ -1874,6 +2490,8 @@ class AirbnbClimateScraper:
         municipality = None
         if competitive_data and len(competitive_data) > 0:
             municipality = competitive_data[0].get('municipality')
+        progress('listing_extracted', 'Dados do anúncio extraídos',
+                 listing=competitive_data[0] if competitive_data else None)
         
         # Obter favoritos se disponível no objeto
         favorite_competitors = getattr(self, 'favorite_competitors', None)
@@ -1883,6 +2501,8 @@ class AirbnbClimateScraper:
         
         # Análise do clima baseada no município do anúncio
         weather_data = self.get_weather_forecast(municipality)
+        progress('weather_fetched', f'Previsão do tempo obtida ({len(weather_data)} dias)',
+                 municipality=municipality, weather=weather_data)
         
         # Ajustar preço baseado no clima
         if weather_data:
@@ -1890,6 +2510,8 @@ class AirbnbClimateScraper:
             climate_adjustment = self.suggest_pricing(pricing_suggestion['suggested_price'], weather_data, checkin_date, checkout_date)
             pricing_suggestion['climate_adjusted_price'] = climate_adjustment['suggested_price']
             pricing_suggestion['climate_factor'] = climate_adjustment['weather_factor']
+        progress('pricing_computed', f"Preço sugerido: R$ {pricing_suggestion['suggested_price']:.2f}/noite",
+                 pricing=pricing_suggestion)
         
         # Preparar resultados para email
         analysis_results = [{
@@ -1929,6 +2551,8 @@ class AirbnbClimateScraper:
         
         # Enviar email
         email_sent = self.send_email_report(analysis_results, competitive_data, pricing_suggestion)
+        progress('email_sent', 'Relatório encaminhado para envio por email' if email_sent else 'Relatório por email não enviado',
+                 sent=bool(email_sent))
         
         return {
             'competitive_data': competitive_data,
@@ -1937,50 +2561,276 @@ class AirbnbClimateScraper:
             'email_sent': email_sent
         }
     
-    def start_automated_monitoring(self, my_listing_beachfront=True):
+    def run_competitive_analysis_multi(self, periods, my_listing_beachfront=True, adults=2, specific_listing_url=None,
+                                       progress=None, stage_progress=None):
         """
-        Inicia monitoramento automatizado 2x ao dia
+        Análise competitiva de vários períodos (ex.: get_next_weekends_and_weekdays)
+        em uma única execução: o anúncio de referência é buscado uma vez, as buscas
+        de concorrentes de cada período rodam em paralelo (period_workers) e a
+        mesma previsão do tempo é usada em todos os períodos.
+        Limitação da extração única: o preço por noite do anúncio só vale para as
+        datas do primeiro período. Nos outros ele fica fora da média dos
+        concorrentes; se a busca de um período não achar concorrentes, o anúncio é
+        extraído de novo com as datas desse período (URL com check_in/check_out).
+        progress(period, row), se informado, é chamado quando cada período termina;
+        stage_progress(stage, message, **data) recebe os eventos das etapas
+        (listing_extracted, weather_fetched e search_completed de cada busca).
+        Retorna a matriz de preços (uma linha por período) sem enviar email.
         """
-        def run_analysis():
-            try:
-                # Analisar próximo final de semana
-                today = datetime.now()
-                days_until_friday = (4 - today.weekday()) % 7
-                if days_until_friday == 0 and today.weekday() >= 4:
-                    days_until_friday = 7
-                
-                next_friday = today + timedelta(days=days_until_friday)
-                next_sunday = next_friday + timedelta(days=2)
-                
-                checkin = next_friday.strftime('%Y-%m-%d')
-                checkout = next_sunday.strftime('%Y-%m-%d')
-                
-                print(f"\n🤖 Análise automática - {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-                self.run_competitive_analysis(checkin, checkout, my_listing_beachfront)
-                
-            except Exception as e:
-                print(f"❌ Erro na análise automática: {e}")
+        if not specific_listing_url:
+            raise ValueError("Link do anúncio é obrigatório para análise")
+        if not periods:
+            raise ValueError("Informe ao menos um período para análise")
+        
+        periods = sorted(periods, key=lambda p: p['checkin'])
+        print(f"🔍 Analisando {len(periods)} períodos do anúncio: {specific_listing_url}")
+        
+        # O anúncio é o mesmo em todos os períodos: uma única extração (preço com as datas do 1º período)
+        reference_data = self.analyze_specific_listing(
+            specific_listing_url, periods[0]['checkin'], periods[0]['checkout'], adults, with_dates=True
+        )
+        reference_listing = reference_data[0] if reference_data else None
+        municipality = reference_listing.get('municipality') if reference_listing else None
+        stage_progress = stage_progress or (lambda *args, **kwargs: None)
+        stage_progress('listing_extracted', 'Dados do anúncio extraídos', listing=reference_listing)
+        
+        # Uma previsão para todos os períodos
+        weather_data = self.get_weather_forecast(municipality)
+        stage_progress('weather_fetched', f'Previsão do tempo obtida ({len(weather_data)} dias)',
+                       municipality=municipality, weather=weather_data)
+        favorite_competitors = getattr(self, 'favorite_competitors', None)
+        
+        def analyze_period(period):
+            checkin_date, checkout_date = period['checkin'], period['checkout']
+            search = self.get_competitive_analysis(checkin_date, checkout_date, adults, reference_listing=reference_listing,
+                                                   progress=stage_progress)
+            
+            # Sem resultados reais da busca, precificar só com o anúncio (como na análise de um período)
+            competitors = search['listings'] if search.get('total_found') else []
+            period_reference = None
+            if period is periods[0]:
+                period_reference = reference_data
+            elif not competitors:
+                # O preço extraído é do 1º período: buscar o do anúncio nas datas deste
+                period_reference = self.analyze_specific_listing(
+                    specific_listing_url, checkin_date, checkout_date, adults, with_dates=True
+                )
+            competitive_data = list(period_reference or []) + competitors
+            pricing_suggestion = self.calculate_competitive_pricing(competitive_data, my_listing_beachfront, favorite_competitors)
+            
+            climate_adjustment = self.suggest_pricing(pricing_suggestion['suggested_price'], weather_data, checkin_date, checkout_date)
+            if weather_data:
+                pricing_suggestion['climate_adjusted_price'] = climate_adjustment['suggested_price']
+                pricing_suggestion['climate_factor'] = climate_adjustment['weather_factor']
+            
+            nights = self._calculate_nights(checkin_date, checkout_date)
+            final_price = pricing_suggestion.get('climate_adjusted_price', pricing_suggestion['suggested_price'])
+            return {
+                'checkin': checkin_date,
+                'checkout': checkout_date,
+                'type': period.get('type'),
+                'label': period.get('label', f"{checkin_date} a {checkout_date}"),
+                'nights': nights,
+                'suggested_price': pricing_suggestion['suggested_price'],
+                'climate_adjusted_price': pricing_suggestion.get('climate_adjusted_price'),
+                'final_price': final_price,
+                'total_period_price': round(final_price * nights, 2),
+                'avg_rain_probability': climate_adjustment['avg_rain_probability'] if weather_data else None,
+                'strategy': pricing_suggestion.get('strategy'),
+                'competitors_found': len(competitors),
+                'searches_completed': search.get('searches_completed', 0),
+                'partial': search.get('partial', False),
+                'reference_price': period_reference[0].get('price_per_night') if period_reference else None,
+                'pricing_suggestion': pricing_suggestion
+            }
+        
+        rows = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.period_workers, len(periods))))
+        try:
+            futures = {executor.submit(analyze_period, period): index for index, period in enumerate(periods)}
+            for future in as_completed(futures):
+                index = futures[future]
+                period = periods[index]
+                try:
+                    row = future.result()
+                except Exception as e:
+                    print(f"❌ Erro no período {period['checkin']} a {period['checkout']}: {e}")
+                    row = {
+                        'checkin': period['checkin'],
+                        'checkout': period['checkout'],
+                        'type': period.get('type'),
+                        'label': period.get('label', f"{period['checkin']} a {period['checkout']}"),
+                        'error': str(e)
+                    }
+                rows[index] = row
+                print(f"✅ Período {row['label']}: R$ {row.get('final_price', 0):.2f}/noite")
+                if progress:
+                    progress(period, row)
+        finally:
+            executor.shutdown(wait=True)
+        
+        price_matrix = [rows[index] for index in range(len(periods))]
+        return {
+            'listing_url': specific_listing_url,
+            'reference_listing': reference_listing,
+            'municipality': municipality,
+            'weather_data': weather_data,
+            'adults': adults,
+            'beachfront': my_listing_beachfront,
+            'price_matrix': price_matrix
+        }
+    
+    def start_automated_monitoring(self, my_listing_beachfront=True, listing_url=None, cadence_hours=12):
+        """
+        Inicia monitoramento automatizado 2x ao dia (cadence_hours = 12)
+        O anúncio é cadastrado no agendador de monitoramento compartilhado e este
+        processo executa os jobs enquanto for o líder
+        """
+        if not listing_url:
+            raise ValueError("Link do anúncio é obrigatório para o monitoramento")
+        
+        def run_analysis(job):
+            period = next_weekend()
+            print(f"\n🤖 Análise automática - {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+            fingerprint = self.get_listing_fingerprint(
+                job['listing_url'], period['checkin'], period['checkout'], job['adults'], job['beachfront']
+            )
+            if not scheduler.has_changed(job, fingerprint):
+                return 'unchanged'
+            self.run_competitive_analysis(period['checkin'], period['checkout'], job['beachfront'], job['adults'], job['listing_url'])
+            scheduler.save_fingerprint(job['listing_url'], fingerprint)
+            return 'ok'
         
-        # Agendar execução a cada 5 minutos
-        schedule.every(5).minutes.do(run_analysis)
+        scheduler = get_monitoring_scheduler(run_analysis, kind='cli')
+        if scheduler is None:
+            raise RuntimeError("Agendador de monitoramento indisponível (confira MONITORING_DB_PATH e MONITORING_LOCK_PATH)")
+        scheduler.upsert_job(listing_url, int(cadence_hours * 3600), beachfront=my_listing_beachfront)
         
         print("🤖 Monitoramento automático iniciado!")
-        print("⏰ Análises programadas a cada 5 minutos")
-        print("📧 Relatórios serão enviados para paulotestario@gmail.com")
+        print(f"⏰ Análises programadas a cada {cadence_hours:g} horas (primeira em até 1 minuto)")
+        print(f"📧 Relatórios serão enviados para {self.email_config['recipient_email']}")
+        if not scheduler.is_leader():
+            print("⏳ Outro processo já executa o monitoramento; este assume se ele parar")
         print("\n⚠️ Para parar o monitoramento, pressione Ctrl+C")
         
-        # Executar primeira análise imediatamente
-        print("\n🚀 Executando primeira análise...")
-        run_analysis()
-        
         # Loop de monitoramento
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(30)  # Verificar a cada 30 segundos
+            scheduler.run_forever()
         except KeyboardInterrupt:
+            scheduler.stop()
             print("\n\n🛑 Monitoramento automático interrompido pelo usuário")
 
+def render_email_report(payload):
+    """Monta o HTML de um relatório da fila de emails (roda na thread de envio)"""
+    generated_at = datetime.fromisoformat(payload['generated_at']) if payload.get('generated_at') else None
+    return AirbnbClimateScraper._create_email_html(
+        payload['analysis_results'], payload['competitive_data'], payload['pricing_suggestion'], generated_at
+    )
+
+class ScraperPool:
+    """
+    Instâncias de AirbnbClimateScraper reaproveitadas entre requisições
+    acquire() empresta um scraper ocioso (ou cria um novo até max_size; acima
+    disso espera) e o devolve ao sair do with, sem o estado da requisição.
+    Todos os scrapers do pool dividem o mesmo limitador por host.
+    Jobs em segundo plano esperam sem limite; handlers de requisição usam
+    acquire(timeout=pool.request_timeout) para não ficar presos atrás de
+    análises longas (TimeoutError quando o prazo acaba).
+    """
+    
+    # Atributos definidos pelos handlers em cada requisição
+    REQUEST_ATTRIBUTES = ('favorite_competitors',)
+    
+    def __init__(self, max_size=4, request_timeout=20):
+        self.max_size = max_size
+        self.request_timeout = request_timeout
+        self._idle = deque()
+        self._created = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self.rate_limiter = HostRateLimiter(float(os.getenv('SCRAPER_HOST_INTERVAL', '2')))
+        self._metrics = {'acquisitions': 0, 'waits': 0, 'peak_in_use': 0}
+    
+    @contextmanager
+    def acquire(self, timeout=None):
+        scraper = self._checkout(timeout)
+        try:
+            yield scraper
+        finally:
+            self._release(scraper)
+    
+    def _checkout(self, timeout):
+        with self._condition:
+            if not self._idle and self._created >= self.max_size:
+                self._metrics['waits'] += 1
+                if not self._condition.wait_for(lambda: self._idle, timeout):
+                    raise TimeoutError("Nenhum scraper disponível no pool")
+            if self._idle:
+                scraper = self._idle.pop()
+            else:
+                scraper = AirbnbClimateScraper()
+                scraper.rate_limiter = self.rate_limiter
+                self._created += 1
+            self._in_use += 1
+            self._metrics['acquisitions'] += 1
+            self._metrics['peak_in_use'] = max(self._metrics['peak_in_use'], self._in_use)
+            return scraper
+    
+    def _release(self, scraper):
+        for attribute in self.REQUEST_ATTRIBUTES:
+            if hasattr(scraper, attribute):
+                delattr(scraper, attribute)
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append(scraper)
+            self._condition.notify()
+    
+    def stats(self):
+        with self._condition:
+            stats = dict(self._metrics)
+            stats.update({
+                'max_size': self.max_size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle)
+            })
+        stats['http'] = get_http_pool_stats()
+        return stats
+
+# Pool global de scrapers
+scraper_pool = None
+_scraper_pool_lock = threading.Lock()
+
+def get_scraper_pool():
+    """
+    Retorna o pool de scrapers do processo
+    """
+    global scraper_pool
+    with _scraper_pool_lock:
+        if scraper_pool is None:
+            scraper_pool = ScraperPool(
+                int(os.getenv('SCRAPER_POOL_SIZE', '4')),
+                request_timeout=float(os.getenv('SCRAPER_POOL_TIMEOUT', '20'))
+            )
+    return scraper_pool
+
+def start_weather_refresh(interval=None):
+    """
+    Inicia a atualização em segundo plano das previsões guardadas no weather_store
+    (intervalo em segundos; padrão WEATHER_REFRESH_INTERVAL ou 3 horas). As páginas
+    vêm sempre da rede, sem passar pelo cache HTTP, e só o processo que detém o
+    lock WEATHER_REFRESH_LOCK_PATH atualiza
+    """
+    store = get_weather_store()
+    if store is None:
+        return False
+    interval = interval or int(os.getenv('WEATHER_REFRESH_INTERVAL', str(3 * 3600)))
+    lock_path = os.getenv('WEATHER_REFRESH_LOCK_PATH', os.path.join(tempfile.gettempdir(), 'hostlink_weather_refresh.lock'))
+    scraper = AirbnbClimateScraper()
+    return store.start_refresh(
+        lambda municipality: scraper._fetch_weather_forecast(municipality, refresh=True), interval, lock_path=lock_path
+    )
+
 if __name__ == "__main__":
     scraper = AirbnbClimateScraper()
     
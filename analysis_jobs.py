@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila de análises em segundo plano
+As análises sob demanda viram jobs gravados em SQLite e executados por um
+pool local de threads: a API devolve o id do job na hora e o andamento é
+consultado por polling ou acompanhado por SSE. Pedidos iguais que ainda
+estão na fila ou em execução são unidos em um único job.
+
+Vários processos (workers do gunicorn) podem dividir o mesmo arquivo: quem
+pega um job grava seu dono (host:pid) e um lease renovado enquanto o job
+roda. Só jobs com lease vencido (dono morto ou travado) voltam para a fila.
+"""
+
+import os
+import json
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+# Estados de um job
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED_STATUSES = (DONE, FAILED)
+
+class AnalysisJobQueue:
+    """
+    Fila de jobs em SQLite + threads de execução
+    handler(params, report) executa o job e devolve o resultado (dict);
+    report(stage, message, **data) registra um evento de progresso.
+    Os jobs ficam no banco, então qualquer processo que use o mesmo arquivo
+    pode consultar o andamento ou executar jobs pendentes.
+    """
+
+    def __init__(self, path: str, handler: Callable[[Dict, Callable], Dict], workers: int = 2,
+                 retention: int = 24 * 3600, poll_interval: float = 1.0, lease_seconds: float = 120):
+        self.path = path
+        self.handler = handler
+        self.workers = workers
+        self.retention = retention
+        self.poll_interval = poll_interval
+        # Jobs em execução têm o lease renovado a cada terço desse prazo
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        # Acorda os workers (job novo) e os leitores de SSE (evento novo)
+        self._changed = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._metrics = {'submitted': 0, 'coalesced': 0, 'completed': 0, 'failed': 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                job_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                events TEXT NOT NULL DEFAULT '[]',
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                lease_expires_at REAL
+            )
+        """)
+        # Bancos criados antes dos leases não têm as colunas de dono
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(analysis_jobs)").fetchall()]
+        if 'owner' not in columns:
+            self._conn.execute("ALTER TABLE analysis_jobs ADD COLUMN owner TEXT")
+        if 'lease_expires_at' not in columns:
+            self._conn.execute("ALTER TABLE analysis_jobs ADD COLUMN lease_expires_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_key ON analysis_jobs (job_key, status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, created_at)")
+        self._conn.commit()
+
+    def start(self, recover: bool = True):
+        """
+        Inicia os workers; com recover, jobs cujo processo parou (lease vencido)
+        voltam para a fila. Jobs de processos vivos não são tocados
+        """
+        if recover:
+            self.recover_expired()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, daemon=True, name=f'analysis-worker-{index}')
+            thread.start()
+            self._threads.append(thread)
+        if self.workers:
+            thread = threading.Thread(target=self._heartbeat_loop, daemon=True, name='analysis-heartbeat')
+            thread.start()
+            self._threads.append(thread)
+        print(f"⚙️ Fila de análises iniciada com {self.workers} worker(s)")
+
+    def recover_expired(self) -> int:
+        """Devolve para a fila os jobs em execução com lease vencido; retorna quantos"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE analysis_jobs SET status = ?, started_at = NULL, owner = NULL, lease_expires_at = NULL "
+                "WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (QUEUED, RUNNING, time.time())
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            print(f"🔁 {cursor.rowcount} análise(s) interrompida(s) voltaram para a fila")
+        return cursor.rowcount
+
+    def submit(self, params: Dict, job_key: str) -> Dict:
+        """
+        Enfileira uma análise; se já houver um job igual na fila ou em execução,
+        devolve esse job em vez de criar outro
+        Retorna {'job_id', 'status', 'coalesced'}
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status FROM analysis_jobs WHERE job_key = ? AND status IN (?, ?) "
+                "ORDER BY created_at LIMIT 1", (job_key, QUEUED, RUNNING)
+            ).fetchone()
+            if row:
+                self._metrics['coalesced'] += 1
+                return {'job_id': row[0], 'status': row[1], 'coalesced': True}
+
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO analysis_jobs (id, job_key, status, params, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, job_key, QUEUED, json.dumps(params), time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM analysis_jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, time.time() - self.retention)
+            )
+            self._conn.commit()
+            self._metrics['submitted'] += 1
+        self._notify()
+        return {'job_id': job_id, 'status': QUEUED, 'coalesced': False}
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Estado, eventos e (quando terminado) resultado do job"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, params, events, result, error, created_at, started_at, finished_at "
+                "FROM analysis_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'status': row[1],
+            'params': json.loads(row[2]),
+            'events': json.loads(row[3]),
+            'result': json.loads(row[4]) if row[4] else None,
+            'error': row[5],
+            'created_at': row[6],
+            'started_at': row[7],
+            'finished_at': row[8]
+        }
+
+    def wait_for_change(self, timeout: float):
+        """Bloqueia até algum job mudar neste processo (ou até o timeout)"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _claim_next(self) -> Optional[Dict]:
+        """Marca como em execução o job mais antigo da fila (atômico entre processos)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, params FROM analysis_jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            cursor = self._conn.execute(
+                "UPDATE analysis_jobs SET status = ?, started_at = ?, owner = ?, lease_expires_at = ? "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, now, self.owner, now + self.lease_seconds, row[0], QUEUED)
+            )
+            self._conn.commit()
+        if cursor.rowcount != 1:
+            return None
+        return {'job_id': row[0], 'params': json.loads(row[1])}
+
+    def _add_event(self, job_id: str, event: Dict):
+        with self._lock:
+            row = self._conn.execute("SELECT events FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+            events = json.loads(row[0]) if row else []
+            events.append(event)
+            self._conn.execute("UPDATE analysis_jobs SET events = ? WHERE id = ?", (json.dumps(events, default=str), job_id))
+            self._conn.commit()
+        self._notify()
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE analysis_jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                "WHERE id = ? AND owner = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, time.time(),
+                 job_id, self.owner)
+            )
+            self._conn.commit()
+            self._metrics['completed' if status == DONE else 'failed'] += 1
+        if cursor.rowcount != 1:
+            print(f"⚠️ Job de análise {job_id} foi assumido por outro processo (lease vencido); resultado descartado")
+        self._notify()
+
+    def _renew_leases(self) -> int:
+        """Estende o lease dos jobs que este processo está executando"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE analysis_jobs SET lease_expires_at = ? WHERE owner = ? AND status = ?",
+                (time.time() + self.lease_seconds, self.owner, RUNNING)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            try:
+                self._renew_leases()
+                # Jobs de processos que morreram voltam para a fila sem esperar um reinício
+                if self.recover_expired():
+                    self._notify()
+            except Exception as e:
+                print(f"⚠️ Erro ao renovar leases das análises: {e}")
+
+    def _worker_loop(self):
+        while True:
+            job = self._claim_next()
+            if job is None:
+                # Espera um job novo deste processo ou confere a fila de novo (jobs de outros processos)
+                self.wait_for_change(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _run(self, job: Dict):
+        job_id = job['job_id']
+
+        def report(stage, message, **data):
+            self._add_event(job_id, {'stage': stage, 'message': message, 'time': time.time(), 'data': data})
+
+        try:
+            report('started', 'Análise iniciada')
+            result = self.handler(job['params'], report)
+            self._finish(job_id, DONE, result=result)
+        except Exception as e:
+            print(f"❌ Erro no job de análise {job_id}: {e}")
+            self._finish(job_id, FAILED, error=str(e))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status"
+            ).fetchall())
+            metrics = dict(self._metrics)
+        metrics.update({
+            'workers': self.workers,
+            'queued': counts.get(QUEUED, 0),
+            'running': counts.get(RUNNING, 0),
+            'done': counts.get(DONE, 0),
+            'failed': counts.get(FAILED, 0)
+        })
+        return metrics
+
+# Fila global do processo
+analysis_queue = None
+_analysis_queue_lock = threading.Lock()
+
+def get_analysis_queue(handler: Optional[Callable[[Dict, Callable], Dict]] = None) -> Optional[AnalysisJobQueue]:
+    """
+    Retorna a fila de análises do processo; na primeira chamada, handler é
+    obrigatório e os workers são iniciados
+    """
+    global analysis_queue
+    with _analysis_queue_lock:
+        if analysis_queue is None and handler is not None:
+            try:
+                analysis_queue = AnalysisJobQueue(
+                    os.getenv('ANALYSIS_JOBS_PATH', os.path.join(tempfile.gettempdir(), 'hostlink_analysis_jobs.sqlite3')),
+                    handler,
+                    workers=int(os.getenv('ANALYSIS_WORKERS', '2')),
+                    retention=int(os.getenv('ANALYSIS_JOB_RETENTION', str(24 * 3600))),
+                    lease_seconds=float(os.getenv('ANALYSIS_JOB_LEASE', '120'))
+                )
+                analysis_queue.start()
+            except Exception as e:
+                print(f"⚠️ Fila de análises indisponível: {e}")
+                return None
+    return analysis_queue
@@ -5,17 +5,15 @@ import os
 # Adicionar o diretório pai ao path para importar módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from airbnb_scraper import AirbnbClimateScraper
-from datetime import datetime, timedelta
-import threading
-import time
+from airbnb_scraper import AirbnbClimateScraper, get_scraper_pool
+from monitoring_scheduler import get_monitoring_scheduler, next_weekend
+from datetime import datetime
 
 app = Flask(__name__, 
            template_folder='../templates',
            static_folder='../static')
 
 # Variáveis globais para monitoramento
-monitoring_active = False
 latest_analysis = None
 analysis_history = []
 
@@ -94,79 +92,74 @@ def similarity_analysis():
             'error': str(e)
         }), 500
 
-@app.route('/api/monitoring/start', methods=['POST'])
-def start_monitoring():
-    global monitoring_active, latest_analysis
+def run_monitoring_job(job):
+    """Executa um job do agendador de monitoramento (próximo final de semana do anúncio)"""
+    global latest_analysis, analysis_history
     
-    if monitoring_active:
-        return jsonify({
-            'success': False,
-            'message': 'Monitoramento já está ativo'
-        })
+    period = next_weekend()
+    scheduler = get_monitoring_scheduler(run_monitoring_job, kind='api')
+    with get_scraper_pool().acquire() as scraper:
+        # Entradas iguais às da última análise: só heartbeat
+        fingerprint = scraper.get_listing_fingerprint(
+            job['listing_url'], period['checkin'], period['checkout'], job['adults'], job['beachfront']
+        )
+        if scheduler and not scheduler.has_changed(job, fingerprint):
+            return 'unchanged'
+        result = scraper.run_competitive_analysis(
+            period['checkin'], period['checkout'], job['beachfront'], job['adults'], job['listing_url']
+        )
+    if scheduler:
+        scheduler.save_fingerprint(job['listing_url'], fingerprint)
+    
+    # Atualizar dados globais
+    latest_analysis = {
+        'timestamp': datetime.now().isoformat(),
+        'period': f"{period['checkin']} a {period['checkout']}",
+        'result': result
+    }
+    
+    # Adicionar ao histórico (manter apenas últimas 10)
+    analysis_history.append(latest_analysis)
+    if len(analysis_history) > 10:
+        analysis_history.pop(0)
     
+    print(f"✅ Análise automática concluída: {datetime.now()}")
+    return 'ok'
+
+@app.route('/api/monitoring/start', methods=['POST'])
+def start_monitoring():
     try:
-        data = request.get_json()
-        beachfront = data.get('beachfront', False)
-        
-        monitoring_active = True
+        data = request.get_json() or {}
+        listing_url = (data.get('listing_url') or '').strip()
+        if not listing_url:
+            return jsonify({
+                'success': False,
+                'message': 'Link do anúncio é obrigatório para o monitoramento'
+            }), 400
         
-        def monitor_loop():
-            global monitoring_active, latest_analysis, analysis_history
-            
-            scraper = AirbnbClimateScraper()
-            
-            while monitoring_active:
-                try:
-                    # Calcular próximo final de semana
-                    today = datetime.now()
-                    days_until_friday = (4 - today.weekday()) % 7
-                    if days_until_friday == 0 and today.weekday() >= 4:
-                        days_until_friday = 7
-                    
-                    next_friday = today + timedelta(days=days_until_friday)
-                    next_sunday = next_friday + timedelta(days=2)
-                    
-                    checkin = next_friday.strftime('%Y-%m-%d')
-                    checkout = next_sunday.strftime('%Y-%m-%d')
-                    
-                    # Executar análise
-                    result = scraper.run_competitive_analysis(checkin, checkout, beachfront)
-                    
-                    # Atualizar dados globais
-                    latest_analysis = {
-                        'timestamp': datetime.now().isoformat(),
-                        'period': f"{checkin} a {checkout}",
-                        'result': result
-                    }
-                    
-                    # Adicionar ao histórico (manter apenas últimas 10)
-                    analysis_history.append(latest_analysis)
-                    if len(analysis_history) > 10:
-                        analysis_history.pop(0)
-                    
-                    print(f"✅ Análise automática concluída: {datetime.now()}")
-                    
-                    # Aguardar 5 minutos
-                    for _ in range(300):  # 300 segundos = 5 minutos
-                        if not monitoring_active:
-                            break
-                        time.sleep(1)
-                        
-                except Exception as e:
-                    print(f"❌ Erro na análise automática: {e}")
-                    time.sleep(60)  # Aguardar 1 minuto em caso de erro
+        scheduler = get_monitoring_scheduler(run_monitoring_job, kind='api')
+        if scheduler is None:
+            return jsonify({
+                'success': False,
+                'message': 'Agendador de monitoramento indisponível'
+            }), 503
         
-        # Iniciar thread de monitoramento
-        monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
-        monitor_thread.start()
+        # Job salvo no agendador compartilhado; só o processo líder executa
+        job = scheduler.upsert_job(
+            listing_url,
+            cadence_seconds=int(float(data.get('cadence_hours', 12)) * 3600),
+            beachfront=data.get('beachfront', False),
+            adults=int(data.get('adults', 2))
+        )
+        scheduler.start()
         
         return jsonify({
             'success': True,
-            'message': 'Monitoramento iniciado com sucesso'
+            'message': 'Monitoramento iniciado com sucesso',
+            'job': job
         })
         
     except Exception as e:
-        monitoring_active = False
         return jsonify({
             'success': False,
             'error': str(e)
@@ -174,26 +167,36 @@ def start_monitoring():
 
 @app.route('/api/monitoring/stop', methods=['POST'])
 def stop_monitoring():
-    global monitoring_active
-    
-    monitoring_active = False
+    data = request.get_json(silent=True) or {}
+    scheduler = get_monitoring_scheduler(run_monitoring_job, kind='api')
+    stopped = scheduler.disable_job((data.get('listing_url') or '').strip() or None) if scheduler else 0
     
     return jsonify({
         'success': True,
-        'message': 'Monitoramento interrompido'
+        'message': 'Monitoramento interrompido',
+        'stopped': stopped
     })
 
 @app.route('/api/monitoring/status')
 def monitoring_status():
-    global monitoring_active, latest_analysis, analysis_history
+    global latest_analysis, analysis_history
+    
+    scheduler = get_monitoring_scheduler(run_monitoring_job, kind='api')
     
     return jsonify({
-        'active': monitoring_active,
+        'active': bool(scheduler and scheduler.has_active_jobs()),
+        'jobs': scheduler.list_jobs() if scheduler else [],
         'latest_analysis': latest_analysis,
         'history_count': len(analysis_history),
         'history': analysis_history[-5:] if analysis_history else []  # Últimas 5 análises
     })
 
+# Agendador do monitoramento automático (só o processo líder executa os jobs)
+if os.getenv('MONITORING_SCHEDULER_ENABLED', '1') == '1':
+    monitoring_scheduler = get_monitoring_scheduler(run_monitoring_job, kind='api')
+    if monitoring_scheduler:
+        monitoring_scheduler.start()
+
 # Handler para Vercel
 def handler(request):
     return app(request.environ, lambda status, headers: None)
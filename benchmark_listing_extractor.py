@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da extração de dados de um anúncio do Airbnb
+Compara a leitura do estado JSON embutido (_extract_structured_listing) com o
+caminho antigo por regex sobre o texto da página, usando páginas salvas em disco.
+
+Uso:
+    python benchmark_listing_extractor.py anuncio1.html anuncio2.html ...
+    python benchmark_listing_extractor.py            # usa uma página sintética
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from airbnb_scraper import AirbnbClimateScraper
+
+REPETICOES = 10
+NOITES = 2
+
+def pagina_sintetica(blocos=300):
+    """Gera uma página de anúncio com estado JSON embutido, parecida com a do Airbnb"""
+    estado = {
+        'niobeMinimalClientData': [['StaysPdpSections', {'data': {'presentation': {'stayProductDetailPage': {'sections': {
+            'metadata': {'sharingConfig': {
+                'title': 'Casa pé na areia em Itacuruçá', 'location': 'Mangaratiba',
+                'personCapacity': 6, 'starRating': 4.87, 'reviewCount': 132, 'propertyType': 'Casa'
+            }},
+            'sections': [{'section': {'structuredDisplayPrice': {'primaryLine': {
+                'price': 'R$ 1.079', 'qualifier': 'por 2 noites'
+            }}}}]
+        }}}}}]]
+    }
+    conteudo = ''.join(f'<div><span>Comodidade {i}</span><p>Descrição {i} com vista</p></div>' for i in range(blocos))
+    return (
+        '<html><head><title>Casa pé na areia - Mangaratiba</title></head><body>'
+        f'<h1>Casa pé na areia em Itacuruçá</h1><h2>2 noites em Mangaratiba</h2>{conteudo}'
+        '<div><span>6 hóspedes</span><span>3 quartos</span><span>2 banheiros</span></div>'
+        '<div>R$ 1.079 por 2 noites</div>'
+        f'<script id="data-deferred-state-0" type="application/json">{json.dumps(estado)}</script>'
+        '</body></html>'
+    )
+
+def medir(funcao, repeticoes=REPETICOES):
+    """Tempo médio em milissegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000, resultado
+
+def caminho_regex(scraper, soup):
+    """Extração antiga: texto da página + município + detalhes + cascata de regex de preço"""
+    listing_data = {'max_guests': 2, 'bedrooms': 1, 'bathrooms': 1}
+    page_text = soup.get_text()
+    listing_data['municipality'] = scraper._extract_municipality(soup)
+    scraper._extract_listing_details(soup, listing_data)
+    scraper._extract_price_from_page(soup, page_text, NOITES, listing_data)
+    return listing_data
+
+def caminho_json(scraper, html):
+    """Extração nova: estado JSON embutido"""
+    listing_data = {}
+    structured = scraper._extract_structured_listing(html)
+    scraper._apply_structured_price(structured, NOITES, listing_data)
+    listing_data.update({k: v for k, v in structured.items() if k != 'price'})
+    return listing_data
+
+def benchmark(nome, html):
+    scraper = AirbnbClimateScraper()
+    soup = scraper._parse_html(html)
+    print(f"\n📄 {nome} ({len(html) // 1024} KB)")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        tempo_regex, dados_regex = medir(lambda: caminho_regex(scraper, soup))
+        tempo_json, dados_json = medir(lambda: caminho_json(scraper, html))
+
+    print(f"   Regex sobre o texto: {tempo_regex:8.2f} ms | {dados_regex.get('price_per_night', 0):.2f}/noite | {dados_regex.get('municipality')}")
+    if not dados_json:
+        print("   ⚠️ Página sem estado JSON embutido: o scraper usaria só o caminho por regex")
+        return
+    print(f"   Estado JSON:         {tempo_json:8.2f} ms | {dados_json.get('price_per_night', 0):.2f}/noite | {dados_json.get('municipality')}")
+    print(f"   ⚡ Ganho: {tempo_regex / tempo_json:.1f}x")
+
+if __name__ == '__main__':
+    print("⏱️ BENCHMARK DA EXTRAÇÃO DE ANÚNCIO")
+    print("=" * 50)
+
+    arquivos = sys.argv[1:]
+    if not arquivos:
+        print("⚠️ Nenhuma página salva informada, usando página sintética")
+        benchmark('anuncio_sintetico', pagina_sintetica())
+
+    for arquivo in arquivos:
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            benchmark(os.path.basename(arquivo), f.read())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do parser de resultados de busca do Airbnb
+Compara html.parser x lxml e a busca de containers em passada única x os
+cinco find_all antigos, usando páginas de busca salvas em disco.
+
+Uso:
+    python benchmark_search_parser.py pagina1.html pagina2.html ...
+    python benchmark_search_parser.py            # usa uma página sintética
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bs4 import BeautifulSoup
+from airbnb_scraper import AirbnbClimateScraper
+
+REPETICOES = 10
+
+def pagina_sintetica(total=40):
+    """Gera uma página parecida com a listagem de busca do Airbnb"""
+    cards = []
+    for i in range(total):
+        cards.append(
+            f'<div class="c4mnd7m listing-card" data-testid="card-container">'
+            f'<a href="/rooms/{100000 + i}?adults=2" aria-label="Anúncio {i}"><span>Casa {i} em Itacuruçá</span></a>'
+            f'<div><span>{"Frente à praia, pé na areia" if i % 3 == 0 else "Casa com piscina"}</span>'
+            f'<img src="https://a0.muscache.com/im/pictures/{i}.jpg" alt="vista para o mar">'
+            f'<span>R$ {150 + i * 10} por noite</span><span>4,{i % 10} ({i * 7} avaliações)</span></div></div>'
+        )
+    menu = ''.join(
+        '<div class="header"><ul>' + ''.join(f'<li><a href="/x{j}">Link {j}</a></li>' for j in range(30)) + '</ul></div>'
+        for _ in range(20)
+    )
+    return f'<html><head><title>Airbnb</title></head><body>{menu}<main>{"".join(cards)}</main>{menu}</body></html>'
+
+def containers_legado(soup):
+    """Busca de containers como era antes: um find_all por seletor"""
+    for selector in AirbnbClimateScraper.CONTAINER_SELECTORS:
+        if 'attrs' in selector:
+            containers = soup.find_all(selector['tag'], attrs=selector['attrs'])
+        else:
+            containers = soup.find_all(selector['tag'], class_=selector['class'])
+        if containers:
+            return containers
+    return []
+
+def medir(funcao, repeticoes=REPETICOES):
+    """Tempo médio em milissegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000, resultado
+
+def benchmark(nome, html):
+    scraper = AirbnbClimateScraper()
+    print(f"\n📄 {nome} ({len(html) // 1024} KB)")
+
+    tempos = {}
+    for parser in ('html.parser', 'lxml'):
+        tempo_parse, soup = medir(lambda: BeautifulSoup(html, parser))
+        tempo_legado, _ = medir(lambda: containers_legado(soup))
+        tempo_passada, _ = medir(lambda: scraper._find_listing_containers(soup))
+        with contextlib.redirect_stdout(io.StringIO()):
+            tempo_extracao, anuncios = medir(lambda: scraper._process_search_results(soup, nome))
+        tempos[parser] = tempo_parse + tempo_extracao
+        print(f"   {parser:<12} parse {tempo_parse:8.1f} ms | containers {tempo_legado:6.1f} ms (5x find_all) "
+              f"x {tempo_passada:6.1f} ms (novo) | extração {tempo_extracao:7.1f} ms | {len(anuncios)} anúncios")
+
+    print(f"   ⚡ Ganho total com lxml: {tempos['html.parser'] / tempos['lxml']:.2f}x")
+
+if __name__ == '__main__':
+    print("⏱️ BENCHMARK DO PARSER DE BUSCA")
+    print("=" * 50)
+
+    arquivos = sys.argv[1:]
+    if not arquivos:
+        print("⚠️ Nenhuma página salva informada, usando página sintética")
+        benchmark('pagina_sintetica', pagina_sintetica())
+
+    for arquivo in arquivos:
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            benchmark(os.path.basename(arquivo), f.read())
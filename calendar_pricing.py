@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Preços e clima do calendário mensal
+Monta o mês inteiro a partir de uma única fotografia da concorrência (última
+análise ou uma análise do anúncio informado) e de uma única previsão do tempo,
+aplicando os fatores de cada dia (fim de semana, feriado, alta temporada e
+chuva). O resultado do mês fica em cache.
+"""
+
+import os
+import threading
+from calendar import monthrange
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from airbnb_scraper import AirbnbClimateScraper
+from database import CatalogCache
+from dynamic_pricing_system import DynamicPricingSystem
+
+# Acréscimos por tipo de período (o fim de semana já entra em suggest_pricing)
+PERIOD_FACTORS = {
+    'holiday': 1.2,
+    'high_season': 1.1
+}
+
+# Probabilidade média de chuva para dias além do horizonte da previsão
+DEFAULT_RAIN_PROBABILITY = 30
+
+DEFAULT_BASE_PRICE = 200
+
+class CalendarPricingService:
+    """
+    Calendário de preços por mês: uma fotografia da concorrência e uma previsão
+    do tempo por mês, preços diários derivados delas e resultado em cache
+    """
+
+    def __init__(self, ttl: float = 1800, max_entries: int = 64):
+        self.cache = CatalogCache(ttl=ttl, max_entries=max_entries)
+        self.scraper = AirbnbClimateScraper()
+        # Uma única montagem por vez: pedidos simultâneos do mesmo mês aproveitam o cache
+        self._build_lock = threading.Lock()
+
+    def get_month(self, year: int, month: int, snapshot: Optional[Dict] = None,
+                  listing_url: Optional[str] = None) -> Dict:
+        """
+        Retorna os dias do mês com preço, desconto e clima
+        snapshot: análise competitiva já feita (ex.: a última análise da aplicação)
+        listing_url: anúncio a analisar quando não houver snapshot
+        """
+        cache_key = self._cache_key(year, month, snapshot, listing_url)
+        cached = self.cache.get(cache_key)
+        if cached:
+            cached['cached'] = True
+            return cached
+
+        with self._build_lock:
+            cached = self.cache.get(cache_key)
+            if cached:
+                cached['cached'] = True
+                return cached
+
+            result = self._build_month(year, month, snapshot, listing_url)
+            self.cache.set(cache_key, result)
+        result['cached'] = False
+        return result
+
+    @staticmethod
+    def _cache_key(year, month, snapshot, listing_url):
+        pricing = (snapshot or {}).get('pricing_suggestion') or {}
+        return (
+            year, month, listing_url or '',
+            pricing.get('suggested_price'), (snapshot or {}).get('timestamp')
+        )
+
+    def _competitive_snapshot(self, year, month, snapshot, listing_url) -> Dict:
+        """
+        Preço base, desconto e município do mês: da análise recebida ou de uma
+        única análise do anúncio (sem e-mail), ou valores padrão
+        """
+        if snapshot and snapshot.get('pricing_suggestion'):
+            pricing = snapshot['pricing_suggestion']
+            municipality = snapshot.get('extracted_municipality')
+            if not municipality and snapshot.get('competitive_data'):
+                municipality = snapshot['competitive_data'][0].get('municipality')
+            return {
+                'source': 'latest_analysis',
+                'base_price': pricing.get('suggested_price') or DEFAULT_BASE_PRICE,
+                'discount': pricing.get('discount_percentage', 0),
+                'municipality': municipality
+            }
+
+        if listing_url:
+            try:
+                first_day = max(datetime(year, month, 1), datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+                check_in = first_day.strftime('%Y-%m-%d')
+                check_out = (first_day + timedelta(days=1)).strftime('%Y-%m-%d')
+                competitive_data = self.scraper.analyze_specific_listing(listing_url, check_in, check_out)
+                pricing = self.scraper.calculate_competitive_pricing(competitive_data)
+                return {
+                    'source': 'listing_analysis',
+                    'base_price': pricing.get('suggested_price') or DEFAULT_BASE_PRICE,
+                    'discount': pricing.get('discount_percentage', 0),
+                    'municipality': competitive_data[0].get('municipality') if competitive_data else None
+                }
+            except Exception as e:
+                print(f"❌ Erro ao analisar anúncio para o calendário: {e}")
+
+        return {'source': 'default', 'base_price': DEFAULT_BASE_PRICE, 'discount': 0, 'municipality': None}
+
+    def _build_month(self, year, month, snapshot, listing_url) -> Dict:
+        competitive = self._competitive_snapshot(year, month, snapshot, listing_url)
+        weather_data = self.scraper.get_weather_forecast(competitive['municipality']) or []
+        forecast_by_date = {w['date']: w for w in weather_data}
+
+        _, days_in_month = monthrange(year, month)
+        calendar_data = []
+
+        for day in range(1, days_in_month + 1):
+            date_obj = datetime(year, month, day)
+            check_in = date_obj.strftime('%Y-%m-%d')
+            check_out = (date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
+
+            # Dias fora do horizonte da previsão usam a probabilidade média
+            day_weather = [
+                forecast_by_date.get(date, {'date': date, 'rain_probability': DEFAULT_RAIN_PROBABILITY})
+                for date in (check_in, check_out)
+            ]
+            pricing = self.scraper.suggest_pricing(competitive['base_price'], day_weather, check_in, check_out)
+
+            period_type = DynamicPricingSystem._get_period_type(date_obj)
+            price = pricing['suggested_price'] * PERIOD_FACTORS.get(period_type, 1.0)
+            rain_probability = forecast_by_date.get(check_in, {}).get('rain_probability', DEFAULT_RAIN_PROBABILITY)
+            weather_icon, weather_class = self._weather_icon(rain_probability)
+
+            calendar_data.append({
+                'day': day,
+                'date': check_in,
+                'price': int(price),
+                'rain_probability': rain_probability,
+                'discount': competitive['discount'],
+                'weather_icon': weather_icon,
+                'weather_class': weather_class,
+                'is_weekend': date_obj.weekday() >= 5,
+                'period_type': period_type,
+                'has_forecast': check_in in forecast_by_date
+            })
+
+        return {
+            'data': calendar_data,
+            'month': month,
+            'year': year,
+            'source': competitive['source'],
+            'base_price': competitive['base_price'],
+            'municipality': competitive['municipality'],
+            'generated_at': datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def _weather_icon(rain_probability):
+        """Ícone e classe CSS do clima no calendário"""
+        if rain_probability <= 30:
+            return 'fas fa-sun', 'sun-icon'
+        if rain_probability <= 60:
+            return 'fas fa-cloud-sun', 'cloud-icon'
+        return 'fas fa-cloud-rain', 'rain-icon'
+
+# Instância global do serviço de calendário
+calendar_pricing_service = None
+_calendar_pricing_lock = threading.Lock()
+
+def get_calendar_pricing_service() -> CalendarPricingService:
+    """
+    Retorna o serviço de calendário do processo
+    """
+    global calendar_pricing_service
+    with _calendar_pricing_lock:
+        if calendar_pricing_service is None:
+            calendar_pricing_service = CalendarPricingService(
+                ttl=float(os.getenv('CALENDAR_CACHE_TTL', '1800')),
+                max_entries=int(os.getenv('CALENDAR_CACHE_MAX_ENTRIES', '64'))
+            )
+    return calendar_pricing_service
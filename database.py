@@ -6,14 +6,189 @@ Gerencia todas as operações de banco de dados do HostLink
 """
 
 import os
-from datetime import datetime
-from typing import List, Dict, Optional
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Iterable, Callable
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
+class AvailabilityEngine:
+    """
+    Motor de disponibilidade em memória
+    Mantém a ocupação diária de vários anúncios numa janela de datas e responde
+    consultas de disponibilidade sem novas idas ao banco.
+    Mesma regra de check_availability: uma reserva ocupa de checkin a checkout
+    (inclusive) e uma data só fica bloqueada se houver linha com is_available = FALSE.
+    """
+
+    BUSY = 1
+    FREE = 0
+
+    def __init__(self, window_start: str, window_end: str):
+        self.window_start = datetime.strptime(window_start[:10], '%Y-%m-%d').date()
+        self.window_end = datetime.strptime(window_end[:10], '%Y-%m-%d').date()
+        self.total_days = max((self.window_end - self.window_start).days + 1, 0)
+        self._occupancy: Dict[int, bytearray] = {}
+
+    def _index(self, date_str: str) -> int:
+        """Converte uma data YYYY-MM-DD no índice do dia dentro da janela"""
+        return (datetime.strptime(str(date_str)[:10], '%Y-%m-%d').date() - self.window_start).days
+
+    def _date_str(self, index: int) -> str:
+        return (self.window_start + timedelta(days=index)).strftime('%Y-%m-%d')
+
+    def _row(self, listing_id: int) -> bytearray:
+        row = self._occupancy.get(listing_id)
+        if row is None:
+            row = bytearray(self.total_days)
+            self._occupancy[listing_id] = row
+        return row
+
+    def _mark_busy(self, listing_id: int, start_index: int, end_index: int):
+        start_index = max(start_index, 0)
+        end_index = min(end_index, self.total_days - 1)
+        if start_index > end_index:
+            return
+        self._row(listing_id)[start_index:end_index + 1] = b'\x01' * (end_index - start_index + 1)
+
+    def add_listing(self, listing_id: int):
+        """Registra um anúncio sem reservas nem bloqueios (totalmente livre)"""
+        self._row(listing_id)
+
+    def add_booking(self, listing_id: int, checkin_date: str, checkout_date: str):
+        """Marca o intervalo de uma reserva como ocupado"""
+        self._mark_busy(listing_id, self._index(checkin_date), self._index(checkout_date))
+
+    def add_blocked_date(self, listing_id: int, date: str):
+        """Marca uma data bloqueada pelo anfitrião (is_available = FALSE)"""
+        index = self._index(date)
+        self._mark_busy(listing_id, index, index)
+
+    def is_available(self, listing_id: int, start_date: str, end_date: str) -> bool:
+        """Verifica se todas as datas do período estão livres"""
+        row = self._occupancy.get(listing_id)
+        if row is None:
+            return True
+        start_index = max(self._index(start_date), 0)
+        end_index = min(self._index(end_date), self.total_days - 1)
+        if start_index > end_index:
+            return True
+        return row.find(self.BUSY, start_index, end_index + 1) == -1
+
+    def get_next_available_date(self, listing_id: int, from_date: str, max_days: int = 365) -> Optional[str]:
+        """Primeira data livre a partir de from_date (busca limitada a max_days)"""
+        start_index = self._index(from_date)
+        limit = min(start_index + max_days, self.total_days)
+        if start_index < 0 or start_index >= limit:
+            return None
+        row = self._occupancy.get(listing_id)
+        if row is None:
+            return self._date_str(start_index)
+        found = row.find(self.FREE, start_index, limit)
+        return self._date_str(found) if found != -1 else None
+
+    def get_available_period(self, listing_id: int, from_date: str, max_days: int = 365) -> Optional[Dict]:
+        """Primeiro período contínuo de datas livres a partir de from_date"""
+        start_index = self._index(from_date)
+        limit = min(start_index + max_days, self.total_days)
+        if start_index < 0 or start_index >= limit:
+            return None
+        row = self._occupancy.get(listing_id)
+        if row is None:
+            period_start, period_end = start_index, limit - 1
+        else:
+            period_start = row.find(self.FREE, start_index, limit)
+            if period_start == -1:
+                return None
+            next_busy = row.find(self.BUSY, period_start, limit)
+            period_end = (next_busy if next_busy != -1 else limit) - 1
+        return {
+            'start_date': self._date_str(period_start),
+            'end_date': self._date_str(period_end)
+        }
+
+    def day_map(self, listing_id: int, start_date: str = None, end_date: str = None) -> Dict[str, bool]:
+        """Mapa data -> disponível para cada dia do intervalo (padrão: janela inteira)"""
+        start_index = max(self._index(start_date), 0) if start_date else 0
+        end_index = min(self._index(end_date), self.total_days - 1) if end_date else self.total_days - 1
+        row = self._occupancy.get(listing_id) or bytearray(self.total_days)
+        return {
+            self._date_str(index): row[index] == self.FREE
+            for index in range(start_index, end_index + 1)
+        }
+
+    def summarize(self, listing_id: int, start_date: str, end_date: str, max_days: int = 365) -> Dict:
+        """
+        Resume a disponibilidade de um anúncio para um período de busca:
+        disponível no período, período contínuo e próxima data livre
+        """
+        available = self.is_available(listing_id, start_date, end_date)
+        return {
+            'available': available,
+            'available_period': self.get_available_period(listing_id, start_date, max_days),
+            'next_available_date': None if available else self.get_next_available_date(listing_id, start_date, max_days)
+        }
+
+
+class CatalogCache:
+    """
+    Cache local do processo para o catálogo público
+    Entradas expiram após ttl segundos, as menos usadas saem quando o limite
+    é atingido e qualquer escrita em anúncios, agenda ou reservas limpa o cache
+    """
+
+    def __init__(self, ttl: float = 30, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Retorna uma cópia do valor em cache ou None se ausente/expirado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl': self.ttl
+            }
+
+
 class HostLinkDatabase:
     def __init__(self):
         self.supabase_url = os.getenv('SUPABASE_URL')
@@ -23,6 +198,98 @@ class HostLinkDatabase:
             raise ValueError("Credenciais do Supabase não configuradas. Verifique o arquivo .env")
         
         self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        
+        # Tamanho dos lotes de IDs em filtros in_() e das páginas de leitura em massa
+        self.bulk_batch_size = int(os.getenv('SUPABASE_BULK_BATCH_SIZE', '200'))
+        self.page_size = int(os.getenv('SUPABASE_PAGE_SIZE', '1000'))
+        self.write_chunk_size = int(os.getenv('SUPABASE_WRITE_CHUNK_SIZE', '500'))
+        
+        # Cache do catálogo público (invalidado em toda escrita de anúncio, agenda ou reserva)
+        self.catalog_cache = CatalogCache(
+            ttl=float(os.getenv('CATALOG_CACHE_TTL', '30')),
+            max_entries=int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', '128'))
+        )
+    
+    def invalidate_catalog_cache(self):
+        """Descarta o catálogo público em cache após uma escrita"""
+        self.catalog_cache.invalidate()
+    
+    def select_in_batches(self, table: str, columns: str, column: str, values: Iterable,
+                           apply_filters: Callable = None, batch_size: int = None) -> List[Dict]:
+        """
+        Busca em massa filtrando column IN values
+        Divide os valores em lotes (limite de URL do PostgREST) e pagina cada lote
+        com range() para não esbarrar no limite de linhas por resposta
+        """
+        values = list(dict.fromkeys(v for v in values if v is not None))
+        batch_size = batch_size or self.bulk_batch_size
+        rows = []
+        
+        for i in range(0, len(values), batch_size):
+            chunk = values[i:i + batch_size]
+            offset = 0
+            while True:
+                query = self.supabase.table(table).select(columns).in_(column, chunk)
+                if apply_filters:
+                    query = apply_filters(query)
+                result = query.order('id').range(offset, offset + self.page_size - 1).execute()
+                data = result.data or []
+                rows.extend(data)
+                if len(data) < self.page_size:
+                    break
+                offset += self.page_size
+        
+        return rows
+    
+    def bulk_write(self, table: str, rows: List[Dict], on_conflict: str = None,
+                    chunk_size: int = None, max_retries: int = 2) -> Dict:
+        """
+        Grava várias linhas em lotes: insert, ou upsert quando on_conflict é informado
+        Linhas com colunas diferentes vão em lotes separados (o PostgREST exige as
+        mesmas chaves em todo o lote). Cada lote é reenviado até max_retries vezes
+        com backoff antes de ser registrado como falho no resumo
+        """
+        chunk_size = chunk_size or self.write_chunk_size
+        summary = {
+            'table': table,
+            'rows_total': len(rows),
+            'rows_written': 0,
+            'chunks': 0,
+            'failed_chunks': []
+        }
+        
+        groups: Dict[tuple, List[Dict]] = OrderedDict()
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        
+        for group_rows in groups.values():
+            for i in range(0, len(group_rows), chunk_size):
+                chunk = group_rows[i:i + chunk_size]
+                summary['chunks'] += 1
+                
+                for attempt in range(max_retries + 1):
+                    try:
+                        query = self.supabase.table(table)
+                        if on_conflict:
+                            query = query.upsert(chunk, on_conflict=on_conflict)
+                        else:
+                            query = query.insert(chunk)
+                        result = query.execute()
+                        summary['rows_written'] += len(result.data) if result.data else 0
+                        break
+                    except Exception as e:
+                        if attempt < max_retries:
+                            print(f"⚠️ Lote {summary['chunks']} de {table} falhou ({e}), tentando novamente...")
+                            time.sleep(0.5 * (2 ** attempt))
+                        else:
+                            print(f"❌ Lote {summary['chunks']} de {table} falhou após {max_retries + 1} tentativas: {e}")
+                            summary['failed_chunks'].append({
+                                'chunk': summary['chunks'],
+                                'rows': len(chunk),
+                                'error': str(e)
+                            })
+        
+        return summary
     
     def create_tables(self):
         """
@@ -150,6 +417,8 @@ class HostLinkDatabase:
     def save_analysis(self, analysis_data: Dict, user_id: int = None, listing_id: int = None) -> int:
         """
         Salva uma análise completa no banco de dados
+        Dados climáticos e concorrentes vão em um insert em lote por tabela, antes
+        de retornar: quem lê a análise em seguida já encontra os dados filhos
         """
         try:
             # Inserir análise principal
@@ -176,32 +445,28 @@ class HostLinkDatabase:
             result = self.supabase.table('analyses').insert(analysis_record).execute()
             analysis_id = result.data[0]['id']
             
-            # Salvar dados climáticos
-            weather_data = analysis_data.get('weather_data', [])
-            for weather in weather_data:
-                weather_record = {
-                    'analysis_id': analysis_id,
-                    'date': weather.get('date'),
-                    'rain_probability': weather.get('rain_probability'),
-                    'weather_condition': weather.get('weather_condition'),
-                    'description': weather.get('description')
-                }
-                self.supabase.table('weather_data').insert(weather_record).execute()
-            
-            # Salvar dados de concorrentes
-            competitive_data = analysis_data.get('competitive_data', [])
-            for competitor in competitive_data:
-                competitor_record = {
-                    'analysis_id': analysis_id,
-                    'title': competitor.get('title'),
-                    'price': competitor.get('price'),
-                    'rating': competitor.get('rating'),
-                    'reviews': competitor.get('reviews'),
-                    'distance': competitor.get('distance'),
-                    'url': competitor.get('url'),
-                    'is_beachfront': competitor.get('is_beachfront', False)
-                }
-                self.supabase.table('competitors').insert(competitor_record).execute()
+            # Dados climáticos
+            weather_records = [{
+                'analysis_id': analysis_id,
+                'date': weather.get('date'),
+                'rain_probability': weather.get('rain_probability'),
+                'weather_condition': weather.get('weather_condition'),
+                'description': weather.get('description')
+            } for weather in analysis_data.get('weather_data', [])]
+            
+            # Dados de concorrentes
+            competitor_records = [{
+                'analysis_id': analysis_id,
+                'title': competitor.get('title'),
+                'price': competitor.get('price'),
+                'rating': competitor.get('rating'),
+                'reviews': competitor.get('reviews'),
+                'distance': competitor.get('distance'),
+                'url': competitor.get('url'),
+                'is_beachfront': competitor.get('is_beachfront', False)
+            } for competitor in analysis_data.get('competitive_data', [])]
+            
+            self.save_analysis_children(analysis_id, weather_records, competitor_records)
             
             return analysis_id
             
@@ -209,6 +474,23 @@ class HostLinkDatabase:
             print(f"Erro ao salvar análise: {e}")
             return None
     
+    def save_analysis_children(self, analysis_id: int, weather_records: List[Dict],
+                               competitor_records: List[Dict]) -> List[Dict]:
+        """
+        Grava os dados climáticos e de concorrentes de uma análise (um insert em lote por tabela)
+        Retorna o resumo de cada tabela, com os lotes que falharam
+        """
+        summaries = []
+        for table, records in (('weather_data', weather_records), ('competitors', competitor_records)):
+            if not records:
+                continue
+            summary = self.bulk_write(table, records)
+            summaries.append(summary)
+            for failed in summary['failed_chunks']:
+                print(f"❌ Análise {analysis_id}: lote {failed['chunk']} de {table} "
+                      f"({failed['rows']} linhas) não foi salvo: {failed['error']}")
+        return summaries
+    
     def get_latest_analysis(self) -> Optional[Dict]:
         """
         Recupera a análise mais recente
@@ -591,6 +873,7 @@ class HostLinkDatabase:
             print(f"📊 Resultado da inserção: {result.data}")
             
             if result.data and len(result.data) > 0:
+                self.invalidate_catalog_cache()
                 return result.data[0]['id']
             else:
                 print("⚠️ Nenhum dado retornado na inserção")
@@ -699,6 +982,7 @@ class HostLinkDatabase:
         try:
             kwargs['updated_at'] = datetime.now().isoformat()
             result = self.supabase.table('user_listings').update(kwargs).eq('id', listing_id).execute()
+            self.invalidate_catalog_cache()
             return len(result.data) > 0
         except Exception as e:
             print(f"❌ Erro ao atualizar link de anúncio: {e}")
@@ -713,6 +997,7 @@ class HostLinkDatabase:
                 'is_active': False,
                 'updated_at': datetime.now().isoformat()
             }).eq('id', listing_id).eq('user_id', user_id).execute()
+            self.invalidate_catalog_cache()
             return len(result.data) > 0
         except Exception as e:
             print(f"❌ Erro ao remover link de anúncio: {e}")
@@ -761,6 +1046,7 @@ class HostLinkDatabase:
             result = self.supabase.table('listing_availability').upsert(
                 data, on_conflict='listing_id,date'
             ).execute()
+            self.invalidate_catalog_cache()
             
             return len(result.data) > 0
         except Exception as e:
@@ -817,6 +1103,7 @@ class HostLinkDatabase:
             
             result = self.supabase.table('listing_bookings').insert(data).execute()
             booking_id = result.data[0]['id'] if result.data else None
+            self.invalidate_catalog_cache()
             
             # Criar notificação para o host
             if booking_id:
@@ -864,42 +1151,72 @@ class HostLinkDatabase:
                 data['payment_status'] = payment_status
             
             result = self.supabase.table('listing_bookings').update(data).eq('id', booking_id).execute()
+            self.invalidate_catalog_cache()
             return len(result.data) > 0
         except Exception as e:
             print(f"❌ Erro ao atualizar status da reserva: {e}")
             return False
     
+    def save_listing_availability_bulk(self, rows: List[Dict], chunk_size: int = None) -> Dict:
+        """
+        Salva ou atualiza a disponibilidade de várias datas em upserts em lote
+        Cada linha segue o formato de save_listing_availability (listing_id, user_id,
+        date, is_available, price_per_night...). Retorna o resumo da gravação
+        """
+        now = datetime.now().isoformat()
+        records = []
+        for row in rows:
+            record = {
+                'listing_id': row['listing_id'],
+                'user_id': row['user_id'],
+                'date': row['date'],
+                'is_available': row.get('is_available', True),
+                'minimum_nights': row.get('minimum_nights', 1),
+                'updated_at': now
+            }
+            if row.get('price_per_night') is not None:
+                record['price_per_night'] = row['price_per_night']
+            if row.get('maximum_nights') is not None:
+                record['maximum_nights'] = row['maximum_nights']
+            if row.get('notes'):
+                record['notes'] = row['notes']
+            records.append(record)
+        
+        summary = self.bulk_write('listing_availability', records, on_conflict='listing_id,date',
+                                   chunk_size=chunk_size)
+        self.invalidate_catalog_cache()
+        
+        print(f"💾 Disponibilidade em lote: {summary['rows_written']}/{summary['rows_total']} datas gravadas "
+              f"em {summary['chunks']} lote(s), {len(summary['failed_chunks'])} falha(s)")
+        return summary
+    
     def save_listing_availability_period(self, listing_id: int, user_id: int, start_date: str, end_date: str, 
                                         price_per_night: float, minimum_nights: int = 1, 
                                         maximum_nights: int = None, notes: str = None) -> bool:
         """
         Salva disponibilidade para um período de datas
+        Todas as datas vão em upserts em lote em vez de uma requisição por dia
         """
         try:
-            from datetime import datetime, timedelta
-            
             current_date = datetime.strptime(start_date, '%Y-%m-%d')
             end_dt = datetime.strptime(end_date, '%Y-%m-%d')
             
-            success_count = 0
+            rows = []
             while current_date <= end_dt:
-                date_str = current_date.strftime('%Y-%m-%d')
-                
-                if self.save_listing_availability(
-                    listing_id=listing_id,
-                    user_id=user_id,
-                    date=date_str,
-                    is_available=True,
-                    price_per_night=price_per_night,
-                    minimum_nights=minimum_nights,
-                    maximum_nights=maximum_nights,
-                    notes=notes
-                ):
-                    success_count += 1
-                
+                rows.append({
+                    'listing_id': listing_id,
+                    'user_id': user_id,
+                    'date': current_date.strftime('%Y-%m-%d'),
+                    'is_available': True,
+                    'price_per_night': price_per_night,
+                    'minimum_nights': minimum_nights,
+                    'maximum_nights': maximum_nights,
+                    'notes': notes
+                })
                 current_date += timedelta(days=1)
             
-            return success_count > 0
+            summary = self.save_listing_availability_bulk(rows)
+            return summary['rows_written'] > 0
         except Exception as e:
             print(f"❌ Erro ao salvar disponibilidade por período: {e}")
             return False
@@ -972,46 +1289,77 @@ class HostLinkDatabase:
                 query = query.eq('user_id', user_id)
             
             result = query.execute()
+            self.invalidate_catalog_cache()
             return len(result.data) > 0
         except Exception as e:
             print(f"❌ Erro ao remover disponibilidade: {e}")
             return False
 
-    def get_all_public_listings(self) -> List[Dict]:
-        """Buscar todos os anúncios da tabela com informações de disponibilidade e reservas pendentes"""
+    def get_all_public_listings(self, batch_size: int = None, availability_days: int = 60) -> List[Dict]:
+        """
+        Buscar todos os anúncios da tabela com informações de disponibilidade e reservas pendentes
+        Usa um número constante de consultas: anúncios, disponibilidade futura e reservas
+        pendentes são buscados em lotes de IDs (batch_size) e agrupados em memória.
+        A disponibilidade é lida só nos próximos availability_days dias; anúncios com
+        menos de 5 datas nessa janela buscam as próximas 5 sem limite de data
+        (consulta própria, ordenada e limitada), então o resultado não muda
+        """
         try:
+            cached = self.catalog_cache.get('all_public_listings')
+            if cached is not None:
+                return cached
+            
             result = self.supabase.table('user_listings').select('*').eq('is_active', True).execute()
             
             if not result.data:
                 return []
             
-            # Adicionar informações de disponibilidade e reservas pendentes para cada anúncio
+            listing_ids = [listing['id'] for listing in result.data]
+            today = datetime.now()
+            start_date = today.strftime('%Y-%m-%d')
+            horizon = (today + timedelta(days=availability_days)).strftime('%Y-%m-%d')
+            
+            # Próximas datas disponíveis de todos os anúncios (até o horizonte)
+            availability_rows = self.select_in_batches(
+                'listing_availability', 'listing_id, date', 'listing_id', listing_ids,
+                lambda q: q.eq('is_available', True).gte('date', start_date).lte('date', horizon),
+                batch_size=batch_size
+            )
+            available_dates: Dict[int, List[str]] = {}
+            for row in availability_rows:
+                available_dates.setdefault(row['listing_id'], []).append(row['date'])
+            
+            # Poucas datas na janela: as próximas podem estar além do horizonte
+            for listing_id in listing_ids:
+                if len(available_dates.get(listing_id, [])) < 5:
+                    later = self.supabase.table('listing_availability').select('date').eq(
+                        'listing_id', listing_id
+                    ).eq('is_available', True).gte('date', start_date).order('date').limit(5).execute()
+                    available_dates[listing_id] = [row['date'] for row in later.data or []]
+            
+            # Reservas pendentes de todos os anúncios
+            pending_rows = self.select_in_batches(
+                'listing_bookings', 'listing_id, checkin_date, checkout_date', 'listing_id', listing_ids,
+                lambda q: q.eq('status', 'pending'),
+                batch_size=batch_size
+            )
+            pending_periods: Dict[int, List[Dict]] = {}
+            for booking in pending_rows:
+                pending_periods.setdefault(booking['listing_id'], []).append({
+                    'start': booking['checkin_date'],
+                    'end': booking['checkout_date']
+                })
+            
+            # Adicionar informações a cada anúncio
             listings_with_status = []
             for listing in result.data:
-                # Buscar próximas datas disponíveis
-                availability_result = self.supabase.table('listing_availability').select(
-                    'date, is_available'
-                ).eq('listing_id', listing['id']).eq('is_available', True).gte('date', datetime.now().strftime('%Y-%m-%d')).order('date').limit(5).execute()
-                
-                # Buscar reservas pendentes
-                pending_bookings = self.supabase.table('listing_bookings').select(
-                    'checkin_date, checkout_date'
-                ).eq('listing_id', listing['id']).eq('status', 'pending').execute()
-                
-                # Adicionar informações ao anúncio
-                listing['available_dates'] = [item['date'] for item in availability_result.data] if availability_result.data else []
-                listing['has_pending_bookings'] = len(pending_bookings.data) > 0 if pending_bookings.data else False
-                listing['pending_periods'] = []
-                
-                if pending_bookings.data:
-                    for booking in pending_bookings.data:
-                        listing['pending_periods'].append({
-                            'start': booking['checkin_date'],
-                            'end': booking['checkout_date']
-                        })
-                
+                listing['available_dates'] = sorted(available_dates.get(listing['id'], []))[:5]
+                periods = pending_periods.get(listing['id'], [])
+                listing['has_pending_bookings'] = len(periods) > 0
+                listing['pending_periods'] = periods
                 listings_with_status.append(listing)
             
+            self.catalog_cache.set('all_public_listings', listings_with_status)
             return listings_with_status
         except Exception as e:
             print(f"❌ Erro ao buscar anúncios públicos: {e}")
@@ -1031,6 +1379,10 @@ class HostLinkDatabase:
     def get_listings_available_on_date(self, date: str) -> List[Dict]:
         """Buscar anúncios disponíveis em uma data específica"""
         try:
+            cached = self.catalog_cache.get(('available_on_date', date))
+            if cached is not None:
+                return cached
+            
             # Buscar anúncios que têm disponibilidade na data
             availability_result = self.supabase.table('listing_availability').select(
                 'listing_id'
@@ -1062,6 +1414,7 @@ class HostLinkDatabase:
                 
                 listings_with_price.append(listing)
             
+            self.catalog_cache.set(('available_on_date', date), listings_with_price)
             return listings_with_price
         except Exception as e:
             print(f"❌ Erro ao buscar anúncios disponíveis na data {date}: {e}")
@@ -1163,6 +1516,7 @@ class HostLinkDatabase:
             }
             
             result = self.supabase.table('listing_bookings').insert(booking_data).execute()
+            self.invalidate_catalog_cache()
             
             if result.data:
                 booking_id = result.data[0]['id']
@@ -1215,6 +1569,7 @@ class HostLinkDatabase:
             }
             
             result = self.supabase.table('listing_bookings').insert(booking_data).execute()
+            self.invalidate_catalog_cache()
             
             if result.data:
                 booking_id = result.data[0]['id']
@@ -1315,6 +1670,81 @@ class HostLinkDatabase:
             print(f"❌ Erro ao buscar período disponível: {e}")
             return None
 
+    def load_availability_engine(self, listing_ids: Iterable[int], start_date: str,
+                                 end_date: str) -> AvailabilityEngine:
+        """
+        Monta um AvailabilityEngine para vários anúncios com duas consultas em massa:
+        reservas ativas que cruzam a janela e datas bloqueadas dentro dela
+        """
+        listing_ids = list(listing_ids)
+        engine = AvailabilityEngine(start_date, end_date)
+        for listing_id in listing_ids:
+            engine.add_listing(listing_id)
+        
+        if not listing_ids:
+            return engine
+        
+        bookings = self.select_in_batches(
+            'listing_bookings', 'listing_id, checkin_date, checkout_date', 'listing_id', listing_ids,
+            lambda q: q.in_('status', ['confirmed', 'pending']).lte('checkin_date', end_date).gte('checkout_date', start_date)
+        )
+        for booking in bookings:
+            engine.add_booking(booking['listing_id'], booking['checkin_date'], booking['checkout_date'])
+        
+        blocked = self.select_in_batches(
+            'listing_availability', 'listing_id, date', 'listing_id', listing_ids,
+            lambda q: q.eq('is_available', False).gte('date', start_date).lte('date', end_date)
+        )
+        for row in blocked:
+            engine.add_blocked_date(row['listing_id'], row['date'])
+        
+        print(f"📅 Motor de disponibilidade: {len(listing_ids)} anúncios, {len(bookings)} reservas, {len(blocked)} bloqueios")
+        return engine
+    
+    def get_listings_availability_summary(self, listing_ids: Iterable[int], start_date: str, end_date: str,
+                                          horizon_days: int = 365) -> Dict[int, Dict]:
+        """
+        Disponibilidade de vários anúncios para um período de busca em uma passada:
+        {listing_id: {'available', 'available_period', 'next_available_date'}}
+        """
+        try:
+            listing_ids = list(listing_ids)
+            horizon_end = (datetime.strptime(start_date, '%Y-%m-%d') + timedelta(days=horizon_days - 1)).strftime('%Y-%m-%d')
+            engine = self.load_availability_engine(listing_ids, start_date, max(end_date, horizon_end))
+            return {
+                listing_id: engine.summarize(listing_id, start_date, end_date, horizon_days)
+                for listing_id in listing_ids
+            }
+        except Exception as e:
+            print(f"❌ Erro ao calcular disponibilidade em massa: {e}")
+            return {}
+
+    def get_month_availability_map(self, listing_id: int, year: int, month: int,
+                                   prefetch_adjacent: bool = False) -> Dict[str, bool]:
+        """
+        Disponibilidade dia a dia de um mês inteiro (data -> bool) com duas consultas
+        Com prefetch_adjacent=True o mapa cobre também o mês anterior e o seguinte,
+        para o calendário navegar entre eles sem novas requisições
+        """
+        try:
+            first_month = (year, month)
+            last_month = (year, month)
+            if prefetch_adjacent:
+                first_month = (year - 1, 12) if month == 1 else (year, month - 1)
+                last_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            
+            start_date = datetime(first_month[0], first_month[1], 1)
+            next_year, next_month = (last_month[0] + 1, 1) if last_month[1] == 12 else (last_month[0], last_month[1] + 1)
+            end_date = datetime(next_year, next_month, 1) - timedelta(days=1)
+            
+            engine = self.load_availability_engine(
+                [listing_id], start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+            )
+            return engine.day_map(listing_id)
+        except Exception as e:
+            print(f"❌ Erro ao buscar disponibilidade do mês {month}/{year}: {e}")
+            return {}
+
     # =====================================================
     # FUNÇÕES DE FAVORITOS
     # =====================================================
@@ -1799,6 +2229,7 @@ class HostLinkDatabase:
                 'reviews': review_count,
                 'updated_at': datetime.now().isoformat()
             }).eq('id', listing_id).execute()
+            self.invalidate_catalog_cache()
             
             return len(update_result.data) > 0
         except Exception as e:
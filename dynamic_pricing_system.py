@@ -1,92 +1,40 @@
-from database import Database
+import sys
+from database import get_database
 from datetime import datetime, timedelta
+from itertools import accumulate
 import calendar
 
 class DynamicPricingSystem:
+    # Amplificação do score de demanda por tipo de período
+    PERIOD_DEMAND_MULTIPLIERS = {
+        'weekend': 1.3,
+        'holiday': 1.5,
+        'high_season': 1.4
+    }
+    
     def __init__(self):
-        self.db = Database()
+        self.db = get_database()
     
     def calculate_regional_demand(self, municipio_id: int, start_date: str, end_date: str) -> dict:
         """
         Calcula a demanda regional para um período específico
         """
         try:
-            # Buscar todas as reservas no período
-            bookings_result = self.db.supabase.table('listing_bookings').select(
-                'listing_id, checkin_date, checkout_date, price_per_night'
-            ).execute()
-            
-            # Buscar anúncios da região
-            listings_result = self.db.supabase.table('user_listings').select(
-                'id, price_per_night'
-            ).eq('municipio_id', municipio_id).eq('is_active', True).execute()
+            demand_rows = self._compute_regional_demand_rows(municipio_id, start_date, end_date)
             
-            if not listings_result.data:
+            if demand_rows is None:
                 return {'demand_score': 0, 'reason': 'Nenhum anúncio ativo na região'}
             
-            total_listings = len(listings_result.data)
-            listing_ids = [l['id'] for l in listings_result.data]
-            
-            # Calcular métricas por data
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            total_demand_score = 0
-            days_analyzed = 0
-            
-            current_date = start
-            while current_date <= end:
-                date_str = current_date.strftime('%Y-%m-%d')
-                
-                # Contar reservas para esta data
-                booked_count = 0
-                total_price = 0
-                
-                for booking in bookings_result.data:
-                    if booking['listing_id'] in listing_ids:
-                        checkin = datetime.strptime(booking['checkin_date'], '%Y-%m-%d')
-                        checkout = datetime.strptime(booking['checkout_date'], '%Y-%m-%d')
-                        
-                        if checkin <= current_date < checkout:
-                            booked_count += 1
-                            total_price += booking.get('price_per_night', 0)
-                
-                # Calcular taxa de ocupação
-                occupancy_rate = (booked_count / total_listings) * 100 if total_listings > 0 else 0
-                
-                # Determinar tipo de período
-                period_type = self._get_period_type(current_date)
-                
-                # Calcular score de demanda (0-100)
-                demand_score = min(occupancy_rate * 1.2, 100)  # Multiplicador para amplificar demanda
-                
-                # Ajustar score baseado no tipo de período
-                if period_type == 'weekend':
-                    demand_score *= 1.3
-                elif period_type == 'holiday':
-                    demand_score *= 1.5
-                elif period_type == 'high_season':
-                    demand_score *= 1.4
-                
-                demand_score = min(demand_score, 100)
-                
-                # Salvar dados de demanda
-                self._save_regional_demand(
-                    municipio_id, date_str, period_type, 
-                    total_listings, total_listings - booked_count, booked_count,
-                    total_price / booked_count if booked_count > 0 else 0,
-                    demand_score, occupancy_rate
-                )
-                
-                total_demand_score += demand_score
-                days_analyzed += 1
-                current_date += timedelta(days=1)
+            # Salvar dados de demanda em um único upsert em lote
+            self._save_regional_demand(demand_rows)
             
+            days_analyzed = len(demand_rows)
+            total_demand_score = sum(row['demand_score'] for row in demand_rows)
             avg_demand_score = total_demand_score / days_analyzed if days_analyzed > 0 else 0
             
             return {
                 'demand_score': round(avg_demand_score, 2),
-                'total_listings': total_listings,
+                'total_listings': demand_rows[0]['total_listings'] if demand_rows else 0,
                 'days_analyzed': days_analyzed,
                 'reason': f'Análise de {days_analyzed} dias na região'
             }
@@ -95,7 +43,85 @@ class DynamicPricingSystem:
             print(f"❌ Erro ao calcular demanda regional: {e}")
             return {'demand_score': 0, 'reason': f'Erro: {str(e)}'}
     
-    def _get_period_type(self, date: datetime) -> str:
+    def _compute_regional_demand_rows(self, municipio_id: int, start_date: str, end_date: str):
+        """
+        Linhas diárias de regional_demand para o período (sem gravar)
+        As reservas são filtradas no banco (anúncios da região que cruzam o período)
+        e a ocupação diária sai de um vetor de diferenças acumulado: uma passada
+        pelas reservas e outra pelos dias, em vez de reler todas as reservas a cada dia.
+        Retorna None se a região não tem anúncios ativos
+        """
+        # Buscar anúncios da região
+        listings_result = self.db.supabase.table('user_listings').select(
+            'id, price_per_night'
+        ).eq('municipio_id', municipio_id).eq('is_active', True).execute()
+        
+        if not listings_result.data:
+            return None
+        
+        total_listings = len(listings_result.data)
+        listing_ids = [l['id'] for l in listings_result.data]
+        
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        total_days = max((end - start).days + 1, 0)
+        
+        # Reservas da região que ocupam alguma noite do período (checkout não ocupa)
+        bookings = self.db.select_in_batches(
+            'listing_bookings', 'listing_id, checkin_date, checkout_date, price_per_night',
+            'listing_id', listing_ids,
+            lambda q: q.lte('checkin_date', end_date).gt('checkout_date', start_date)
+        )
+        
+        # Vetores de diferenças: +1 na primeira noite, -1 no dia do checkout
+        booked_delta = [0] * (total_days + 1)
+        price_delta = [0.0] * (total_days + 1)
+        for booking in bookings:
+            first = max((datetime.strptime(booking['checkin_date'][:10], '%Y-%m-%d') - start).days, 0)
+            last = min((datetime.strptime(booking['checkout_date'][:10], '%Y-%m-%d') - start).days, total_days)
+            if first >= last:
+                continue
+            price = float(booking.get('price_per_night') or 0)
+            booked_delta[first] += 1
+            booked_delta[last] -= 1
+            price_delta[first] += price
+            price_delta[last] -= price
+        
+        booked_counts = list(accumulate(booked_delta[:total_days]))
+        price_totals = list(accumulate(price_delta[:total_days]))
+        
+        # Scores de todos os dias de uma vez
+        updated_at = datetime.now().isoformat()
+        demand_rows = []
+        for offset in range(total_days):
+            current_date = start + timedelta(days=offset)
+            booked_count = booked_counts[offset]
+            period_type = self._get_period_type(current_date)
+            
+            # Calcular taxa de ocupação
+            occupancy_rate = (booked_count / total_listings) * 100
+            
+            # Score de demanda (0-100) ajustado pelo tipo de período
+            demand_score = min(occupancy_rate * 1.2, 100)  # Multiplicador para amplificar demanda
+            demand_score = min(demand_score * self.PERIOD_DEMAND_MULTIPLIERS.get(period_type, 1.0), 100)
+            
+            demand_rows.append({
+                'municipio_id': municipio_id,
+                'date': current_date.strftime('%Y-%m-%d'),
+                'period_type': period_type,
+                'total_listings': total_listings,
+                'available_listings': total_listings - booked_count,
+                'booked_listings': booked_count,
+                'avg_price': price_totals[offset] / booked_count if booked_count > 0 else 0,
+                'demand_score': demand_score,
+                'occupancy_rate': occupancy_rate,
+                'updated_at': updated_at
+            })
+        
+        return demand_rows
+    
+    @staticmethod
+    def _get_period_type(date: datetime) -> str:
         """
         Determina o tipo de período para uma data
         """
@@ -123,148 +149,206 @@ class DynamicPricingSystem:
         
         return 'weekday'
     
-    def _save_regional_demand(self, municipio_id: int, date: str, period_type: str,
-                             total_listings: int, available_listings: int, booked_listings: int,
-                             avg_price: float, demand_score: float, occupancy_rate: float):
+    def _save_regional_demand(self, demand_rows: list) -> bool:
         """
-        Salva dados de demanda regional
+        Salva dados de demanda regional (um upsert em lote para todos os dias)
         """
         try:
-            data = {
-                'municipio_id': municipio_id,
-                'date': date,
-                'period_type': period_type,
-                'total_listings': total_listings,
-                'available_listings': available_listings,
-                'booked_listings': booked_listings,
-                'avg_price': avg_price,
-                'demand_score': demand_score,
-                'occupancy_rate': occupancy_rate,
-                'updated_at': datetime.now().isoformat()
-            }
+            if not demand_rows:
+                return True
             
-            result = self.db.supabase.table('regional_demand').upsert(
-                data, on_conflict='municipio_id,date,period_type'
-            ).execute()
+            summary = self.db.bulk_write(
+                'regional_demand', demand_rows, on_conflict='municipio_id,date,period_type'
+            )
             
-            return len(result.data) > 0
+            return not summary['failed_chunks']
         except Exception as e:
             print(f"❌ Erro ao salvar demanda regional: {e}")
             return False
     
-    def calculate_dynamic_price(self, listing_id: int, date: str, base_price: float) -> dict:
+    def build_pricing_context(self, listing_id: int, start_date: str, end_date: str) -> dict:
+        """
+        Carrega uma única vez tudo o que a precificação de um período precisa:
+        dados do anúncio e a demanda regional de cada data (do banco ou calculada
+        uma vez para as datas que faltam)
+        """
+        listing_result = self.db.supabase.table('user_listings').select(
+            'id, user_id, title, price_per_night, municipio_id, property_type, is_beachfront'
+        ).eq('id', listing_id).execute()
+        
+        context = {
+            'listing_id': listing_id,
+            'listing': listing_result.data[0] if listing_result.data else None,
+            'demand': {}
+        }
+        
+        listing = context['listing']
+        if listing and listing.get('municipio_id'):
+            context['demand'] = self._load_regional_demand(listing['municipio_id'], start_date, end_date)
+        
+        return context
+    
+    def _load_regional_demand(self, municipio_id: int, start_date: str, end_date: str,
+                              persist: bool = True) -> dict:
+        """
+        Demanda regional de cada data do período: {date: {'demand_score', 'period_type'}}
+        Usa o que já está em regional_demand e calcula uma vez o intervalo que cobre
+        as datas que faltam (gravando o resultado se persist=True)
+        """
+        demand = {}
+        demand_result = self.db.supabase.table('regional_demand').select(
+            'date, demand_score, period_type, occupancy_rate'
+        ).eq('municipio_id', municipio_id).gte('date', start_date).lte('date', end_date).execute()
+        
+        for row in demand_result.data or []:
+            demand.setdefault(row['date'][:10], {
+                'demand_score': row['demand_score'],
+                'period_type': row['period_type']
+            })
+        
+        # Datas sem demanda: calcular uma vez para o intervalo que as cobre
+        missing = [
+            date_str for date_str in self._date_range(start_date, end_date)
+            if date_str not in demand
+        ]
+        if missing:
+            demand_rows = self._compute_regional_demand_rows(municipio_id, missing[0], missing[-1]) or []
+            if persist:
+                self._save_regional_demand(demand_rows)
+            computed = {row['date']: row for row in demand_rows}
+            for date_str in missing:
+                row = computed.get(date_str)
+                demand[date_str] = {
+                    'demand_score': round(row['demand_score'], 2) if row else 0,
+                    'period_type': self._get_period_type(datetime.strptime(date_str, '%Y-%m-%d'))
+                }
+        
+        return demand
+    
+    def _date_range(self, start_date: str, end_date: str) -> list:
+        """Lista de datas YYYY-MM-DD de start_date a end_date (inclusive)"""
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        total_days = (datetime.strptime(end_date, '%Y-%m-%d') - start).days + 1
+        return [(start + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(max(total_days, 0))]
+    
+    def _price_from_context(self, context: dict, date: str, base_price: float) -> dict:
+        """
+        Calcula o preço dinâmico de uma data usando apenas os dados do contexto
+        """
+        listing = context['listing']
+        if not listing:
+            return {'dynamic_price': base_price, 'multiplier': 1.0, 'reason': 'Anúncio não encontrado'}
+        
+        if not listing.get('municipio_id'):
+            return {'dynamic_price': base_price, 'multiplier': 1.0, 'reason': 'Município não definido'}
+        
+        demand_info = context['demand'].get(date) or {
+            'demand_score': 0,
+            'period_type': self._get_period_type(datetime.strptime(date, '%Y-%m-%d'))
+        }
+        demand_score = demand_info['demand_score']
+        period_type = demand_info['period_type']
+        
+        # Calcular multiplicador baseado na demanda
+        multiplier = 1.0
+        reason_parts = []
+        
+        # Ajuste baseado no score de demanda
+        if demand_score >= 80:
+            multiplier += 0.4  # +40% para demanda muito alta
+            reason_parts.append('demanda muito alta')
+        elif demand_score >= 60:
+            multiplier += 0.25  # +25% para demanda alta
+            reason_parts.append('demanda alta')
+        elif demand_score >= 40:
+            multiplier += 0.1   # +10% para demanda média
+            reason_parts.append('demanda média')
+        elif demand_score < 20:
+            multiplier -= 0.1   # -10% para demanda baixa
+            reason_parts.append('demanda baixa')
+        
+        # Ajuste baseado no tipo de período
+        if period_type == 'holiday':
+            multiplier += 0.2
+            reason_parts.append('feriado')
+        elif period_type == 'weekend':
+            multiplier += 0.15
+            reason_parts.append('fim de semana')
+        elif period_type == 'high_season':
+            multiplier += 0.1
+            reason_parts.append('alta temporada')
+        
+        # Ajuste para propriedades frente à praia
+        if listing.get('is_beachfront'):
+            multiplier += 0.1
+            reason_parts.append('frente à praia')
+        
+        # Limitar multiplicador entre 0.7 e 2.0
+        multiplier = max(0.7, min(2.0, multiplier))
+        
+        dynamic_price = round(base_price * multiplier, 2)
+        
+        return {
+            'dynamic_price': dynamic_price,
+            'multiplier': round(multiplier, 2),
+            'demand_score': demand_score,
+            'reason': ', '.join(reason_parts) if reason_parts else 'preço base',
+            'history': self._dynamic_pricing_history_row(
+                context['listing_id'], date, base_price, dynamic_price,
+                demand_score, multiplier, ', '.join(reason_parts)
+            )
+        }
+    
+    def calculate_dynamic_price(self, listing_id: int, date: str, base_price: float = None) -> dict:
         """
         Calcula preço dinâmico baseado na demanda regional
+        Sem base_price usa o preço por noite cadastrado no anúncio
         """
         try:
-            # Buscar informações do anúncio
-            listing_result = self.db.supabase.table('user_listings').select(
-                'municipio_id, property_type, is_beachfront'
-            ).eq('id', listing_id).execute()
-            
-            if not listing_result.data:
-                return {'dynamic_price': base_price, 'multiplier': 1.0, 'reason': 'Anúncio não encontrado'}
-            
-            listing = listing_result.data[0]
-            municipio_id = listing['municipio_id']
-            
-            if not municipio_id:
-                return {'dynamic_price': base_price, 'multiplier': 1.0, 'reason': 'Município não definido'}
-            
-            # Buscar demanda regional para a data
-            demand_result = self.db.supabase.table('regional_demand').select(
-                'demand_score, period_type, occupancy_rate'
-            ).eq('municipio_id', municipio_id).eq('date', date).execute()
-            
-            if not demand_result.data:
-                # Se não há dados de demanda, calcular para o período
-                demand_data = self.calculate_regional_demand(municipio_id, date, date)
-                demand_score = demand_data.get('demand_score', 0)
-                period_type = self._get_period_type(datetime.strptime(date, '%Y-%m-%d'))
-            else:
-                demand_info = demand_result.data[0]
-                demand_score = demand_info['demand_score']
-                period_type = demand_info['period_type']
-            
-            # Calcular multiplicador baseado na demanda
-            multiplier = 1.0
-            reason_parts = []
-            
-            # Ajuste baseado no score de demanda
-            if demand_score >= 80:
-                multiplier += 0.4  # +40% para demanda muito alta
-                reason_parts.append('demanda muito alta')
-            elif demand_score >= 60:
-                multiplier += 0.25  # +25% para demanda alta
-                reason_parts.append('demanda alta')
-            elif demand_score >= 40:
-                multiplier += 0.1   # +10% para demanda média
-                reason_parts.append('demanda média')
-            elif demand_score < 20:
-                multiplier -= 0.1   # -10% para demanda baixa
-                reason_parts.append('demanda baixa')
-            
-            # Ajuste baseado no tipo de período
-            if period_type == 'holiday':
-                multiplier += 0.2
-                reason_parts.append('feriado')
-            elif period_type == 'weekend':
-                multiplier += 0.15
-                reason_parts.append('fim de semana')
-            elif period_type == 'high_season':
-                multiplier += 0.1
-                reason_parts.append('alta temporada')
-            
-            # Ajuste para propriedades frente à praia
-            if listing.get('is_beachfront'):
-                multiplier += 0.1
-                reason_parts.append('frente à praia')
-            
-            # Limitar multiplicador entre 0.7 e 2.0
-            multiplier = max(0.7, min(2.0, multiplier))
-            
-            dynamic_price = round(base_price * multiplier, 2)
+            context = self.build_pricing_context(listing_id, date, date)
+            if base_price is None:
+                base_price = (context['listing'] or {}).get('price_per_night') or 0
+            
+            pricing_result = self._price_from_context(context, date, base_price)
             
             # Salvar histórico
-            self._save_dynamic_pricing_history(
-                listing_id, date, base_price, dynamic_price, 
-                demand_score, multiplier, ', '.join(reason_parts)
-            )
+            history = pricing_result.pop('history', None)
+            if history:
+                self._save_dynamic_pricing_history([history])
             
-            return {
-                'dynamic_price': dynamic_price,
-                'multiplier': round(multiplier, 2),
-                'demand_score': demand_score,
-                'reason': ', '.join(reason_parts) if reason_parts else 'preço base'
-            }
+            return pricing_result
             
         except Exception as e:
             print(f"❌ Erro ao calcular preço dinâmico: {e}")
             return {'dynamic_price': base_price, 'multiplier': 1.0, 'reason': f'Erro: {str(e)}'}
     
-    def _save_dynamic_pricing_history(self, listing_id: int, date: str, original_price: float,
-                                     dynamic_price: float, demand_score: float, 
-                                     multiplier: float, reason: str):
+    def _dynamic_pricing_history_row(self, listing_id: int, date: str, original_price: float,
+                                     dynamic_price: float, demand_score: float,
+                                     multiplier: float, reason: str) -> dict:
+        return {
+            'listing_id': listing_id,
+            'date': date,
+            'original_price': original_price,
+            'dynamic_price': dynamic_price,
+            'demand_score': demand_score,
+            'price_multiplier': multiplier,
+            'reason': reason,
+            'applied_at': datetime.now().isoformat()
+        }
+    
+    def _save_dynamic_pricing_history(self, history_rows: list) -> bool:
         """
-        Salva histórico de precificação dinâmica
+        Salva histórico de precificação dinâmica (um upsert em lote)
         """
         try:
-            data = {
-                'listing_id': listing_id,
-                'date': date,
-                'original_price': original_price,
-                'dynamic_price': dynamic_price,
-                'demand_score': demand_score,
-                'price_multiplier': multiplier,
-                'reason': reason,
-                'applied_at': datetime.now().isoformat()
-            }
+            if not history_rows:
+                return True
             
-            result = self.db.supabase.table('dynamic_pricing_history').upsert(
-                data, on_conflict='listing_id,date'
-            ).execute()
+            summary = self.db.bulk_write(
+                'dynamic_pricing_history', history_rows, on_conflict='listing_id,date'
+            )
             
-            return len(result.data) > 0
+            return not summary['failed_chunks']
         except Exception as e:
             print(f"❌ Erro ao salvar histórico de preços: {e}")
             return False
@@ -272,19 +356,18 @@ class DynamicPricingSystem:
     def apply_dynamic_pricing_to_listing(self, listing_id: int, start_date: str, end_date: str):
         """
         Aplica precificação dinâmica a um anúncio para um período
+        Anúncio e demanda são carregados uma vez; cada data é precificada em memória
+        e disponibilidade e histórico são gravados em lote no final
         """
         try:
-            # Buscar preço base do anúncio
-            listing_result = self.db.supabase.table('user_listings').select(
-                'price_per_night, title'
-            ).eq('id', listing_id).execute()
+            context = self.build_pricing_context(listing_id, start_date, end_date)
             
-            if not listing_result.data:
+            if not context['listing']:
                 print(f"❌ Anúncio {listing_id} não encontrado")
                 return False
             
-            listing = listing_result.data[0]
-            base_price = listing.get('price_per_night', 0)
+            listing = context['listing']
+            base_price = listing.get('price_per_night') or 0
             title = listing.get('title', 'Sem título')
             
             if base_price <= 0:
@@ -296,36 +379,39 @@ class DynamicPricingSystem:
             print(f"📅 Período: {start_date} a {end_date}")
             print("-" * 50)
             
-            # Processar cada data no período
-            start = datetime.strptime(start_date, '%Y-%m-%d')
-            end = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            current_date = start
-            while current_date <= end:
-                date_str = current_date.strftime('%Y-%m-%d')
-                
+            availability_rows = []
+            history_rows = []
+            for date_str in self._date_range(start_date, end_date):
                 # Calcular preço dinâmico
-                pricing_result = self.calculate_dynamic_price(listing_id, date_str, base_price)
+                pricing_result = self._price_from_context(context, date_str, base_price)
+                if pricing_result.get('history'):
+                    history_rows.append(pricing_result['history'])
                 
-                # Atualizar disponibilidade com novo preço
-                self.db.save_listing_availability(
-                    listing_id=listing_id,
-                    user_id=1,  # Assumindo user_id 1 para teste
-                    date=date_str,
-                    is_available=True,
-                    price_per_night=pricing_result['dynamic_price']
-                )
+                # Disponibilidade com novo preço (gravada em lote no final)
+                availability_rows.append({
+                    'listing_id': listing_id,
+                    'user_id': 1,  # Assumindo user_id 1 para teste
+                    'date': date_str,
+                    'is_available': True,
+                    'price_per_night': pricing_result['dynamic_price']
+                })
                 
                 # Mostrar resultado
-                day_name = current_date.strftime('%A')
+                day_name = datetime.strptime(date_str, '%Y-%m-%d').strftime('%A')
                 print(f"📅 {date_str} ({day_name}):")
                 print(f"   💰 Preço: R$ {base_price:.2f} → R$ {pricing_result['dynamic_price']:.2f}")
                 print(f"   📊 Multiplicador: {pricing_result['multiplier']}x")
-                print(f"   📈 Score demanda: {pricing_result['demand_score']:.1f}")
+                print(f"   📈 Score demanda: {pricing_result.get('demand_score', 0):.1f}")
                 print(f"   📝 Motivo: {pricing_result['reason']}")
                 print()
-                
-                current_date += timedelta(days=1)
+            
+            if not self._save_dynamic_pricing_history(history_rows):
+                print("⚠️ Histórico de preços dinâmicos não foi gravado")
+            
+            summary = self.db.save_listing_availability_bulk(availability_rows)
+            if summary['failed_chunks']:
+                print(f"⚠️ {len(summary['failed_chunks'])} lote(s) de disponibilidade não foram gravados")
+                return False
             
             print("✅ Precificação dinâmica aplicada com sucesso!")
             return True
@@ -334,17 +420,180 @@ class DynamicPricingSystem:
             print(f"❌ Erro ao aplicar precificação dinâmica: {e}")
             return False
 
-if __name__ == "__main__":
-    # Demonstração do sistema
+    def apply_portfolio(self, start_date: str, end_date: str, municipio_ids: list = None,
+                        user_id: int = None, dry_run: bool = False) -> dict:
+        """
+        Aplica precificação dinâmica a todos os anúncios ativos de uma carteira
+        (por municípios e/ou usuário). A demanda é carregada uma vez por município,
+        cada anúncio × data é precificado em memória e disponibilidade e histórico
+        são gravados em lote. Só as datas que já estão na agenda e disponíveis são
+        repreçadas (bloqueios, estadia mínima/máxima e datas sem linha ficam como
+        estão). Com dry_run=True nada é gravado e o resultado traz apenas as
+        mudanças de preço em relação à agenda atual
+        """
+        result = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'dry_run': dry_run,
+            'listings': 0,
+            'dates': 0,
+            'changes': [],
+            'skipped': [],
+            'dates_not_repriced': 0
+        }
+        
+        try:
+            query = self.db.supabase.table('user_listings').select(
+                'id, user_id, title, price_per_night, municipio_id, property_type, is_beachfront'
+            ).eq('is_active', True)
+            if user_id:
+                query = query.eq('user_id', user_id)
+            if municipio_ids:
+                query = query.in_('municipio_id', municipio_ids)
+            listings = query.order('id').execute().data or []
+            
+            dates = self._date_range(start_date, end_date)
+            result['dates'] = len(dates)
+            
+            priced_listings = []
+            for listing in listings:
+                if not (listing.get('price_per_night') or 0) > 0:
+                    result['skipped'].append({'listing_id': listing['id'], 'reason': 'Preço base inválido'})
+                elif not listing.get('municipio_id'):
+                    result['skipped'].append({'listing_id': listing['id'], 'reason': 'Município não definido'})
+                else:
+                    priced_listings.append(listing)
+            result['listings'] = len(priced_listings)
+            
+            print(f"🏘️ Carteira: {len(priced_listings)} anúncio(s) × {len(dates)} data(s) de {start_date} a {end_date}")
+            if not priced_listings:
+                return result
+            
+            # Demanda regional uma vez por município
+            demand_by_municipio = {}
+            for municipio_id in sorted({l['municipio_id'] for l in priced_listings}):
+                print(f"📊 Demanda regional do município {municipio_id}...")
+                demand_by_municipio[municipio_id] = self._load_regional_demand(
+                    municipio_id, start_date, end_date, persist=not dry_run
+                )
+            
+            # Agenda atual: diff de preços e o que não pode ser alterado (bloqueios e regras de estadia)
+            current_rows = self.db.select_in_batches(
+                'listing_availability',
+                'listing_id, date, price_per_night, is_available, minimum_nights, maximum_nights', 'listing_id',
+                [l['id'] for l in priced_listings],
+                lambda q: q.gte('date', start_date).lte('date', end_date)
+            )
+            current_by_date = {(row['listing_id'], row['date'][:10]): row for row in current_rows}
+            
+            availability_rows = []
+            history_rows = []
+            for index, listing in enumerate(priced_listings, 1):
+                context = {
+                    'listing_id': listing['id'],
+                    'listing': listing,
+                    'demand': demand_by_municipio[listing['municipio_id']]
+                }
+                base_price = listing['price_per_night']
+                listing_changes = 0
+                
+                for date_str in dates:
+                    current = current_by_date.get((listing['id'], date_str))
+                    if not current or not current.get('is_available'):
+                        # Data bloqueada pelo anfitrião ou fora da agenda: não abrir nem repreçar
+                        result['dates_not_repriced'] += 1
+                        continue
+                    
+                    pricing_result = self._price_from_context(context, date_str, base_price)
+                    new_price = pricing_result['dynamic_price']
+                    old_price = current.get('price_per_night')
+                    
+                    if old_price is None or abs(float(old_price) - new_price) >= 0.01:
+                        listing_changes += 1
+                        result['changes'].append({
+                            'listing_id': listing['id'],
+                            'title': listing.get('title'),
+                            'date': date_str,
+                            'old_price': float(old_price) if old_price is not None else None,
+                            'new_price': new_price,
+                            'reason': pricing_result['reason']
+                        })
+                    
+                    history_rows.append(pricing_result['history'])
+                    availability_rows.append({
+                        'listing_id': listing['id'],
+                        'user_id': listing['user_id'],
+                        'date': date_str,
+                        'is_available': True,
+                        'price_per_night': new_price,
+                        'minimum_nights': current.get('minimum_nights') or 1,
+                        'maximum_nights': current.get('maximum_nights')
+                    })
+                
+                print(f"   [{index}/{len(priced_listings)}] {(listing.get('title') or 'Sem título')[:40]}: "
+                      f"{listing_changes} mudança(s) de preço")
+            
+            if result['dates_not_repriced']:
+                print(f"🔒 {result['dates_not_repriced']} data(s) bloqueadas ou fora da agenda mantidas sem alteração")
+            
+            if dry_run:
+                print(f"🔎 Simulação: {len(result['changes'])} mudança(s) de preço, nada foi gravado")
+                return result
+            
+            self._save_dynamic_pricing_history(history_rows)
+            result['availability_summary'] = self.db.save_listing_availability_bulk(availability_rows)
+            print(f"✅ Carteira precificada: {len(result['changes'])} mudança(s) de preço gravadas")
+            return result
+            
+        except Exception as e:
+            print(f"❌ Erro ao aplicar precificação na carteira: {e}")
+            result['error'] = str(e)
+            return result
+
+def main():
+    """
+    Linha de comando do sistema de preço dinâmico
+    Uso: python dynamic_pricing_system.py --inicio YYYY-MM-DD --fim YYYY-MM-DD
+         [--municipio ID ...] [--usuario ID] [--anuncio ID] [--simular]
+    """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Sistema de preço dinâmico HostLink')
+    parser.add_argument('--inicio', required=True, help='Data inicial (YYYY-MM-DD)')
+    parser.add_argument('--fim', required=True, help='Data final (YYYY-MM-DD)')
+    parser.add_argument('--municipio', type=int, action='append', help='ID do município (pode repetir)')
+    parser.add_argument('--usuario', type=int, help='ID do usuário dono da carteira')
+    parser.add_argument('--anuncio', type=int, help='Precificar apenas um anúncio')
+    parser.add_argument('--simular', action='store_true', help='Não grava nada, só mostra o diff de preços')
+    args = parser.parse_args()
+    
     pricing_system = DynamicPricingSystem()
     
-    print("🚀 SISTEMA DE PREÇO FLUTUANTE - DEMONSTRAÇÃO")
+    print("🚀 SISTEMA DE PREÇO FLUTUANTE")
     print("=" * 60)
     
-    # Exemplo: aplicar preços dinâmicos para um anúncio
-    # Assumindo que existe um anúncio com ID 1
-    listing_id = 1
-    start_date = "2024-12-20"  # Período de alta temporada
-    end_date = "2024-12-27"    # Incluindo fim de semana e feriados
+    if args.anuncio:
+        ok = pricing_system.apply_dynamic_pricing_to_listing(args.anuncio, args.inicio, args.fim)
+        return 0 if ok else 1
     
-    pricing_system.apply_dynamic_pricing_to_listing(listing_id, start_date, end_date)
\ No newline at end of file
+    if not args.municipio and not args.usuario:
+        parser.error('informe --municipio, --usuario ou --anuncio')
+    
+    result = pricing_system.apply_portfolio(
+        args.inicio, args.fim, municipio_ids=args.municipio,
+        user_id=args.usuario, dry_run=args.simular
+    )
+    
+    if args.simular:
+        print("\n📋 Diff de preços:")
+        for change in result['changes']:
+            old_price = f"R$ {change['old_price']:.2f}" if change['old_price'] is not None else "(sem preço)"
+            print(f"   #{change['listing_id']} {change['date']}: {old_price} → R$ {change['new_price']:.2f} ({change['reason']})")
+    
+    for skipped in result['skipped']:
+        print(f"⚠️ Anúncio {skipped['listing_id']} ignorado: {skipped['reason']}")
+    
+    return 1 if result.get('error') else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
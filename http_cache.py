@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de respostas HTTP em disco (SQLite) para o scraper
+Evita buscar de novo as mesmas páginas do Airbnb e do ClimaTempo: cada fonte
+tem sua validade (TTL), respostas vencidas são revalidadas com ETag /
+Last-Modified e o arquivo é limitado por tamanho com descarte LRU.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+class HttpResponseCache:
+    """
+    Armazena respostas GET em uma tabela SQLite, com chave na URL completa
+    (incluindo os parâmetros). Segura para uso por várias threads.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, ttl_by_host: Optional[Dict[str, int]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Validade em segundos por domínio (o mais específico vence); hosts fora da lista não são guardados
+        self.ttl_by_host = ttl_by_host or {}
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_responses (
+                cache_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_http_responses_access ON http_responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(method: str, url: str) -> str:
+        """Chave do cache: método + URL já com os parâmetros"""
+        return hashlib.sha256(f"{method.upper()} {url}".encode('utf-8')).hexdigest()
+
+    def ttl_for(self, url: str) -> Optional[int]:
+        """Validade configurada para o domínio da URL (None = não guardar)"""
+        host = urlparse(url).netloc.lower()
+        best = None
+        for domain, ttl in self.ttl_by_host.items():
+            if host == domain or host.endswith('.' + domain):
+                if best is None or len(domain) > len(best[0]):
+                    best = (domain, ttl)
+        return best[1] if best else None
+
+    def lookup(self, cache_key: str) -> Optional[Dict]:
+        """Retorna a entrada guardada (vencida ou não) e atualiza o último acesso"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status_code, headers, content, etag, last_modified, expires_at "
+                "FROM http_responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE http_responses SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+            self._conn.commit()
+        return {
+            'url': row[0],
+            'status_code': row[1],
+            'headers': json.loads(row[2]),
+            'content': row[3],
+            'etag': row[4],
+            'last_modified': row[5],
+            'expires_at': row[6]
+        }
+
+    def store(self, cache_key: str, response: requests.Response, ttl: int):
+        """Guarda a resposta e aplica o limite de tamanho"""
+        now = time.time()
+        content = response.content or b''
+        headers = dict(response.headers)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_responses "
+                "(cache_key, url, status_code, headers, content, etag, last_modified, stored_at, expires_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, response.url, response.status_code, json.dumps(headers), content,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 now, now + ttl, now, len(content))
+            )
+            self._metrics['stores'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, cache_key: str, ttl: int):
+        """Renova a validade de uma entrada revalidada (304)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE http_responses SET expires_at = ?, last_access = ? WHERE cache_key = ?",
+                (now + ttl, now, cache_key)
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        """Remove as entradas menos usadas até caber em max_bytes (chamado com o lock)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for cache_key, size in self._conn.execute(
+            "SELECT cache_key, size FROM http_responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM http_responses WHERE cache_key = ?", (cache_key,))
+            total -= size
+            self._metrics['evictions'] += 1
+
+    def record(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM http_responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Acertos, falhas, revalidações, descartes e ocupação do cache"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM http_responses"
+            ).fetchone()
+            metrics = dict(self._metrics)
+        lookups = metrics['hits'] + metrics['revalidated'] + metrics['misses']
+        metrics.update({
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round((metrics['hits'] + metrics['revalidated']) / lookups, 3) if lookups else 0
+        })
+        return metrics
+
+class CachedSession(requests.Session):
+    """
+    requests.Session que consulta o HttpResponseCache antes de cada GET.
+    Resposta dentro da validade: devolvida sem ir à rede. Vencida: revalidada com
+    If-None-Match / If-Modified-Since (304 reaproveita o conteúdo guardado).
+    As respostas servidas do cache têm o atributo from_cache = True.
+    Com refresh=True no GET, o cache não é consultado: a página vem da rede e
+    substitui a cópia guardada.
+    Com adapter, a sessão usa esse pool de conexões em vez de criar o seu.
+    """
+
+    def __init__(self, cache: Optional[HttpResponseCache] = None, adapter=None):
+        super().__init__()
+        self.cache = cache
+        if adapter is not None:
+            self.mount('https://', adapter)
+            self.mount('http://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        refresh = kwargs.pop('refresh', False)
+        params = kwargs.get('params')
+        if self.cache is None or method.upper() != 'GET' or args:
+            return super().request(method, url, *args, **kwargs)
+
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        ttl = self.cache.ttl_for(full_url)
+        if not ttl:
+            return super().request(method, url, *args, **kwargs)
+
+        cache_key = self.cache.make_key('GET', full_url)
+        cached = None if refresh else self.cache.lookup(cache_key)
+
+        if cached and cached['expires_at'] > time.time():
+            self.cache.record('hits')
+            return self._build_response(cached)
+
+        if cached and (cached['etag'] or cached['last_modified']):
+            headers = dict(kwargs.pop('headers', None) or {})
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+            kwargs['headers'] = headers
+
+        response = super().request(method, url, *args, **kwargs)
+
+        if cached and response.status_code == 304:
+            self.cache.record('revalidated')
+            self.cache.refresh(cache_key, ttl)
+            return self._build_response(cached)
+
+        self.cache.record('misses')
+        if response.status_code == 200:
+            self.cache.store(cache_key, response, ttl)
+        return response
+
+    @staticmethod
+    def _build_response(cached: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = cached['status_code']
+        response.headers = CaseInsensitiveDict(cached['headers'])
+        response._content = cached['content']
+        response.url = cached['url']
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = 'OK'
+        response.from_cache = True
+        return response
+
+# Instância global do cache
+response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[HttpResponseCache]:
+    """
+    Retorna o cache de respostas HTTP do processo (None se desativado ou indisponível)
+    """
+    global response_cache
+    if os.getenv('HTTP_CACHE_ENABLED', '1') == '0':
+        return None
+    with _response_cache_lock:
+        if response_cache is None:
+            try:
+                response_cache = HttpResponseCache(
+                    os.getenv('HTTP_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'hostlink_http_cache.sqlite3')),
+                    max_bytes=int(float(os.getenv('HTTP_CACHE_MAX_MB', '50')) * 1024 * 1024),
+                    ttl_by_host={
+                        'airbnb.com.br': int(os.getenv('HTTP_CACHE_TTL_AIRBNB', '900')),
+                        'climatempo.com.br': int(os.getenv('HTTP_CACHE_TTL_CLIMATEMPO', '10800'))
+                    }
+                )
+            except Exception as e:
+                print(f"⚠️ Cache HTTP indisponível: {e}")
+                return None
+    return response_cache
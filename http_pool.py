@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de conexões HTTP compartilhado pelo scraper
+Um único HTTPAdapter por processo, montado em todas as sessões do scraper:
+as conexões TCP/TLS com o Airbnb e o ClimaTempo ficam abertas (keep-alive)
+e são reaproveitadas entre requisições e threads. Falhas temporárias
+(conexão, 429, 5xx) são repetidas com backoff exponencial e jitter.
+"""
+
+import os
+import random
+import threading
+from typing import Dict
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_metrics_lock = threading.Lock()
+_metrics = {'retries': 0}
+
+def _record(metric: str):
+    with _metrics_lock:
+        _metrics[metric] += 1
+
+class JitteredRetry(Retry):
+    """
+    Retry do urllib3 com um atraso aleatório somado ao backoff exponencial,
+    para que várias threads não repitam a requisição no mesmo instante
+    """
+
+    BACKOFF_JITTER = float(os.getenv('SCRAPER_HTTP_BACKOFF_JITTER', '0.5'))
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, self.BACKOFF_JITTER)
+
+    def increment(self, *args, **kwargs):
+        new_retry = super().increment(*args, **kwargs)
+        _record('retries')
+        return new_retry
+
+def build_http_adapter(pool_connections: int = 10, pool_maxsize: int = 16, retries: int = 3,
+                       backoff_factor: float = 0.5) -> HTTPAdapter:
+    """
+    HTTPAdapter com pool dimensionado para as buscas paralelas e retry com jitter
+    Só métodos idempotentes (GET/HEAD) são repetidos; o status final é devolvido
+    ao chamador em vez de virar exceção. Timeout de leitura é repetido no máximo
+    uma vez, para não multiplicar o timeout das páginas lentas.
+    """
+    retry = JitteredRetry(
+        total=retries,
+        connect=retries,
+        read=min(retries, 1),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+        respect_retry_after_header=True
+    )
+    return HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+def pool_stats(adapter: HTTPAdapter) -> Dict:
+    """Conexões abertas, ociosas e requisições por host do pool do adapter"""
+    hosts = {}
+    pools = adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        idle = pool.pool.qsize() if pool.pool is not None else 0
+        hosts[f"{pool.scheme}://{pool.host}"] = {
+            'connections_created': pool.num_connections,
+            'requests': pool.num_requests,
+            'idle': idle,
+            'maxsize': pool.pool.maxsize if pool.pool is not None else 0
+        }
+    with _metrics_lock:
+        retries = _metrics['retries']
+    return {
+        'pool_connections': adapter._pool_connections,
+        'pool_maxsize': adapter._pool_maxsize,
+        'retries': retries,
+        'hosts': hosts
+    }
+
+# Adapter global do processo
+http_adapter = None
+_http_adapter_lock = threading.Lock()
+
+def get_http_adapter() -> HTTPAdapter:
+    """
+    Retorna o HTTPAdapter compartilhado do processo
+    """
+    global http_adapter
+    with _http_adapter_lock:
+        if http_adapter is None:
+            http_adapter = build_http_adapter(
+                pool_connections=int(os.getenv('SCRAPER_HTTP_POOL_CONNECTIONS', '10')),
+                pool_maxsize=int(os.getenv('SCRAPER_HTTP_POOL_MAXSIZE', '16')),
+                retries=int(os.getenv('SCRAPER_HTTP_RETRIES', '3')),
+                backoff_factor=float(os.getenv('SCRAPER_HTTP_BACKOFF', '0.5'))
+            )
+    return http_adapter
+
+def get_http_pool_stats() -> Dict:
+    """Estatísticas do pool compartilhado (para o /health)"""
+    return pool_stats(get_http_adapter())
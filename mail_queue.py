@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fila de envio dos relatórios por email
+Os relatórios entram em uma caixa de saída em SQLite e são montados (HTML) e
+enviados por uma thread própria, fora da requisição web e do monitoramento.
+A conexão SMTP autenticada fica aberta entre envios (verificada com NOOP e
+refeita quando cai), vários relatórios seguem na mesma conexão e falhas
+temporárias são repetidas com backoff exponencial. As senhas ficam só em
+memória: mensagens pendentes de uma conta sem senha registrada aguardam o
+próximo envio dessa conta.
+
+Vários processos podem dividir a mesma caixa de saída: antes de enviar, cada
+mensagem é reservada (status sending, dono e prazo) com um UPDATE condicional,
+então só um processo a envia. Reservas de um processo que morreu voltam para a
+fila quando o prazo vence.
+"""
+
+import os
+import json
+import random
+import smtplib
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Estados de uma mensagem
+QUEUED = 'queued'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+def account_key(email_config: Dict) -> Tuple:
+    """Identifica a conta SMTP (servidor, porta, remetente, STARTTLS) de uma configuração de email"""
+    return (
+        email_config['smtp_server'],
+        int(email_config['smtp_port']),
+        email_config['sender_email'],
+        bool(email_config.get('use_tls', True))
+    )
+
+class MailQueue:
+    """
+    Caixa de saída em SQLite + thread de envio
+    renderer(payload) devolve o corpo HTML da mensagem; o payload (dict) é
+    gravado junto com a mensagem, então a montagem do HTML acontece na thread
+    de envio
+    """
+
+    def __init__(self, path: str, renderer: Callable[[Dict], str], batch_size: int = 10,
+                 max_attempts: int = 5, backoff: float = 30, idle_timeout: float = 60,
+                 smtp_timeout: float = 30, poll_interval: float = 1.0, claim_timeout: float = 600):
+        self.path = path
+        self.renderer = renderer
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        # Espera (segundos) antes da 1ª nova tentativa; dobra a cada falha
+        self.backoff = backoff
+        # Conexão ociosa por mais que isso é encerrada
+        self.idle_timeout = idle_timeout
+        self.smtp_timeout = smtp_timeout
+        self.poll_interval = poll_interval
+        # Prazo da reserva de um lote; vencido, as mensagens voltam para a fila
+        self.claim_timeout = claim_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(3).hex()}"
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._credentials: Dict[Tuple, str] = {}
+        self._smtp = None
+        self._smtp_account = None
+        self._last_used = 0.0
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._metrics = {'submitted': 0, 'sent': 0, 'failed': 0, 'retries': 0, 'connections': 0, 'batches': 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS mail_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                smtp_server TEXT NOT NULL,
+                smtp_port INTEGER NOT NULL,
+                sender TEXT NOT NULL,
+                use_tls INTEGER NOT NULL,
+                recipient TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                sent_at REAL,
+                claimed_by TEXT,
+                claim_expires_at REAL
+            )
+        """)
+        # Caixas de saída criadas antes das reservas não têm as colunas de dono
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(mail_outbox)").fetchall()]
+        if 'claimed_by' not in columns:
+            self._conn.execute("ALTER TABLE mail_outbox ADD COLUMN claimed_by TEXT")
+        if 'claim_expires_at' not in columns:
+            self._conn.execute("ALTER TABLE mail_outbox ADD COLUMN claim_expires_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_mail_outbox_due ON mail_outbox (status, next_attempt_at)")
+        self._conn.commit()
+
+    def submit(self, email_config: Dict, subject: str, payload: Dict) -> int:
+        """Coloca um relatório na caixa de saída e devolve o id da mensagem"""
+        account = account_key(email_config)
+        with self._lock:
+            self._credentials[account] = email_config.get('sender_password') or ''
+            cursor = self._conn.execute(
+                "INSERT INTO mail_outbox (smtp_server, smtp_port, sender, use_tls, recipient, subject, payload, "
+                "status, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (account[0], account[1], account[2], int(account[3]), email_config['recipient_email'],
+                 subject, json.dumps(payload, default=str), QUEUED, time.time(), time.time())
+            )
+            self._conn.commit()
+            self._metrics['submitted'] += 1
+        self._notify()
+        return cursor.lastrowid
+
+    def get(self, message_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, recipient, subject, status, attempts, last_error, created_at, sent_at "
+                "FROM mail_outbox WHERE id = ?", (message_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'recipient': row[1],
+            'subject': row[2],
+            'status': row[3],
+            'attempts': row[4],
+            'last_error': row[5],
+            'created_at': row[6],
+            'sent_at': row[7]
+        }
+
+    def start(self):
+        """Inicia a thread de envio"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._worker_loop, daemon=True, name='mail-queue')
+        self._thread.start()
+        print("📬 Fila de emails iniciada")
+
+    def stop(self):
+        self._stop_event.set()
+        self._notify()
+        if self._thread:
+            self._thread.join(timeout=self.smtp_timeout)
+        self._close_connection()
+
+    def flush(self, timeout: float = 60) -> bool:
+        """
+        Espera as mensagens prontas para envio saírem da fila (útil antes de um
+        processo de linha de comando terminar); False se o tempo acabar antes
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            # Só contam as contas com senha registrada neste processo e os lotes reservados por ele
+            if not self._due_batch()[1] and not self._claimed_count():
+                return True
+            with self._changed:
+                self._changed.wait(0.1)
+        return False
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _due_batch(self) -> Tuple[Optional[Tuple], List[Tuple]]:
+        """Próximas mensagens vencidas de uma mesma conta (com senha registrada)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, smtp_server, smtp_port, sender, use_tls, recipient, subject, payload, attempts "
+                "FROM mail_outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, id",
+                (QUEUED, time.time())
+            ).fetchall()
+            credentials = dict(self._credentials)
+        for row in rows:
+            account = (row[1], row[2], row[3], bool(row[4]))
+            if account in credentials:
+                batch = [r for r in rows if (r[1], r[2], r[3], bool(r[4])) == account]
+                return account, batch[:self.batch_size]
+        return None, []
+
+    def _claimed_count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM mail_outbox WHERE status = ? AND claimed_by = ?", (SENDING, self.owner)
+            ).fetchone()[0]
+
+    def _claim_batch(self) -> Tuple[Optional[Tuple], List[Tuple]]:
+        """
+        Reserva para este processo o próximo lote vencido (atômico entre processos);
+        mensagens que outro processo reservou antes ficam de fora
+        """
+        self._release_expired()
+        account, batch = self._due_batch()
+        if not batch:
+            return None, []
+        claimed = []
+        with self._lock:
+            for row in batch:
+                cursor = self._conn.execute(
+                    "UPDATE mail_outbox SET status = ?, claimed_by = ?, claim_expires_at = ? WHERE id = ? AND status = ?",
+                    (SENDING, self.owner, time.time() + self.claim_timeout, row[0], QUEUED)
+                )
+                if cursor.rowcount == 1:
+                    claimed.append(row)
+            self._conn.commit()
+        return account, claimed
+
+    def _release_expired(self):
+        """Devolve para a fila as mensagens reservadas por processos que pararam no meio do envio"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE mail_outbox SET status = ?, claimed_by = NULL, claim_expires_at = NULL "
+                "WHERE status = ? AND claim_expires_at < ?", (QUEUED, SENDING, time.time())
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            print(f"🔁 {cursor.rowcount} email(s) com envio interrompido voltaram para a fila")
+
+    def _connection(self, account: Tuple) -> smtplib.SMTP:
+        """Conexão autenticada da conta, reaproveitada enquanto responder ao NOOP"""
+        if self._smtp is not None and self._smtp_account == account:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            print("🔌 Conexão SMTP perdida, reconectando")
+        self._close_connection()
+
+        server, port, sender, use_tls = account
+        smtp = smtplib.SMTP(server, port, timeout=self.smtp_timeout)
+        try:
+            smtp.ehlo()
+            if use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            password = self._credentials.get(account)
+            if password:
+                smtp.login(sender, password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp, self._smtp_account = smtp, account
+        self._metrics['connections'] += 1
+        return smtp
+
+    def _close_connection(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp, self._smtp_account = None, None
+
+    def _build_message(self, sender: str, recipient: str, subject: str, payload: str) -> str:
+        msg = MIMEMultipart()
+        msg['From'] = sender
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(self.renderer(json.loads(payload)), 'html', 'utf-8'))
+        return msg.as_string()
+
+    def _send_batch(self, account: Tuple, batch: List[Tuple]):
+        try:
+            smtp = self._connection(account)
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"❌ Erro ao conectar ao servidor SMTP {account[0]}: {e}")
+            for row in batch:
+                self._retry_later(row, str(e))
+            return
+
+        self._metrics['batches'] += 1
+        for index, row in enumerate(batch):
+            message_id, recipient, subject, payload = row[0], row[5], row[6], row[7]
+            try:
+                text = self._build_message(account[2], recipient, subject, payload)
+            except Exception as e:
+                # Erro ao montar o HTML se repetiria em toda tentativa
+                print(f"❌ Erro ao montar o email {message_id}: {e}")
+                self._finish(message_id, FAILED, f"Erro ao montar o relatório: {e}")
+                continue
+            try:
+                smtp.sendmail(account[2], recipient, text)
+            except smtplib.SMTPRecipientsRefused as e:
+                # Destinatário recusado não melhora com nova tentativa
+                print(f"❌ Email {message_id} recusado pelo servidor: {e}")
+                self._finish(message_id, FAILED, str(e))
+                continue
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # Conexão caiu no meio do lote: o restante volta na próxima rodada
+                print(f"⚠️ Conexão SMTP caiu durante o envio: {e}")
+                self._close_connection()
+                for pending in batch[index:]:
+                    self._retry_later(pending, str(e))
+                return
+            except Exception as e:
+                print(f"⚠️ Falha ao enviar email {message_id}: {e}")
+                self._retry_later(row, str(e))
+                continue
+            self._finish(message_id, SENT)
+            print(f"✅ Email enviado com sucesso para {recipient}")
+        self._last_used = time.time()
+
+    def _retry_later(self, row: Tuple, error: str):
+        message_id, attempts = row[0], row[8] + 1
+        if attempts >= self.max_attempts:
+            print(f"❌ Email {message_id} descartado após {attempts} tentativas: {error}")
+            self._finish(message_id, FAILED, error, attempts)
+            return
+        delay = self.backoff * (2 ** (attempts - 1))
+        delay += random.uniform(0, delay * 0.1)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE mail_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                "claimed_by = NULL, claim_expires_at = NULL WHERE id = ?",
+                (QUEUED, attempts, time.time() + delay, error, message_id)
+            )
+            self._conn.commit()
+            self._metrics['retries'] += 1
+
+    def _finish(self, message_id: int, status: str, error: Optional[str] = None, attempts: Optional[int] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE mail_outbox SET status = ?, last_error = ?, sent_at = ?, attempts = COALESCE(?, attempts + 1), "
+                "claimed_by = NULL, claim_expires_at = NULL WHERE id = ?",
+                (status, error, time.time() if status == SENT else None, attempts, message_id)
+            )
+            self._conn.commit()
+            self._metrics['sent' if status == SENT else 'failed'] += 1
+        self._notify()
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                account, batch = self._claim_batch()
+                if batch:
+                    self._send_batch(account, batch)
+                    continue
+                if self._smtp is not None and time.time() - self._last_used > self.idle_timeout:
+                    self._close_connection()
+            except Exception as e:
+                print(f"❌ Erro na fila de emails: {e}")
+            with self._changed:
+                self._changed.wait(self.poll_interval)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM mail_outbox GROUP BY status"
+            ).fetchall())
+            metrics = dict(self._metrics)
+        metrics.update({
+            'queued': counts.get(QUEUED, 0),
+            'sending': counts.get(SENDING, 0),
+            'delivered': counts.get(SENT, 0),
+            'undeliverable': counts.get(FAILED, 0),
+            'connected': self._smtp is not None
+        })
+        return metrics
+
+# Fila global do processo
+mail_queue = None
+_mail_queue_lock = threading.Lock()
+
+def get_mail_queue(renderer: Optional[Callable[[Dict], str]] = None) -> Optional[MailQueue]:
+    """
+    Retorna a fila de emails do processo; na primeira chamada, renderer é
+    obrigatório e a thread de envio é iniciada. None se MAIL_QUEUE_ENABLED=0
+    ou se a fila não puder ser criada (os relatórios seguem por envio direto)
+    """
+    global mail_queue
+    with _mail_queue_lock:
+        if mail_queue is None and renderer is not None and os.getenv('MAIL_QUEUE_ENABLED', '1') == '1':
+            try:
+                mail_queue = MailQueue(
+                    os.getenv('MAIL_QUEUE_PATH', os.path.join(tempfile.gettempdir(), 'hostlink_mail_outbox.sqlite3')),
+                    renderer,
+                    batch_size=int(os.getenv('MAIL_BATCH_SIZE', '10')),
+                    max_attempts=int(os.getenv('MAIL_MAX_ATTEMPTS', '5')),
+                    backoff=float(os.getenv('MAIL_RETRY_BACKOFF', '30')),
+                    idle_timeout=float(os.getenv('MAIL_IDLE_TIMEOUT', '60'))
+                )
+                mail_queue.start()
+            except Exception as e:
+                print(f"⚠️ Fila de emails indisponível: {e}")
+                return None
+    return mail_queue
+
+def flush_mail_queue(timeout: float = 60) -> bool:
+    """Espera a fila de emails do processo esvaziar (sem fila criada, nada a esperar)"""
+    return mail_queue.flush(timeout) if mail_queue is not None else True
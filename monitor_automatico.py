@@ -6,6 +6,7 @@ Executa análise competitiva 2x ao dia e envia relatórios por email
 """
 
 from airbnb_scraper import AirbnbClimateScraper
+from mail_queue import flush_mail_queue
 import sys
 import os
 from datetime import datetime
@@ -69,6 +70,11 @@ def main():
         else:
             print("❌ Responda com 's' para sim ou 'n' para não")
     
+    # Anúncio a monitorar
+    listing_url = ''
+    while not listing_url:
+        listing_url = input("🔗 Link do seu anúncio no Airbnb: ").strip()
+    
     # Criar scraper
     scraper = AirbnbClimateScraper(email_config)
     
@@ -78,7 +84,7 @@ def main():
     
     # Iniciar monitoramento
     try:
-        scraper.start_automated_monitoring(my_listing_beachfront)
+        scraper.start_automated_monitoring(my_listing_beachfront, listing_url)
     except KeyboardInterrupt:
         print("\n\n🛑 Monitoramento interrompido pelo usuário")
     except Exception as e:
@@ -122,7 +128,11 @@ def teste_analise():
         
         print("\n✅ Análise de teste concluída com sucesso!")
         if result['email_sent']:
-            print("📧 Email de teste enviado")
+            # O envio acontece em segundo plano: esperar antes de o processo terminar
+            if flush_mail_queue(timeout=60):
+                print("📧 Email de teste enviado")
+            else:
+                print("📧 Email de teste ainda na fila de envio (servidor SMTP lento ou indisponível)")
         else:
             print("📧 Email não enviado (verifique configurações)")
             
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agendador do monitoramento automático
+Único ponto de agendamento das análises automáticas: os jobs (um por anúncio,
+cada um com sua cadência) ficam em SQLite e sobrevivem a reinícios. Só o
+processo que detém o lock de arquivo (líder) executa os jobs, então vários
+workers do gunicorn não repetem o mesmo scraping; se o líder morrer, o lock é
+liberado e outro processo assume. Os horários recebem jitter para espalhar a
+carga.
+
+Cada ponto de entrada (web_app, api/app.py, CLI do monitor_automatico) tem
+seu tipo de job e seu próprio lock: o líder de um tipo só executa os jobs
+desse tipo, com o runner do processo que os criou.
+
+Monitoramento incremental: cada job guarda a impressão digital (hash) das
+entradas da última análise completa. Se a impressão atual for igual, a
+análise é pulada e só um heartbeat é registrado.
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, o processo local é sempre o líder
+    fcntl = None
+
+JOBS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        kind TEXT NOT NULL DEFAULT 'web',
+        listing_url TEXT NOT NULL,
+        user_id INTEGER,
+        beachfront INTEGER NOT NULL DEFAULT 1,
+        adults INTEGER NOT NULL DEFAULT 2,
+        cadence_seconds INTEGER NOT NULL,
+        enabled INTEGER NOT NULL DEFAULT 1,
+        next_run_at REAL NOT NULL,
+        last_run_at REAL,
+        last_status TEXT,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        fingerprint TEXT,
+        PRIMARY KEY (kind, listing_url)
+    )
+"""
+
+def next_weekend(today: Optional[datetime] = None) -> Dict[str, str]:
+    """Check-in na próxima sexta e check-out no domingo seguinte"""
+    today = today or datetime.now()
+    days_until_friday = (4 - today.weekday()) % 7
+    if days_until_friday == 0 and today.weekday() >= 4:
+        days_until_friday = 7
+    next_friday = today + timedelta(days=days_until_friday)
+    return {
+        'checkin': next_friday.strftime('%Y-%m-%d'),
+        'checkout': (next_friday + timedelta(days=2)).strftime('%Y-%m-%d')
+    }
+
+class MonitoringScheduler:
+    """
+    Jobs de monitoramento persistentes com eleição de líder por lock de arquivo
+    runner(job) executa um job vencido (dict com listing_url, beachfront, adults...);
+    kind separa os jobs de cada ponto de entrada no mesmo banco
+    """
+
+    def __init__(self, path: str, lock_path: str, runner: Callable[[Dict], object],
+                 tick_interval: float = 30, jitter: float = 0.1, start_spread: float = 60, kind: str = 'web'):
+        self.path = path
+        self.kind = kind
+        # Um lock por tipo: cada tipo tem seu líder
+        self.lock_path = f"{lock_path}.{kind}"
+        self.runner = runner
+        self.tick_interval = tick_interval
+        # Fração da cadência sorteada para mais ou para menos em cada reagendamento
+        self.jitter = jitter
+        # Janela (segundos) em que cai a primeira execução de um job novo
+        self.start_spread = start_spread
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._metrics = {'runs': 0, 'failures': 0, 'changed': 0, 'skipped': 0, 'last_tick': None}
+        self.heartbeat_limit = 200
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(JOBS_TABLE.format(name='monitoring_jobs'))
+        # Bancos criados antes do monitoramento incremental não têm a coluna fingerprint
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(monitoring_jobs)").fetchall()]
+        if 'fingerprint' not in columns:
+            self._conn.execute("ALTER TABLE monitoring_jobs ADD COLUMN fingerprint TEXT")
+        # Bancos criados antes dos tipos de job: a chave passa a ser (kind, listing_url)
+        # e os jobs existentes ficam com o web_app
+        if 'kind' not in columns:
+            self._conn.execute("ALTER TABLE monitoring_jobs RENAME TO monitoring_jobs_old")
+            self._conn.execute(JOBS_TABLE.format(name='monitoring_jobs'))
+            self._conn.execute("""
+                INSERT INTO monitoring_jobs (kind, listing_url, user_id, beachfront, adults, cadence_seconds, enabled,
+                    next_run_at, last_run_at, last_status, last_error, created_at, fingerprint)
+                SELECT 'web', listing_url, user_id, beachfront, adults, cadence_seconds, enabled,
+                    next_run_at, last_run_at, last_status, last_error, created_at, fingerprint
+                FROM monitoring_jobs_old
+            """)
+            self._conn.execute("DROP TABLE monitoring_jobs_old")
+            self._conn.execute("DROP INDEX IF EXISTS idx_monitoring_jobs_due")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_monitoring_jobs_due ON monitoring_jobs (kind, enabled, next_run_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS monitoring_heartbeats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL DEFAULT 'web',
+                listing_url TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                fingerprint TEXT,
+                changed INTEGER NOT NULL
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(monitoring_heartbeats)").fetchall()]
+        if 'kind' not in columns:
+            self._conn.execute("ALTER TABLE monitoring_heartbeats ADD COLUMN kind TEXT NOT NULL DEFAULT 'web'")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_monitoring_heartbeats_url ON monitoring_heartbeats (listing_url, id)")
+        self._conn.commit()
+
+    def _row_to_job(self, row) -> Dict:
+        return {
+            'listing_url': row[0],
+            'user_id': row[1],
+            'beachfront': bool(row[2]),
+            'adults': row[3],
+            'cadence_seconds': row[4],
+            'enabled': bool(row[5]),
+            'next_run_at': row[6],
+            'last_run_at': row[7],
+            'last_status': row[8],
+            'last_error': row[9],
+            'fingerprint': row[10]
+        }
+
+    def upsert_job(self, listing_url: str, cadence_seconds: int, beachfront: bool = True,
+                   adults: int = 2, user_id: Optional[int] = None) -> Dict:
+        """Cria ou reativa o monitoramento de um anúncio"""
+        next_run_at = time.time() + random.uniform(0, self.start_spread)
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO monitoring_jobs
+                    (kind, listing_url, user_id, beachfront, adults, cadence_seconds, enabled, next_run_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT(kind, listing_url) DO UPDATE SET
+                    user_id = COALESCE(excluded.user_id, user_id),
+                    beachfront = excluded.beachfront,
+                    adults = excluded.adults,
+                    cadence_seconds = excluded.cadence_seconds,
+                    next_run_at = CASE WHEN enabled = 1 THEN next_run_at ELSE excluded.next_run_at END,
+                    enabled = 1
+            """, (self.kind, listing_url, user_id, int(beachfront), adults, int(cadence_seconds), next_run_at, time.time()))
+            self._conn.commit()
+        return self.get_job(listing_url)
+
+    def disable_job(self, listing_url: Optional[str] = None) -> int:
+        """Pausa o monitoramento de um anúncio (ou de todos); retorna quantos foram pausados"""
+        with self._lock:
+            if listing_url:
+                cursor = self._conn.execute(
+                    "UPDATE monitoring_jobs SET enabled = 0 WHERE kind = ? AND listing_url = ? AND enabled = 1",
+                    (self.kind, listing_url)
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE monitoring_jobs SET enabled = 0 WHERE kind = ? AND enabled = 1", (self.kind,)
+                )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def get_job(self, listing_url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT listing_url, user_id, beachfront, adults, cadence_seconds, enabled, next_run_at, "
+                "last_run_at, last_status, last_error, fingerprint FROM monitoring_jobs WHERE kind = ? AND listing_url = ?",
+                (self.kind, listing_url)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_jobs(self, enabled_only: bool = False) -> List[Dict]:
+        query = (
+            "SELECT listing_url, user_id, beachfront, adults, cadence_seconds, enabled, next_run_at, "
+            "last_run_at, last_status, last_error, fingerprint FROM monitoring_jobs WHERE kind = ?"
+        )
+        if enabled_only:
+            query += " AND enabled = 1"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY next_run_at", (self.kind,)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def has_active_jobs(self) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM monitoring_jobs WHERE kind = ? AND enabled = 1 LIMIT 1", (self.kind,)
+            ).fetchone() is not None
+
+    def has_changed(self, job: Dict, fingerprint: Optional[str]) -> bool:
+        """
+        True se as entradas do anúncio mudaram desde a última análise completa
+        (ou se não há como comparar); quando não mudaram, registra só um heartbeat
+        """
+        if not fingerprint or fingerprint != job.get('fingerprint'):
+            return True
+        self._record_heartbeat(job['listing_url'], fingerprint, changed=False)
+        print(f"💤 Sem mudanças em {job['listing_url']}: análise pulada")
+        return False
+
+    def save_fingerprint(self, listing_url: str, fingerprint: Optional[str]):
+        """Guarda a impressão digital da análise completa que acabou de rodar"""
+        if not fingerprint:
+            return
+        with self._lock:
+            self._conn.execute(
+                "UPDATE monitoring_jobs SET fingerprint = ? WHERE kind = ? AND listing_url = ?",
+                (fingerprint, self.kind, listing_url)
+            )
+            self._conn.commit()
+        self._record_heartbeat(listing_url, fingerprint, changed=True)
+
+    def _record_heartbeat(self, listing_url: str, fingerprint: Optional[str], changed: bool):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO monitoring_heartbeats (kind, listing_url, checked_at, fingerprint, changed) VALUES (?, ?, ?, ?, ?)",
+                (self.kind, listing_url, time.time(), fingerprint, int(changed))
+            )
+            # Manter só os heartbeats mais recentes de cada anúncio
+            self._conn.execute(
+                "DELETE FROM monitoring_heartbeats WHERE kind = ? AND listing_url = ? AND id NOT IN "
+                "(SELECT id FROM monitoring_heartbeats WHERE kind = ? AND listing_url = ? ORDER BY id DESC LIMIT ?)",
+                (self.kind, listing_url, self.kind, listing_url, self.heartbeat_limit)
+            )
+            self._conn.commit()
+            self._metrics['skipped' if not changed else 'changed'] += 1
+
+    def heartbeats(self, listing_url: str, limit: int = 20) -> List[Dict]:
+        """Últimas verificações do anúncio (changed = False quando a análise foi pulada)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT checked_at, fingerprint, changed FROM monitoring_heartbeats "
+                "WHERE kind = ? AND listing_url = ? ORDER BY id DESC LIMIT ?", (self.kind, listing_url, limit)
+            ).fetchall()
+        return [{'checked_at': row[0], 'fingerprint': row[1], 'changed': bool(row[2])} for row in rows]
+
+    def _next_run(self, cadence_seconds: int) -> float:
+        return time.time() + cadence_seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def is_leader(self) -> bool:
+        """Tenta obter (ou confirma) o lock de líder deste processo"""
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            self._lock_file = True
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        print(f"👑 Este processo (PID {os.getpid()}) assumiu o agendador de monitoramento ({self.kind})")
+        return True
+
+    def release_leadership(self):
+        if self._lock_file not in (None, True):
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+        self._lock_file = None
+
+    def run_due_jobs(self) -> int:
+        """
+        Executa os jobs vencidos (só no líder); cada job é reagendado antes de
+        rodar, então uma falha no meio não o repete em seguida
+        Retorna quantos jobs foram executados
+        """
+        self._metrics['last_tick'] = time.time()
+        if not self.is_leader():
+            return 0
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT listing_url, user_id, beachfront, adults, cadence_seconds, enabled, next_run_at, "
+                "last_run_at, last_status, last_error, fingerprint FROM monitoring_jobs "
+                "WHERE kind = ? AND enabled = 1 AND next_run_at <= ? ORDER BY next_run_at", (self.kind, time.time())
+            ).fetchall()
+            for row in rows:
+                self._conn.execute(
+                    "UPDATE monitoring_jobs SET next_run_at = ?, last_run_at = ? WHERE kind = ? AND listing_url = ?",
+                    (self._next_run(row[4]), time.time(), self.kind, row[0])
+                )
+            self._conn.commit()
+
+        for row in rows:
+            job = self._row_to_job(row)
+            try:
+                status = self.runner(job) or 'ok'
+                error = None
+                self._metrics['runs'] += 1
+            except Exception as e:
+                print(f"❌ Erro no monitoramento de {job['listing_url']}: {e}")
+                status, error = 'error', str(e)
+                self._metrics['failures'] += 1
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE monitoring_jobs SET last_status = ?, last_error = ? WHERE kind = ? AND listing_url = ?",
+                    (str(status), error, self.kind, job['listing_url'])
+                )
+                self._conn.commit()
+        return len(rows)
+
+    def start(self) -> bool:
+        """Inicia o laço do agendador em uma thread (retorna False se já estiver rodando)"""
+        if self._thread and self._thread.is_alive():
+            return False
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run_forever, daemon=True, name='monitoring-scheduler')
+        self._thread.start()
+        return True
+
+    def run_forever(self):
+        """Laço do agendador: confere os jobs vencidos a cada tick_interval segundos"""
+        while not self._stop_event.is_set():
+            try:
+                self.run_due_jobs()
+            except Exception as e:
+                print(f"❌ Erro no agendador de monitoramento: {e}")
+            self._stop_event.wait(self.tick_interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.release_leadership()
+
+    def stats(self) -> Dict:
+        jobs = self.list_jobs()
+        enabled = [job for job in jobs if job['enabled']]
+        return {
+            'kind': self.kind,
+            'leader': self._lock_file is not None,
+            'pid': os.getpid(),
+            'jobs': len(jobs),
+            'enabled': len(enabled),
+            'next_run_at': enabled[0]['next_run_at'] if enabled else None,
+            'runs': self._metrics['runs'],
+            'failures': self._metrics['failures'],
+            'changed': self._metrics['changed'],
+            'skipped': self._metrics['skipped'],
+            'last_tick': self._metrics['last_tick']
+        }
+
+# Agendador global do processo
+monitoring_scheduler = None
+_monitoring_scheduler_lock = threading.Lock()
+
+def get_monitoring_scheduler(runner: Optional[Callable[[Dict], object]] = None,
+                             kind: str = 'web') -> Optional[MonitoringScheduler]:
+    """
+    Retorna o agendador de monitoramento do processo; na primeira chamada,
+    runner é obrigatório e kind identifica o ponto de entrada ('web', 'api' ou 'cli')
+    """
+    global monitoring_scheduler
+    with _monitoring_scheduler_lock:
+        if monitoring_scheduler is None and runner is not None:
+            base_dir = tempfile.gettempdir()
+            try:
+                monitoring_scheduler = MonitoringScheduler(
+                    os.getenv('MONITORING_DB_PATH', os.path.join(base_dir, 'hostlink_monitoring.sqlite3')),
+                    os.getenv('MONITORING_LOCK_PATH', os.path.join(base_dir, 'hostlink_monitoring.lock')),
+                    runner,
+                    tick_interval=float(os.getenv('MONITORING_TICK_INTERVAL', '30')),
+                    jitter=float(os.getenv('MONITORING_JITTER', '0.1')),
+                    kind=kind
+                )
+            except Exception as e:
+                print(f"⚠️ Agendador de monitoramento indisponível: {e}")
+                return None
+    return monitoring_scheduler
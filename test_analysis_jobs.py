@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste da fila de análises em segundo plano (analysis_jobs)
+Confere execução com eventos de progresso, união de pedidos iguais, falhas,
+recuperação de jobs interrompidos e processos dividindo o mesmo arquivo
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_jobs import AnalysisJobQueue, DONE, FAILED, QUEUED, RUNNING
+
+def wait_finished(queue, job_id, timeout=5):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        job = queue.get(job_id)
+        if job['status'] in (DONE, FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} não terminou")
+
+def test_jobs_run_and_coalesce():
+    liberar = threading.Event()
+    execucoes = []
+
+    def handler(params, report):
+        execucoes.append(params)
+        report('scraping', 'Buscando dados')
+        liberar.wait(5)
+        return {'suggested_price': 250, 'listing_url': params['listing_url']}
+
+    queue = AnalysisJobQueue(tempfile.mktemp(suffix='.sqlite3'), handler, workers=1, poll_interval=0.1)
+    queue.start()
+
+    primeiro = queue.submit({'listing_url': 'https://www.airbnb.com.br/rooms/1'}, 'rooms/1|2026-01-10')
+    segundo = queue.submit({'listing_url': 'https://www.airbnb.com.br/rooms/1'}, 'rooms/1|2026-01-10')
+    outro = queue.submit({'listing_url': 'https://www.airbnb.com.br/rooms/2'}, 'rooms/2|2026-01-10')
+    assert not primeiro['coalesced'] and segundo['coalesced']
+    assert segundo['job_id'] == primeiro['job_id'] and outro['job_id'] != primeiro['job_id']
+
+    liberar.set()
+    job = wait_finished(queue, primeiro['job_id'])
+    assert job['result']['suggested_price'] == 250
+    assert [event['stage'] for event in job['events']] == ['started', 'scraping']
+    wait_finished(queue, outro['job_id'])
+    assert len(execucoes) == 2
+
+    # Depois de concluído, o mesmo pedido gera um job novo
+    novo = queue.submit({'listing_url': 'https://www.airbnb.com.br/rooms/1'}, 'rooms/1|2026-01-10')
+    assert not novo['coalesced']
+    assert queue.stats()['coalesced'] == 1
+    print("✅ Execução e união de pedidos OK")
+
+def test_failure_and_recovery():
+    def handler(params, report):
+        raise ValueError("Link do anúncio é obrigatório para análise")
+
+    path = tempfile.mktemp(suffix='.sqlite3')
+    queue = AnalysisJobQueue(path, handler, workers=1, poll_interval=0.1)
+    queue.start()
+    job = wait_finished(queue, queue.submit({}, 'sem-link')['job_id'])
+    assert job['status'] == FAILED and 'obrigatório' in job['error']
+
+    # Job que ficou "em execução" quando o processo parou (lease vencido) volta para a fila
+    parado = AnalysisJobQueue(path, handler, workers=0, lease_seconds=0.01)
+    job_id = parado.submit({}, 'interrompido')['job_id']
+    parado._claim_next()
+    time.sleep(0.05)
+    novo = AnalysisJobQueue(path, lambda params, report: {'ok': True}, workers=0)
+    novo.start()
+    assert novo.get(job_id)['status'] == QUEUED
+    print("✅ Falha e recuperação OK")
+
+def test_live_lease_not_requeued_by_sibling():
+    execucoes = []
+    liberar = threading.Event()
+
+    def handler(params, report):
+        execucoes.append(threading.current_thread().name)
+        liberar.wait(5)
+        return {'ok': True}
+
+    # Dois processos (workers do gunicorn) no mesmo arquivo
+    path = tempfile.mktemp(suffix='.sqlite3')
+    primeiro = AnalysisJobQueue(path, handler, workers=1, poll_interval=0.05, lease_seconds=0.3)
+    primeiro.start()
+    job_id = primeiro.submit({}, 'rooms/1|2026-01-10')['job_id']
+    limite = time.time() + 5
+    while primeiro.get(job_id)['status'] == QUEUED and time.time() < limite:
+        time.sleep(0.02)
+
+    # O irmão sobe com o job em andamento: o lease renovado impede que ele volte para a fila
+    segundo = AnalysisJobQueue(path, handler, workers=1, poll_interval=0.05, lease_seconds=0.3)
+    segundo.start()
+    time.sleep(0.8)
+    assert segundo.get(job_id)['status'] == RUNNING
+
+    liberar.set()
+    assert wait_finished(segundo, job_id)['status'] == DONE
+    assert len(execucoes) == 1
+    print("✅ Job com lease ativo não roda duas vezes OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DA FILA DE ANÁLISES")
+    print("=" * 50)
+    test_jobs_run_and_coalesce()
+    test_failure_and_recovery()
+    test_live_lease_not_requeued_by_sibling()
+    print("\n🎉 Todos os testes passaram!")
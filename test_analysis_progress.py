@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste dos eventos de andamento da análise (transmitidos via SSE)
+Confere que cada etapa do pipeline gera seu evento tipado, na ordem em que acontece
+"""
+
+import os
+import sys
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from airbnb_scraper import AirbnbClimateScraper
+
+URL = 'https://www.airbnb.com.br/rooms/123'
+
+def collector():
+    events = []
+
+    def report(stage, message, **data):
+        events.append((stage, data))
+
+    return events, report
+
+def test_pipeline_events_in_order():
+    scraper = AirbnbClimateScraper()
+    scraper.analyze_specific_listing = lambda *args, **kwargs: [
+        {'title': 'Casa', 'price_per_night': 300, 'is_beachfront': True, 'municipality': 'Paraty'}
+    ]
+    scraper.get_weather_forecast = lambda municipality=None, force_refresh=False: [
+        {'date': '2030-07-05', 'rain_probability': 10}
+    ]
+    scraper.send_email_report = lambda *args: False
+
+    events, report = collector()
+    result = scraper.run_competitive_analysis('2030-07-05', '2030-07-07', True, 2, URL, progress=report)
+
+    assert [stage for stage, _ in events] == ['listing_extracted', 'weather_fetched', 'pricing_computed', 'email_sent']
+    assert events[0][1]['listing']['title'] == 'Casa'
+    assert events[1][1]['municipality'] == 'Paraty'
+    assert events[2][1]['pricing'] is result['pricing_suggestion']
+    assert events[3][1]['sent'] is False
+    print("✅ Eventos do pipeline na ordem OK")
+
+def test_event_per_competitor_search():
+    scraper = AirbnbClimateScraper()
+
+    def busca(config, base_url):
+        if config['name'] == 'Busca Região Ampliada':
+            raise RuntimeError('bloqueado')
+        return [{'title': config['name'], 'price_per_night': 200, 'is_beachfront': False, 'listing_url': ''}]
+
+    scraper._run_search = busca
+    events, report = collector()
+    result = scraper.get_competitive_analysis('2030-07-05', '2030-07-07', progress=report)
+
+    searches = [data for stage, data in events if stage == 'search_completed']
+    assert len(searches) == result['searches_total']
+    assert sum(1 for data in searches if 'error' in data) == 1
+    assert max(data.get('completed', 0) for data in searches) == result['searches_completed']
+    print("✅ Um evento por busca de concorrentes OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DOS EVENTOS DE ANDAMENTO DA ANÁLISE")
+    print("=" * 50)
+    test_pipeline_events_in_order()
+    test_event_per_competitor_search()
+    print("\n🎉 Todos os testes passaram!")
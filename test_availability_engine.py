@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do motor de disponibilidade em memória (AvailabilityEngine)
+Não acessa o banco: monta a ocupação manualmente e confere as respostas
+"""
+
+import os
+import sys
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import AvailabilityEngine
+
+def build_engine():
+    """Janela de janeiro/2026 com uma reserva e um bloqueio no anúncio 1"""
+    engine = AvailabilityEngine('2026-01-01', '2026-01-31')
+    engine.add_listing(1)
+    engine.add_listing(2)
+    engine.add_booking(1, '2026-01-05', '2026-01-07')
+    engine.add_blocked_date(1, '2026-01-10')
+    return engine
+
+def test_is_available():
+    engine = build_engine()
+    assert engine.is_available(1, '2026-01-01', '2026-01-04')
+    assert not engine.is_available(1, '2026-01-04', '2026-01-05')
+    # checkout conta como ocupado, igual a check_availability
+    assert not engine.is_available(1, '2026-01-07', '2026-01-07')
+    assert engine.is_available(1, '2026-01-08', '2026-01-09')
+    assert not engine.is_available(1, '2026-01-10', '2026-01-10')
+    assert engine.is_available(2, '2026-01-01', '2026-01-31')
+    print("✅ is_available OK")
+
+def test_next_available_date():
+    engine = build_engine()
+    assert engine.get_next_available_date(1, '2026-01-05') == '2026-01-08'
+    assert engine.get_next_available_date(1, '2026-01-10') == '2026-01-11'
+    assert engine.get_next_available_date(2, '2026-01-05') == '2026-01-05'
+    print("✅ get_next_available_date OK")
+
+def test_available_period():
+    engine = build_engine()
+    assert engine.get_available_period(1, '2026-01-01') == {'start_date': '2026-01-01', 'end_date': '2026-01-04'}
+    assert engine.get_available_period(1, '2026-01-06') == {'start_date': '2026-01-08', 'end_date': '2026-01-09'}
+    assert engine.get_available_period(1, '2026-01-11') == {'start_date': '2026-01-11', 'end_date': '2026-01-31'}
+    print("✅ get_available_period OK")
+
+def test_summarize():
+    engine = build_engine()
+    summary = engine.summarize(1, '2026-01-06', '2026-01-08')
+    assert summary['available'] is False
+    assert summary['next_available_date'] == '2026-01-08'
+    assert summary['available_period'] == {'start_date': '2026-01-08', 'end_date': '2026-01-09'}
+    print("✅ summarize OK")
+
+def test_day_map():
+    engine = build_engine()
+    days = engine.day_map(1, '2026-01-04', '2026-01-08')
+    assert days == {
+        '2026-01-04': True,
+        '2026-01-05': False,
+        '2026-01-06': False,
+        '2026-01-07': False,
+        '2026-01-08': True
+    }
+    assert len(engine.day_map(2)) == 31
+    print("✅ day_map OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DO MOTOR DE DISPONIBILIDADE")
+    print("=" * 50)
+    test_is_available()
+    test_next_available_date()
+    test_available_period()
+    test_summarize()
+    test_day_map()
+    print("\n🎉 Todos os testes passaram!")
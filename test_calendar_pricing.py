@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do calendário mensal de preços (calendar_pricing)
+Confere que o mês sai de uma única previsão do tempo, com fatores por dia e cache
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from calendar_pricing import CalendarPricingService
+
+SNAPSHOT = {
+    'pricing_suggestion': {'suggested_price': 300, 'discount_percentage': 7},
+    'extracted_municipality': 'Paraty',
+    'timestamp': '2026-01-01T10:00:00'
+}
+
+def build_service():
+    service = CalendarPricingService(ttl=60)
+    calls = []
+
+    def previsao(municipality=None, force_refresh=False):
+        calls.append(municipality)
+        hoje = datetime.now()
+        return [
+            {'date': (hoje + timedelta(days=i)).strftime('%Y-%m-%d'), 'rain_probability': 10, 'weather_condition': 'Ensolarado'}
+            for i in range(15)
+        ]
+
+    service.scraper.get_weather_forecast = previsao
+    return service, calls
+
+def test_month_from_single_snapshot():
+    service, calls = build_service()
+    hoje = datetime.now()
+    result = service.get_month(hoje.year, hoje.month, snapshot=SNAPSHOT)
+
+    assert calls == ['Paraty']
+    assert result['source'] == 'latest_analysis' and not result['cached']
+    assert len(result['data']) >= 28
+    assert all(day['discount'] == 7 for day in result['data'])
+
+    today = next(day for day in result['data'] if day['date'] == hoje.strftime('%Y-%m-%d'))
+    assert today['has_forecast'] and today['rain_probability'] == 10
+    assert today['weather_icon'] == 'fas fa-sun'
+    print("✅ Mês montado com uma única previsão OK")
+
+def test_period_factors_and_cache():
+    service, calls = build_service()
+    result = service.get_month(2030, 7, snapshot=SNAPSHOT)
+    days = {day['date']: day for day in result['data']}
+
+    # Sem previsão: probabilidade média, preço base em dia útil e +30% no fim de semana
+    assert days['2030-07-03']['price'] == 300 and not days['2030-07-03']['has_forecast']
+    assert days['2030-07-06']['price'] == 390 and days['2030-07-06']['is_weekend']
+
+    again = service.get_month(2030, 7, snapshot=SNAPSHOT)
+    assert again['cached'] and len(calls) == 1
+
+    # Nova análise = novo snapshot = mês recalculado
+    service.get_month(2030, 7, snapshot=dict(SNAPSHOT, timestamp='2026-01-02T10:00:00'))
+    assert len(calls) == 2
+    print("✅ Fatores por dia e cache OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DO CALENDÁRIO DE PREÇOS")
+    print("=" * 50)
+    test_month_from_single_snapshot()
+    test_period_factors_and_cache()
+    print("\n🎉 Todos os testes passaram!")
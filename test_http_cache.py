@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do cache de respostas HTTP do scraper (http_cache)
+Sobe um servidor local com ETag e confere acerto, revalidação 304 e descarte LRU
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from http_cache import HttpResponseCache, CachedSession
+
+REQUESTS = {'200': 0, '304': 0}
+
+class PaginaHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"v1"':
+            REQUESTS['304'] += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        REQUESTS['200'] += 1
+        body = (f"pagina {self.path} " + 'x' * 3000).encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_server():
+    server = HTTPServer(('127.0.0.1', 0), PaginaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def build_session(server, ttl=1, max_bytes=10000):
+    cache = HttpResponseCache(
+        tempfile.mktemp(suffix='.sqlite3'),
+        max_bytes=max_bytes,
+        ttl_by_host={f'127.0.0.1:{server.server_port}': ttl}
+    )
+    return CachedSession(cache), cache
+
+def test_hit_and_revalidation():
+    server = start_server()
+    session, cache = build_session(server)
+    url = f'http://127.0.0.1:{server.server_port}/anuncio'
+    REQUESTS.update({'200': 0, '304': 0})
+
+    first = session.get(url, params={'checkin': '2026-01-01'})
+    second = session.get(url, params={'checkin': '2026-01-01'})
+    assert not getattr(first, 'from_cache', False)
+    assert second.from_cache and second.text == first.text
+    assert REQUESTS == {'200': 1, '304': 0}
+
+    # Parâmetros diferentes são outra entrada
+    session.get(url, params={'checkin': '2026-01-02'})
+    assert REQUESTS['200'] == 2
+
+    # Depois da validade, revalida com ETag e reaproveita o conteúdo
+    time.sleep(1.1)
+    third = session.get(url, params={'checkin': '2026-01-01'})
+    assert third.from_cache and third.text == first.text
+    assert REQUESTS['304'] == 1
+
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['revalidated'] == 1 and stats['misses'] == 2
+
+    # refresh=True ignora a cópia válida, vai à rede e atualiza o cache
+    fourth = session.get(url, params={'checkin': '2026-01-01'}, refresh=True)
+    assert not getattr(fourth, 'from_cache', False)
+    assert REQUESTS == {'200': 3, '304': 1}
+    assert session.get(url, params={'checkin': '2026-01-01'}).from_cache
+    server.shutdown()
+    print("✅ Acerto e revalidação OK")
+
+def test_lru_eviction():
+    server = start_server()
+    session, cache = build_session(server, ttl=60, max_bytes=7000)
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    session.get(base + '/a')
+    session.get(base + '/b')
+    session.get(base + '/a')  # /a passa a ser a mais recente
+    session.get(base + '/c')  # estoura o limite: descarta /b
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 2
+    assert session.get(base + '/a').from_cache
+    assert not getattr(session.get(base + '/b'), 'from_cache', False)
+    server.shutdown()
+    print("✅ Descarte LRU OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DO CACHE HTTP")
+    print("=" * 50)
+    test_hit_and_revalidation()
+    test_lru_eviction()
+    print("\n🎉 Todos os testes passaram!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do pool de conexões HTTP (http_pool) e do pool de scrapers
+Sobe um servidor local com keep-alive e confere reuso de conexão, retry em 503
+e a devolução dos scrapers ao pool
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from http_cache import CachedSession
+from http_pool import build_http_adapter, pool_stats
+
+FALHAS = {'restantes': 0}
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/instavel' and FALHAS['restantes'] > 0:
+            FALHAS['restantes'] -= 1
+            status, body = 503, b'indisponivel'
+        else:
+            status, body = 200, b'ok'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_connections_shared_between_sessions():
+    server = start_server()
+    adapter = build_http_adapter(pool_maxsize=4, backoff_factor=0)
+    url = f'http://127.0.0.1:{server.server_port}/pagina'
+
+    primeira = CachedSession(adapter=adapter)
+    segunda = CachedSession(adapter=adapter)
+    for _ in range(3):
+        assert primeira.get(url).status_code == 200
+        assert segunda.get(url).status_code == 200
+
+    host = pool_stats(adapter)['hosts']['http://127.0.0.1']
+    assert host['requests'] == 6 and host['connections_created'] == 1
+    server.shutdown()
+    print("✅ Conexão reaproveitada entre sessões OK")
+
+def test_retry_on_unavailable():
+    server = start_server()
+    adapter = build_http_adapter(retries=3, backoff_factor=0.01)
+    session = CachedSession(adapter=adapter)
+    url = f'http://127.0.0.1:{server.server_port}/instavel'
+
+    FALHAS['restantes'] = 2
+    assert session.get(url).status_code == 200
+    assert pool_stats(adapter)['retries'] >= 2
+
+    # Esgotadas as tentativas, o último status volta para o chamador
+    FALHAS['restantes'] = 10
+    assert session.get(url).status_code == 503
+    server.shutdown()
+    print("✅ Retry com backoff OK")
+
+def test_scraper_pool_reuse():
+    from airbnb_scraper import ScraperPool
+
+    pool = ScraperPool(max_size=2)
+    with pool.acquire() as scraper:
+        scraper.favorite_competitors = ['https://www.airbnb.com.br/rooms/1']
+    with pool.acquire() as again:
+        assert again is scraper
+        assert not hasattr(again, 'favorite_competitors')
+        assert again.rate_limiter is pool.rate_limiter
+
+    stats = pool.stats()
+    assert stats['created'] == 1 and stats['acquisitions'] == 2 and stats['in_use'] == 0
+    print("✅ Pool de scrapers OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DO POOL HTTP")
+    print("=" * 50)
+    test_connections_shared_between_sessions()
+    test_retry_on_unavailable()
+    test_scraper_pool_reuse()
+    print("\n🎉 Todos os testes passaram!")
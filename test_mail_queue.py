@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste da fila de emails (mail_queue)
+Sobe um servidor SMTP local de depuração e confere envio em lote na mesma
+conexão autenticada, reconexão quando o servidor derruba a conexão, nova
+tentativa com backoff em falha temporária e processos dividindo a caixa de saída
+"""
+
+import base64
+import email
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mail_queue import MailQueue, QUEUED, SENT
+
+class DebugSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), DebugSMTPHandler)
+        self.messages = []
+        self.logins = []
+        self.connections = 0
+        # Falhas programadas: respostas 451 no DATA e queda da conexão após um envio
+        self.temporary_failures = 0
+        self.drop_after_message = False
+
+class DebugSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost debug')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 AUTH PLAIN')
+            elif command == 'AUTH':
+                user = base64.b64decode(line.split()[2]).split(b'\0')[1].decode()
+                server.logins.append(user)
+                self.reply('235 ok')
+            elif command in ('MAIL', 'RCPT', 'NOOP', 'RSET'):
+                self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go')
+                data = []
+                while True:
+                    data_line = self.rfile.readline().decode()
+                    if data_line.rstrip('\r\n') == '.':
+                        break
+                    data.append(data_line)
+                if server.temporary_failures > 0:
+                    server.temporary_failures -= 1
+                    self.reply('451 tente mais tarde')
+                    continue
+                server.messages.append(''.join(data))
+                self.reply('250 queued')
+                if server.drop_after_message:
+                    server.drop_after_message = False
+                    return
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 unknown')
+
+def html_body(message):
+    part = next(p for p in email.message_from_string(message).walk() if p.get_content_type() == 'text/html')
+    return part.get_payload(decode=True).decode('utf-8')
+
+def start_server():
+    server = DebugSMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def email_config(server):
+    return {
+        'smtp_server': '127.0.0.1',
+        'smtp_port': server.server_address[1],
+        'sender_email': 'relatorios@hostlink.test',
+        'sender_password': 'segredo',
+        'recipient_email': 'anfitriao@hostlink.test',
+        'use_tls': False
+    }
+
+def build_queue(path=None, **kwargs):
+    rendered = []
+
+    def renderer(payload):
+        rendered.append(threading.current_thread().name)
+        return f"<h1>Preço sugerido: R$ {payload['price']}</h1>"
+
+    queue = MailQueue(path or tempfile.mktemp(suffix='.sqlite3'), renderer, poll_interval=0.05, **kwargs)
+    return queue, rendered
+
+def test_batch_on_single_connection():
+    server = start_server()
+    queue, rendered = build_queue(batch_size=10)
+    ids = [queue.submit(email_config(server), f'Relatório {i}', {'price': 300 + i}) for i in range(3)]
+
+    # Nada é montado nem enviado na thread de quem enfileira
+    assert rendered == [] and server.messages == []
+
+    queue.start()
+    assert queue.flush(timeout=10)
+    assert len(server.messages) == 3 and 'R$ 301' in html_body(server.messages[1])
+    assert server.connections == 1 and server.logins == ['relatorios@hostlink.test']
+    assert set(rendered) == {'mail-queue'}
+    assert all(queue.get(message_id)['status'] == SENT for message_id in ids)
+
+    # Conexão continua aberta para o próximo relatório
+    queue.submit(email_config(server), 'Relatório 4', {'price': 400})
+    assert queue.flush(timeout=10)
+    assert len(server.messages) == 4 and server.connections == 1
+    queue.stop()
+    server.shutdown()
+    print("✅ Lote na mesma conexão autenticada OK")
+
+def test_reconnect_and_retry_with_backoff():
+    server = start_server()
+    queue, _ = build_queue(batch_size=10, backoff=0.05, max_attempts=3)
+    queue.start()
+
+    # Servidor derruba a conexão depois do primeiro envio: a fila reconecta
+    server.drop_after_message = True
+    queue.submit(email_config(server), 'Relatório 1', {'price': 100})
+    assert queue.flush(timeout=10)
+    queue.submit(email_config(server), 'Relatório 2', {'price': 200})
+    assert queue.flush(timeout=10)
+    assert len(server.messages) == 2 and server.connections == 2
+
+    # Falha temporária (451): nova tentativa depois do backoff
+    server.temporary_failures = 1
+    message_id = queue.submit(email_config(server), 'Relatório 3', {'price': 300})
+    for _ in range(200):
+        if queue.get(message_id)['status'] == SENT:
+            break
+        time.sleep(0.05)
+    assert queue.get(message_id)['status'] == SENT
+    assert queue.get(message_id)['attempts'] == 2
+    assert queue.stats()['retries'] == 1
+    queue.stop()
+    server.shutdown()
+    print("✅ Reconexão e nova tentativa com backoff OK")
+
+def test_shared_outbox_sends_once():
+    server = start_server()
+    path = tempfile.mktemp(suffix='.sqlite3')
+    # Dois processos (workers do gunicorn) com a mesma conta na mesma caixa de saída
+    primeiro, _ = build_queue(path, batch_size=1)
+    segundo, _ = build_queue(path, batch_size=1)
+    ids = [primeiro.submit(email_config(server), f'Relatório {i}', {'price': 100 + i}) for i in range(3)]
+    segundo.submit(email_config(server), 'Relatório 3', {'price': 103})
+    primeiro.start()
+    segundo.start()
+    assert primeiro.flush(timeout=10) and segundo.flush(timeout=10)
+    assert len(server.messages) == 4
+    assert all(primeiro.get(message_id)['status'] == SENT for message_id in ids)
+    primeiro.stop()
+    segundo.stop()
+
+    # Reserva de um processo que morreu no meio do envio volta para a fila quando vence
+    parado, _ = build_queue(path, claim_timeout=0.01)
+    message_id = parado.submit(email_config(server), 'Relatório 5', {'price': 500})
+    parado._claim_batch()
+    time.sleep(0.05)
+    parado._release_expired()
+    assert parado.get(message_id)['status'] == QUEUED
+    server.shutdown()
+    print("✅ Caixa de saída compartilhada envia cada email uma vez OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DA FILA DE EMAILS")
+    print("=" * 50)
+    test_batch_on_single_connection()
+    test_reconnect_and_retry_with_backoff()
+    test_shared_outbox_sends_once()
+    print("\n🎉 Todos os testes passaram!")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do agendador de monitoramento (monitoring_scheduler)
+Confere jobs persistentes, eleição de líder pelo lock de arquivo, reagendamento
+com jitter, pausa de jobs, separação por ponto de entrada e o monitoramento
+incremental (impressão digital)
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from monitoring_scheduler import MonitoringScheduler, next_weekend
+
+URL = 'https://www.airbnb.com.br/rooms/123'
+FINGERPRINT = {'atual': None}
+
+def build(path, lock_path, runs):
+    return MonitoringScheduler(path, lock_path, lambda job: runs.append(job['listing_url']), start_spread=0, jitter=0.1)
+
+def test_only_leader_runs_jobs():
+    path = tempfile.mktemp(suffix='.sqlite3')
+    lock_path = tempfile.mktemp(suffix='.lock')
+    runs_a, runs_b = [], []
+    worker_a = build(path, lock_path, runs_a)
+    worker_b = build(path, lock_path, runs_b)
+
+    worker_a.upsert_job(URL, cadence_seconds=3600, beachfront=True)
+    assert worker_a.run_due_jobs() == 1
+    assert worker_b.run_due_jobs() == 0
+    assert runs_a == [URL] and runs_b == []
+
+    # Reagendado dentro da cadência ± jitter
+    job = worker_b.get_job(URL)
+    assert 3240 <= job['next_run_at'] - job['last_run_at'] <= 3960
+    assert job['last_status'] == 'ok'
+
+    # O líder sai: o outro processo assume
+    worker_a.stop()
+    assert worker_b.is_leader()
+    worker_b.release_leadership()
+    print("✅ Só o líder executa os jobs OK")
+
+def test_jobs_persist_and_pause():
+    path = tempfile.mktemp(suffix='.sqlite3')
+    lock_path = tempfile.mktemp(suffix='.lock')
+    runs = []
+    scheduler = build(path, lock_path, runs)
+    scheduler.upsert_job(URL, cadence_seconds=12 * 3600, beachfront=False, adults=4)
+
+    reaberto = build(path, lock_path, runs)
+    job = reaberto.get_job(URL)
+    assert job['enabled'] and job['adults'] == 4 and not job['beachfront']
+    assert reaberto.has_active_jobs()
+
+    assert reaberto.disable_job() == 1
+    assert not reaberto.has_active_jobs()
+    assert reaberto.run_due_jobs() == 0 and runs == []
+
+    # Reativar mantém a definição e agenda a próxima execução
+    reaberto.upsert_job(URL, cadence_seconds=6 * 3600)
+    assert reaberto.run_due_jobs() == 1 and runs == [URL]
+    reaberto.release_leadership()
+    print("✅ Jobs persistentes e pausa OK")
+
+def test_unchanged_inputs_only_heartbeat():
+    path = tempfile.mktemp(suffix='.sqlite3')
+    lock_path = tempfile.mktemp(suffix='.lock')
+    analyses = []
+    scheduler = None
+
+    def runner(job):
+        fingerprint = FINGERPRINT['atual']
+        if not scheduler.has_changed(job, fingerprint):
+            return 'unchanged'
+        analyses.append(job['listing_url'])
+        scheduler.save_fingerprint(job['listing_url'], fingerprint)
+        return 'ok'
+
+    scheduler = MonitoringScheduler(path, lock_path, runner, start_spread=0, jitter=0)
+    scheduler.upsert_job(URL, cadence_seconds=0)
+
+    FINGERPRINT['atual'] = 'abc'
+    scheduler.run_due_jobs()
+    scheduler.run_due_jobs()
+    assert analyses == [URL]
+    assert scheduler.get_job(URL)['last_status'] == 'unchanged'
+
+    # Entradas mudaram: análise completa de novo
+    FINGERPRINT['atual'] = 'def'
+    scheduler.run_due_jobs()
+    assert analyses == [URL, URL]
+
+    # Sem impressão digital (falha ao buscar o anúncio): roda a análise completa
+    FINGERPRINT['atual'] = None
+    scheduler.run_due_jobs()
+    assert len(analyses) == 3
+
+    heartbeats = scheduler.heartbeats(URL)
+    assert [h['changed'] for h in heartbeats] == [True, False, True]
+    assert scheduler.stats()['skipped'] == 1
+    scheduler.release_leadership()
+    print("✅ Monitoramento incremental OK")
+
+def test_each_entry_point_runs_own_jobs():
+    path = tempfile.mktemp(suffix='.sqlite3')
+    lock_path = tempfile.mktemp(suffix='.lock')
+
+    # Banco da versão anterior (sem tipo de job): os jobs ficam com o web_app
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE monitoring_jobs (
+            listing_url TEXT PRIMARY KEY, user_id INTEGER, beachfront INTEGER NOT NULL DEFAULT 1,
+            adults INTEGER NOT NULL DEFAULT 2, cadence_seconds INTEGER NOT NULL, enabled INTEGER NOT NULL DEFAULT 1,
+            next_run_at REAL NOT NULL, last_run_at REAL, last_status TEXT, last_error TEXT,
+            created_at REAL NOT NULL, fingerprint TEXT
+        )
+    """)
+    conn.execute("INSERT INTO monitoring_jobs (listing_url, cadence_seconds, next_run_at, created_at) VALUES (?, 3600, 0, 0)", (URL,))
+    conn.commit()
+    conn.close()
+
+    runs_web, runs_cli = [], []
+    web = MonitoringScheduler(path, lock_path, lambda job: runs_web.append(job['listing_url']), start_spread=0)
+    cli = MonitoringScheduler(path, lock_path, lambda job: runs_cli.append(job['listing_url']), start_spread=0, kind='cli')
+    assert web.get_job(URL)['cadence_seconds'] == 3600 and cli.get_job(URL) is None
+
+    # O mesmo anúncio monitorado pelos dois: cada líder roda só os seus jobs, com seu runner
+    cli.upsert_job(URL, cadence_seconds=60)
+    assert web.run_due_jobs() == 1 and cli.run_due_jobs() == 1
+    assert runs_web == [URL] and runs_cli == [URL]
+    assert cli.get_job(URL)['cadence_seconds'] == 60 and web.get_job(URL)['cadence_seconds'] == 3600
+
+    assert cli.disable_job() == 1 and web.has_active_jobs()
+    web.release_leadership()
+    cli.release_leadership()
+    print("✅ Cada ponto de entrada executa só os próprios jobs OK")
+
+def test_next_weekend():
+    periodo = next_weekend(datetime(2026, 10, 14))  # quarta-feira
+    assert periodo == {'checkin': '2026-10-16', 'checkout': '2026-10-18'}
+    assert next_weekend(datetime(2026, 10, 17))['checkin'] == '2026-10-23'
+    print("✅ Próximo final de semana OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DO AGENDADOR DE MONITORAMENTO")
+    print("=" * 50)
+    test_only_leader_runs_jobs()
+    test_jobs_persist_and_pause()
+    test_unchanged_inputs_only_heartbeat()
+    test_each_entry_point_runs_own_jobs()
+    test_next_weekend()
+    print("\n🎉 Todos os testes passaram!")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste da análise de vários períodos (run_competitive_analysis_multi)
+Confere que o anúncio e a previsão são buscados uma vez, que o preço do
+anúncio só entra nos períodos em que foi extraído, que as buscas dos
+períodos rodam em paralelo e que a matriz de preços sai na ordem dos períodos
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from airbnb_scraper import AirbnbClimateScraper
+
+URL = 'https://www.airbnb.com.br/rooms/123'
+
+PERIODS = [
+    {'type': 'weekday', 'checkin': '2030-07-09', 'checkout': '2030-07-11', 'label': 'Semana 09/07 - 11/07'},
+    {'type': 'weekend', 'checkin': '2030-07-05', 'checkout': '2030-07-07', 'label': 'FDS 05/07 - 07/07'},
+    {'type': 'weekend', 'checkin': '2030-07-12', 'checkout': '2030-07-14', 'label': 'FDS 12/07 - 14/07'}
+]
+
+def build_scraper():
+    scraper = AirbnbClimateScraper()
+    scraper.period_workers = 3
+    calls = {'listing': [], 'weather': [], 'searches': [], 'max_running': 0}
+    running = {'agora': 0}
+    lock = threading.Lock()
+
+    class Pagina:
+        status_code = 200
+
+        def __init__(self, html):
+            self.content = html.encode()
+            self.text = html
+
+    class SessaoDaThread:
+        def get(self, url, params=None, **kwargs):
+            with lock:
+                calls['listing'].append((url, params))
+            # A página mostra a diária das datas pedidas: semana mais barata que final de semana
+            price = 200 if params['check_in'] == '2030-07-09' else 300
+            return Pagina(f'<html><body><h1>Casa</h1><span>R${price} por noite</span></body></html>')
+
+    class SessaoCompartilhada:
+        def get(self, *args, **kwargs):
+            raise AssertionError('a sessão compartilhada não é thread-safe')
+
+    def previsao(municipality=None, force_refresh=False):
+        calls['weather'].append(municipality)
+        return [
+            {'date': '2030-07-05', 'rain_probability': 80},
+            {'date': '2030-07-06', 'rain_probability': 80},
+            {'date': '2030-07-07', 'rain_probability': 80},
+            {'date': '2030-07-12', 'rain_probability': 10}
+        ]
+
+    def busca(checkin_date, checkout_date, adults=2, reference_listing=None, deadline=None, progress=None):
+        with lock:
+            running['agora'] += 1
+            calls['max_running'] = max(calls['max_running'], running['agora'])
+            calls['searches'].append((checkin_date, reference_listing['title']))
+        time.sleep(0.1)
+        with lock:
+            running['agora'] -= 1
+        if checkin_date == '2030-07-09':
+            # Busca sem resultados reais: só o anúncio entra na precificação
+            return {'listings': [{'title': 'Simulado', 'price_per_night': 50, 'is_beachfront': False}], 'total_found': 0}
+        return {
+            'listings': [{'title': 'Vizinho', 'price_per_night': 500, 'is_beachfront': True}],
+            'total_found': 1,
+            'searches_completed': 6
+        }
+
+    scraper.session = SessaoCompartilhada()
+    scraper._get_thread_session = SessaoDaThread
+    scraper._extract_municipality = lambda soup: 'Paraty'
+    scraper.get_weather_forecast = previsao
+    scraper.get_competitive_analysis = busca
+    return scraper, calls
+
+def test_single_fetch_and_price_matrix():
+    scraper, calls = build_scraper()
+    done = []
+    result = scraper.run_competitive_analysis_multi(PERIODS, True, 2, URL, progress=lambda period, row: done.append(row['checkin']))
+
+    # Uma extração para os períodos (com as datas do 1º); de novo, com as datas dele, só no período sem concorrentes
+    assert calls['listing'] == [
+        (URL, {'check_in': '2030-07-05', 'check_out': '2030-07-07', 'adults': 2}),
+        (URL, {'check_in': '2030-07-09', 'check_out': '2030-07-11', 'adults': 2})
+    ]
+    assert calls['weather'] == ['Paraty']
+    assert len(calls['searches']) == 3 and all(title == 'Casa' for _, title in calls['searches'])
+    assert calls['max_running'] > 1
+    assert sorted(done) == ['2030-07-05', '2030-07-09', '2030-07-12']
+
+    matrix = result['price_matrix']
+    assert [row['checkin'] for row in matrix] == ['2030-07-05', '2030-07-09', '2030-07-12']
+    assert matrix[1]['competitors_found'] == 0
+    assert matrix[0]['competitors_found'] == 1
+
+    # Preço do anúncio do período certo (ou fora da média)
+    assert [row['reference_price'] for row in matrix] == [300, 200, None]
+    assert matrix[1]['suggested_price'] < matrix[0]['suggested_price']
+
+    # Chuva no primeiro final de semana, tempo bom no segundo
+    assert matrix[0]['final_price'] < matrix[2]['final_price']
+    assert matrix[0]['total_period_price'] == round(matrix[0]['final_price'] * 2, 2)
+    print("✅ Matriz de preços com uma extração e uma previsão OK")
+
+def test_failed_period_keeps_others():
+    scraper, calls = build_scraper()
+    original = scraper.get_competitive_analysis
+
+    def busca_com_falha(checkin_date, *args, **kwargs):
+        if checkin_date == '2030-07-12':
+            raise RuntimeError('bloqueado')
+        return original(checkin_date, *args, **kwargs)
+
+    scraper.get_competitive_analysis = busca_com_falha
+    matrix = scraper.run_competitive_analysis_multi(PERIODS, True, 2, URL)['price_matrix']
+    assert matrix[2]['error'] == 'bloqueado' and 'final_price' not in matrix[2]
+    assert matrix[0]['final_price'] > 0 and matrix[1]['final_price'] > 0
+    print("✅ Falha em um período não derruba os outros OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DA ANÁLISE DE VÁRIOS PERÍODOS")
+    print("=" * 50)
+    test_single_fetch_and_price_matrix()
+    test_failed_period_keeps_others()
+    print("\n🎉 Todos os testes passaram!")
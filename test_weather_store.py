@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste do armazenamento de previsões do tempo (weather_store)
+Confere validade, persistência em disco, URLs resolvidas e o job de atualização
+(um único processo atualiza quando vários dividem o lock)
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Adicionar o diretório atual ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from weather_store import WeatherForecastStore
+
+def previsao(dias=15, chuva=20):
+    hoje = datetime.now()
+    return [
+        {'date': (hoje + timedelta(days=i)).strftime('%Y-%m-%d'), 'rain_probability': chuva, 'weather_condition': 'Ensolarado'}
+        for i in range(dias)
+    ]
+
+def test_forecast_and_urls_persist():
+    path = tempfile.mktemp(suffix='.sqlite3')
+    store = WeatherForecastStore(path, max_age=60)
+    dados = previsao()
+    dados.insert(0, {'date': '2000-01-01', 'rain_probability': 90, 'weather_condition': 'Chuvoso'})
+    store.save_forecast('Itacuruçá', dados)
+    store.save_url('Paraty', 'https://www.climatempo.com.br/previsao-do-tempo/15-dias/cidade/3214/paraty-rj')
+
+    # Chave sem acento / maiúsculas; dias passados são descartados
+    assert len(store.get_forecast('itacuruca')) == 15
+    assert store.get_forecast('Mangaratiba') is None
+    assert store.get_forecast('Itacuruçá', max_age=-1) is None
+
+    # Nova instância lê tudo do disco
+    reaberto = WeatherForecastStore(path, max_age=60)
+    assert reaberto.get_forecast('Itacuruçá') == store.get_forecast('Itacuruçá')
+    assert reaberto.get_url('paraty').endswith('paraty-rj')
+    assert reaberto.stats()['resolved_urls'] == 1
+    print("✅ Persistência de previsões e URLs OK")
+
+def test_background_refresh():
+    store = WeatherForecastStore(tempfile.mktemp(suffix='.sqlite3'), max_age=60)
+    store.save_forecast('Mangaratiba', previsao(chuva=20))
+    chamadas = []
+
+    def buscar(municipio):
+        chamadas.append(municipio)
+        return previsao(chuva=80)
+
+    assert store.start_refresh(buscar, interval=0.1)
+    assert not store.start_refresh(buscar, interval=0.1)
+    time.sleep(0.35)
+    store.stop_refresh()
+
+    assert chamadas and set(chamadas) == {'Mangaratiba'}
+    assert store.get_forecast('Mangaratiba')[0]['rain_probability'] == 80
+    print("✅ Atualização em segundo plano OK")
+
+def test_single_refresh_leader():
+    path = tempfile.mktemp(suffix='.sqlite3')
+    lock_path = tempfile.mktemp(suffix='.lock')
+    chamadas = {'a': 0, 'b': 0}
+
+    def buscador(nome):
+        def buscar(municipio):
+            chamadas[nome] += 1
+            return previsao(chuva=50)
+        return buscar
+
+    # Dois processos (workers do gunicorn) no mesmo arquivo e no mesmo lock
+    worker_a = WeatherForecastStore(path, max_age=60)
+    worker_a.save_forecast('Paraty', previsao())
+    worker_b = WeatherForecastStore(path, max_age=60)
+    worker_a.start_refresh(buscador('a'), interval=0.1, lock_path=lock_path)
+    time.sleep(0.05)
+    worker_b.start_refresh(buscador('b'), interval=0.1, lock_path=lock_path)
+    time.sleep(0.35)
+    assert chamadas['a'] >= 2 and chamadas['b'] == 0
+    assert worker_a.stats()['refresh_leader'] and not worker_b.stats()['refresh_leader']
+
+    # O líder para: o outro assume
+    worker_a.stop_refresh()
+    time.sleep(0.3)
+    assert chamadas['b'] >= 1
+    worker_b.stop_refresh()
+    print("✅ Só um processo atualiza as previsões OK")
+
+if __name__ == '__main__':
+    print("🧪 TESTE DO ARMAZENAMENTO DE PREVISÕES")
+    print("=" * 50)
+    test_forecast_and_urls_persist()
+    test_background_refresh()
+    test_single_refresh_leader()
+    print("\n🎉 Todos os testes passaram!")
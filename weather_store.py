@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Armazenamento das previsões do tempo por município
+Guarda as previsões já processadas do ClimaTempo (memória + SQLite) para que
+todas as análises usem a mesma cópia, e registra de forma permanente as URLs
+do ClimaTempo já resolvidas para cada município. Um job em segundo plano
+atualiza as previsões em intervalo fixo; com vários processos no mesmo arquivo,
+só o que detém o lock de arquivo atualiza (se ele morrer, outro assume).
+"""
+
+import os
+import copy
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, todo processo atualiza
+    fcntl = None
+
+class WeatherForecastStore:
+    """
+    Previsões por município com validade (max_age) e URLs do ClimaTempo resolvidas
+    """
+
+    def __init__(self, path: str, max_age: int = 6 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Dict] = {}
+        self._refresh_thread = None
+        self._refresh_lock_file = None
+        self._stop_event = threading.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS weather_forecasts (
+                municipality_key TEXT PRIMARY KEY,
+                municipality TEXT NOT NULL,
+                forecast TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS climatempo_urls (
+                municipality_key TEXT PRIMARY KEY,
+                municipality TEXT NOT NULL,
+                url TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._load()
+
+    @staticmethod
+    def municipality_key(municipality: str) -> str:
+        """Nome do município sem acentos, em minúsculas"""
+        normalized = unicodedata.normalize('NFKD', municipality or '')
+        normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+        return ' '.join(normalized.lower().split())
+
+    def _load(self):
+        """Carrega as previsões gravadas em disco para a memória"""
+        rows = self._conn.execute(
+            "SELECT municipality_key, municipality, forecast, fetched_at FROM weather_forecasts"
+        ).fetchall()
+        for key, municipality, forecast, fetched_at in rows:
+            self._memory[key] = {
+                'municipality': municipality,
+                'forecast': json.loads(forecast),
+                'fetched_at': fetched_at
+            }
+
+    def get_forecast(self, municipality: str, max_age: Optional[int] = None) -> Optional[List[Dict]]:
+        """
+        Retorna a previsão guardada se ainda estiver dentro da validade
+        Dias que já passaram são removidos
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            entry = self._memory.get(self.municipality_key(municipality))
+        if not entry or time.time() - entry['fetched_at'] > max_age:
+            return None
+        today = time.strftime('%Y-%m-%d')
+        return [copy.deepcopy(day) for day in entry['forecast'] if day.get('date', today) >= today]
+
+    def save_forecast(self, municipality: str, forecast: List[Dict]):
+        """Guarda a previsão na memória e no disco"""
+        key = self.municipality_key(municipality)
+        fetched_at = time.time()
+        with self._lock:
+            self._memory[key] = {
+                'municipality': municipality,
+                'forecast': copy.deepcopy(forecast),
+                'fetched_at': fetched_at
+            }
+            self._conn.execute(
+                "INSERT OR REPLACE INTO weather_forecasts (municipality_key, municipality, forecast, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, municipality, json.dumps(forecast), fetched_at)
+            )
+            self._conn.commit()
+
+    def municipalities(self) -> List[str]:
+        """Municípios com previsão guardada (atualizados pelo job em segundo plano)"""
+        with self._lock:
+            return [entry['municipality'] for entry in self._memory.values()]
+
+    def get_url(self, municipality: str) -> Optional[str]:
+        """URL do ClimaTempo já resolvida para o município"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url FROM climatempo_urls WHERE municipality_key = ?",
+                (self.municipality_key(municipality),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_url(self, municipality: str, url: str):
+        """Registra de forma permanente a URL do ClimaTempo do município"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO climatempo_urls (municipality_key, municipality, url, resolved_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self.municipality_key(municipality), municipality, url, time.time())
+            )
+            self._conn.commit()
+
+    def refresh_all(self, fetcher: Callable[[str], List[Dict]]) -> int:
+        """
+        Busca de novo a previsão de todos os municípios conhecidos
+        Retorna quantos foram atualizados
+        """
+        updated = 0
+        for municipality in self.municipalities():
+            try:
+                forecast = fetcher(municipality)
+                if forecast:
+                    self.save_forecast(municipality, forecast)
+                    updated += 1
+            except Exception as e:
+                print(f"❌ Erro ao atualizar previsão de {municipality}: {e}")
+        return updated
+
+    def _is_refresh_leader(self, lock_path: Optional[str]) -> bool:
+        """Tenta obter (ou confirma) o lock de quem atualiza as previsões"""
+        if lock_path is None or fcntl is None or self._refresh_lock_file is not None:
+            return True
+        lock_file = open(lock_path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._refresh_lock_file = lock_file
+        print(f"👑 Este processo (PID {os.getpid()}) assumiu a atualização das previsões")
+        return True
+
+    def start_refresh(self, fetcher: Callable[[str], List[Dict]], interval: int,
+                      lock_path: Optional[str] = None) -> bool:
+        """
+        Inicia o job em segundo plano que atualiza as previsões a cada interval segundos
+        Com lock_path, só o processo que detém o lock atualiza; os outros conferem
+        a cada intervalo se podem assumir
+        Retorna False se o job já estiver rodando
+        """
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return False
+            self._stop_event.clear()
+
+            def refresh_loop():
+                while not self._stop_event.wait(interval):
+                    if not self._is_refresh_leader(lock_path):
+                        continue
+                    updated = self.refresh_all(fetcher)
+                    print(f"🌤️ Previsões atualizadas: {updated} município(s)")
+
+            self._refresh_thread = threading.Thread(target=refresh_loop, daemon=True, name='weather-refresh')
+            self._refresh_thread.start()
+        print(f"🌤️ Atualização automática das previsões a cada {interval // 60} minutos")
+        return True
+
+    def stop_refresh(self):
+        self._stop_event.set()
+        if self._refresh_lock_file is not None:
+            fcntl.flock(self._refresh_lock_file.fileno(), fcntl.LOCK_UN)
+            self._refresh_lock_file.close()
+            self._refresh_lock_file = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            urls = self._conn.execute("SELECT COUNT(*) FROM climatempo_urls").fetchone()[0]
+            oldest = min((entry['fetched_at'] for entry in self._memory.values()), default=None)
+            return {
+                'municipalities': len(self._memory),
+                'resolved_urls': urls,
+                'oldest_forecast_age': round(time.time() - oldest) if oldest else None,
+                'refresh_running': bool(self._refresh_thread and self._refresh_thread.is_alive()),
+                'refresh_leader': self._refresh_lock_file is not None
+            }
+
+# Instância global do armazenamento de previsões
+weather_store = None
+_weather_store_lock = threading.Lock()
+
+def get_weather_store() -> Optional[WeatherForecastStore]:
+    """
+    Retorna o armazenamento de previsões do processo (None se indisponível)
+    """
+    global weather_store
+    with _weather_store_lock:
+        if weather_store is None:
+            try:
+                weather_store = WeatherForecastStore(
+                    os.getenv('WEATHER_STORE_PATH', os.path.join(tempfile.gettempdir(), 'hostlink_weather.sqlite3')),
+                    max_age=int(os.getenv('WEATHER_MAX_AGE', str(6 * 3600)))
+                )
+            except Exception as e:
+                print(f"⚠️ Armazenamento de previsões indisponível: {e}")
+                return None
+    return weather_store
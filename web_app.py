@@ -5,12 +5,17 @@ Aplicação Web para Análise de Preços Airbnb
 Interface web para visualizar resultados da análise competitiva
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, Response, stream_with_context
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
-from airbnb_scraper import AirbnbClimateScraper
+from airbnb_scraper import get_pattern_stats, get_scraper_pool, start_weather_refresh
+from http_cache import get_response_cache
+from weather_store import get_weather_store
+from calendar_pricing import get_calendar_pricing_service
+from analysis_jobs import get_analysis_queue, DONE, FAILED, FINISHED_STATUSES
+from monitoring_scheduler import get_monitoring_scheduler, next_weekend
+from mail_queue import get_mail_queue
 from datetime import datetime, timedelta
 import json
-import threading
 import time
 import os
 from dotenv import load_dotenv
@@ -40,8 +45,6 @@ def load_user(user_id):
 # Variáveis globais para armazenar dados (fallback se banco não disponível)
 latest_analysis = None
 analysis_history = []
-monitoring_active = False
-monitoring_thread = None
 favorite_competitors = []  # Lista de concorrentes favoritos
 
 # Inicializar banco de dados
@@ -74,13 +77,27 @@ def load_data_from_database():
 # Carregar dados na inicialização
 load_data_from_database()
 
+# Atualização das previsões do tempo em segundo plano
+if os.getenv('WEATHER_REFRESH_ENABLED', '1') == '1':
+    start_weather_refresh()
+
+SCRAPER_BUSY_MESSAGE = 'Todos os scrapers estão ocupados com análises; tente novamente em instantes'
+
+def _request_scraper():
+    """
+    Scraper do pool para handlers de requisição: espera no máximo
+    SCRAPER_POOL_TIMEOUT segundos (TimeoutError, respondido com 503)
+    """
+    pool = get_scraper_pool()
+    return pool.acquire(timeout=pool.request_timeout)
+
 @app.route('/')
 @login_required
 def index():
     """Página principal"""
     return render_template('index.html', 
                           latest_analysis=latest_analysis,
-                          monitoring_active=monitoring_active)
+                          monitoring_active=is_monitoring_active())
 
 @app.route('/login')
 def login():
@@ -450,9 +467,6 @@ def extract_listing_info():
         if 'airbnb.com' not in url:
             return jsonify({'success': False, 'error': 'URL deve ser do Airbnb'})
         
-        # Usar o scraper para extrair informações
-        scraper = AirbnbClimateScraper()
-        
         # Simular dados de check-in/out para análise (próximo final de semana)
         today = datetime.now()
         days_until_friday = (4 - today.weekday()) % 7
@@ -462,8 +476,9 @@ def extract_listing_info():
         checkin = (today + timedelta(days=days_until_friday)).strftime('%Y-%m-%d')
         checkout = (today + timedelta(days=days_until_friday + 2)).strftime('%Y-%m-%d')
         
-        # Extrair informações do anúncio
-        listing_info = scraper.analyze_specific_listing(url, checkin, checkout)
+        # Extrair informações do anúncio com um scraper do pool
+        with _request_scraper() as scraper:
+            listing_info = scraper.analyze_specific_listing(url, checkin, checkout)
         
         if not listing_info:
             return jsonify({'success': False, 'error': 'Não foi possível extrair informações do anúncio'})
@@ -498,6 +513,9 @@ def extract_listing_info():
         
         return jsonify({'success': True, 'data': extracted_data})
         
+    except TimeoutError as e:
+        print(f"⚠️ {e}")
+        return jsonify({'success': False, 'error': SCRAPER_BUSY_MESSAGE}), 503
     except Exception as e:
         print(f"❌ Erro ao extrair informações do anúncio: {e}")
         return jsonify({'success': False, 'error': f'Erro ao processar anúncio: {str(e)}'})
@@ -534,12 +552,12 @@ def add_listing():
         extracted_data = {}
         if 'airbnb.com' in data['url']:
             try:
-                scraper = AirbnbClimateScraper()
                 today = datetime.now()
                 checkin = (today + timedelta(days=7)).strftime('%Y-%m-%d')
                 checkout = (today + timedelta(days=9)).strftime('%Y-%m-%d')
                 
-                listing_info = scraper.analyze_specific_listing(data['url'], checkin, checkout)
+                with _request_scraper() as scraper:
+                    listing_info = scraper.analyze_specific_listing(data['url'], checkin, checkout)
                 if listing_info:
                     info = listing_info[0] if isinstance(listing_info, list) else listing_info
                     extracted_data = {
@@ -1312,32 +1330,202 @@ def api_check_favorite_db():
             'error': str(e)
         }), 500
 
-@app.route('/api/run_analysis', methods=['POST'])
-def api_run_analysis():
-    """API para executar análise sob demanda"""
+def execute_analysis_job(params, report):
+    """
+    Executa uma análise sob demanda (roda em um worker da fila de análises)
+    params vem de api_run_analysis, já validado; report registra o andamento do job
+    """
     global latest_analysis, analysis_history
     
-    try:
-        data = request.get_json()
-        checkin = data.get('checkin')
-        checkout = data.get('checkout')
-        adults = data.get('adults', 2)
-        beachfront = data.get('beachfront', True)
-        period_type = data.get('period_type', 'weekend')
-        listing_url = data.get('listing_url', '').strip()
-        municipio_id = data.get('municipio_id')
-        
-        # Validar datas
-        if not checkin or not checkout:
-            # Usar próximo final de semana como padrão
-            periods = get_next_weekends_and_weekdays()
-            weekend_periods = [p for p in periods if p['type'] == 'weekend']
-            if weekend_periods:
-                checkin = weekend_periods[0]['checkin']
-                checkout = weekend_periods[0]['checkout']
-                period_type = 'weekend'
-        
-        # Validar se o link foi fornecido
+    if params.get('mode') == 'multi':
+        return execute_multi_period_job(params, report)
+    
+    checkin = params['checkin']
+    checkout = params['checkout']
+    adults = params['adults']
+    beachfront = params['beachfront']
+    period_type = params['period_type']
+    listing_url = params['listing_url']
+    municipio_id = params.get('municipio_id')
+    user_db_id = params.get('user_db_id')
+    
+    report('scraping', 'Buscando dados do anúncio e da concorrência')
+    
+    # Executar análise incluindo favoritos (o pool limpa os favoritos ao devolver o scraper)
+    with get_scraper_pool().acquire() as scraper:
+        scraper.favorite_competitors = favorite_competitors
+        result = scraper.run_competitive_analysis(checkin, checkout, beachfront, adults, listing_url, progress=report)
+    
+    report('analysis_completed', 'Análise competitiva concluída')
+    
+    # Calcular número de noites
+    checkin_date = datetime.strptime(checkin, '%Y-%m-%d')
+    checkout_date = datetime.strptime(checkout, '%Y-%m-%d')
+    nights = (checkout_date - checkin_date).days
+    
+    # Extrair município do anúncio analisado
+    extracted_municipality = None
+    extracted_municipio_id = municipio_id  # Usar o ID do dropdown como fallback
+    
+    if result.get('competitive_data') and len(result['competitive_data']) > 0:
+        extracted_municipality = result['competitive_data'][0].get('municipality')
+        
+        # Se extraiu um município, buscar seu ID no banco
+        if extracted_municipality and db:
+            municipio_data = db.get_municipio_by_nome(extracted_municipality, 'RJ')
+            if municipio_data:
+                extracted_municipio_id = municipio_data['id']
+                print(f"🎯 Município '{extracted_municipality}' convertido para ID: {extracted_municipio_id}")
+            else:
+                print(f"⚠️ Município '{extracted_municipality}' não encontrado no banco")
+    
+    # Adicionar informações do período
+    result['timestamp'] = datetime.now().isoformat()
+    result['checkin'] = checkin
+    result['checkout'] = checkout
+    result['adults'] = adults
+    result['beachfront'] = beachfront
+    result['period_type'] = period_type
+    result['is_weekend'] = period_type == 'weekend'
+    result['nights'] = nights
+    result['municipio_id'] = extracted_municipio_id  # Usar o ID correto
+    result['extracted_municipality'] = extracted_municipality
+    result['listing_url'] = listing_url
+    result['auto_generated'] = params.get('auto_generated', False)
+    
+    # Salvar no banco de dados
+    if db:
+        try:
+            # Verificar se o link da análise corresponde a algum anúncio do usuário
+            listing_id = None
+            if user_db_id and listing_url:
+                user_listings = db.get_user_listings(user_db_id)
+                listing_found = False
+                
+                for listing in user_listings:
+                    if listing_url in listing.get('url', '') or listing.get('url', '') in listing_url:
+                        listing_id = listing['id']
+                        listing_found = True
+                        print(f"🎯 Análise associada ao anúncio existente: {listing['title']}")
+                        break
+                
+                # Se o link não foi encontrado, salvar automaticamente na tabela user_listings
+                if not listing_found:
+                    try:
+                        # Extrair título do primeiro resultado da análise competitiva
+                        listing_title = "Anúncio Analisado"
+                        if result.get('competitive_data') and len(result['competitive_data']) > 0:
+                            first_competitor = result['competitive_data'][0]
+                            if first_competitor.get('title'):
+                                listing_title = first_competitor['title']
+                        
+                        # Salvar o link do anúncio automaticamente
+                        listing_id = db.save_user_listing(
+                            user_id=user_db_id,
+                            title=listing_title,
+                            url=listing_url,
+                            municipio_id=extracted_municipio_id,
+                            platform='airbnb',
+                            is_beachfront=beachfront,
+                            extraction_method='auto_analysis',
+                            last_scraped=datetime.now().isoformat()
+                        )
+                        
+                        if listing_id:
+                            print(f"✅ Link do anúncio salvo automaticamente: {listing_title} (ID: {listing_id})")
+                        else:
+                            print("⚠️ Erro ao salvar link do anúncio automaticamente")
+                            
+                    except Exception as save_error:
+                        print(f"⚠️ Erro ao salvar link automaticamente: {save_error}")
+                        # Continuar com a análise mesmo se não conseguir salvar o link
+            
+            analysis_id = db.save_analysis(result, user_id=user_db_id, listing_id=listing_id)
+            if analysis_id:
+                result['id'] = analysis_id
+                result['user_id'] = user_db_id
+                result['listing_id'] = listing_id
+                print(f"✅ Análise salva no banco com ID: {analysis_id}")
+                
+                # Salvar histórico de preços
+                if result.get('pricing_suggestion', {}).get('suggested_price'):
+                    db.save_pricing_history(
+                        checkin,
+                        result['pricing_suggestion']['suggested_price'],
+                        result['pricing_suggestion'].get('average_competitor_price', 0),
+                        result['pricing_suggestion'].get('price_multiplier', 1.0)
+                    )
+            else:
+                print("⚠️ Erro ao salvar análise no banco")
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar no banco: {e}")
+    
+    # Atualizar dados globais (fallback)
+    latest_analysis = result
+    analysis_history.append(result)
+    
+    # Manter apenas últimas 50 análises em memória
+    if len(analysis_history) > 50:
+        analysis_history.pop(0)
+    
+    # Monitoramento incremental: guardar a impressão digital das entradas desta análise
+    if params.get('auto_generated') and params.get('fingerprint'):
+        scheduler = get_monitoring_scheduler(run_monitoring_job)
+        if scheduler:
+            scheduler.save_fingerprint(listing_url, params['fingerprint'])
+    
+    report('saved', 'Análise salva', analysis_id=result.get('id'))
+    return result
+
+def execute_multi_period_job(params, report):
+    """
+    Executa a análise de vários períodos (matriz de preços) em um worker da fila
+    """
+    periods = params['periods']
+    report('scraping', f'Analisando {len(periods)} períodos', periods=len(periods))
+    
+    def period_done(period, row):
+        report('period_completed', f"Período {row['label']} concluído", period=row)
+    
+    with get_scraper_pool().acquire() as scraper:
+        scraper.favorite_competitors = favorite_competitors
+        result = scraper.run_competitive_analysis_multi(
+            periods, params['beachfront'], params['adults'], params['listing_url'],
+            progress=period_done, stage_progress=report
+        )
+    
+    result['timestamp'] = datetime.now().isoformat()
+    result['user_id'] = params.get('user_db_id')
+    
+    # Histórico de preços de cada período
+    if db:
+        for row in result['price_matrix']:
+            pricing_suggestion = row.get('pricing_suggestion')
+            if not pricing_suggestion:
+                continue
+            try:
+                db.save_pricing_history(
+                    row['checkin'],
+                    row['final_price'],
+                    pricing_suggestion.get('average_competitor_price', 0),
+                    pricing_suggestion.get('price_multiplier', 1.0)
+                )
+            except Exception as e:
+                print(f"⚠️ Erro ao salvar histórico de preços de {row['checkin']}: {e}")
+    
+    report('saved', 'Matriz de preços concluída', periods=len(result['price_matrix']))
+    return result
+
+@app.route('/api/run_analysis_multi', methods=['POST'])
+def api_run_analysis_multi():
+    """
+    API para precificar vários períodos de uma vez (padrão: próximos finais de
+    semana e dias de semana do mês) com uma única extração do anúncio
+    Mesmo fluxo de /api/run_analysis: a resposta traz o id do job na fila
+    """
+    try:
+        data = request.get_json() or {}
+        listing_url = (data.get('listing_url') or '').strip()
         if not listing_url:
             return jsonify({
                 'success': False,
@@ -1345,139 +1533,131 @@ def api_run_analysis():
                 'message': 'Por favor, informe o link do anúncio do Airbnb para análise'
             }), 400
         
-        # Executar análise incluindo favoritos
-        scraper = AirbnbClimateScraper()
-        
-        # Passar favoritos para o scraper temporariamente
-        original_favorites = getattr(scraper, 'favorite_competitors', None)
-        scraper.favorite_competitors = favorite_competitors
-        
-        try:
-            result = scraper.run_competitive_analysis(checkin, checkout, beachfront, adults, listing_url)
-        finally:
-            # Restaurar estado original
-            if original_favorites is not None:
-                scraper.favorite_competitors = original_favorites
-            else:
-                delattr(scraper, 'favorite_competitors')
+        periods = data.get('periods') or get_next_weekends_and_weekdays(int(data.get('months_ahead', 1)))
+        for period in periods:
+            try:
+                checkin = datetime.strptime(period['checkin'], '%Y-%m-%d')
+                checkout = datetime.strptime(period['checkout'], '%Y-%m-%d')
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'Cada período precisa de checkin e checkout (AAAA-MM-DD)'}), 400
+            if checkout <= checkin:
+                return jsonify({'success': False, 'error': f"Check-out deve ser depois do check-in ({period['checkin']})"}), 400
+        
+        params = {
+            'mode': 'multi',
+            'periods': [
+                {key: period[key] for key in ('checkin', 'checkout', 'type', 'label') if key in period}
+                for period in periods
+            ],
+            'adults': data.get('adults', 2),
+            'beachfront': data.get('beachfront', True),
+            'listing_url': listing_url,
+            'user_db_id': session.get('user_db_id')
+        }
         
-        # Calcular número de noites
-        from datetime import datetime
-        checkin_date = datetime.strptime(checkin, '%Y-%m-%d')
-        checkout_date = datetime.strptime(checkout, '%Y-%m-%d')
-        nights = (checkout_date - checkin_date).days
+        analysis_queue = get_analysis_queue(execute_analysis_job)
+        if analysis_queue is None:
+            result = execute_analysis_job(params, lambda *args, **kwargs: None)
+            return jsonify({
+                'success': True,
+                'data': result,
+                'message': f'Análise de {len(periods)} períodos executada com sucesso'
+            })
         
-        # Extrair município do anúncio analisado
-        extracted_municipality = None
-        extracted_municipio_id = municipio_id  # Usar o ID do dropdown como fallback
+        job_key = json.dumps(['multi', params['user_db_id'], listing_url, params['periods'], params['adults'], params['beachfront']])
+        job = analysis_queue.submit(params, job_key)
         
-        if result.get('competitive_data') and len(result['competitive_data']) > 0:
-            extracted_municipality = result['competitive_data'][0].get('municipality')
-            
-            # Se extraiu um município, buscar seu ID no banco
-            if extracted_municipality and db:
-                municipio_data = db.get_municipio_by_nome(extracted_municipality, 'RJ')
-                if municipio_data:
-                    extracted_municipio_id = municipio_data['id']
-                    print(f"🎯 Município '{extracted_municipality}' convertido para ID: {extracted_municipio_id}")
-                else:
-                    print(f"⚠️ Município '{extracted_municipality}' não encontrado no banco")
-        
-        # Adicionar informações do período
-        result['timestamp'] = datetime.now().isoformat()
-        result['checkin'] = checkin
-        result['checkout'] = checkout
-        result['adults'] = adults
-        result['beachfront'] = beachfront
-        result['period_type'] = period_type
-        result['is_weekend'] = period_type == 'weekend'
-        result['nights'] = nights
-        result['municipio_id'] = extracted_municipio_id  # Usar o ID correto
-        result['extracted_municipality'] = extracted_municipality
+        return jsonify({
+            'success': True,
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'coalesced': job['coalesced'],
+            'status_url': url_for('api_analysis_job', job_id=job['job_id']),
+            'events_url': url_for('api_analysis_job_events', job_id=job['job_id']),
+            'message': f'Análise de {len(periods)} períodos enfileirada'
+        }), 202
         
-        # Salvar no banco de dados
-        if db:
-            try:
-                # Obter user_id da sessão
-                user_db_id = session.get('user_db_id')
-                
-                # Verificar se o link da análise corresponde a algum anúncio do usuário
-                listing_id = None
-                if user_db_id and listing_url:
-                    user_listings = db.get_user_listings(user_db_id)
-                    listing_found = False
-                    
-                    for listing in user_listings:
-                        if listing_url in listing.get('url', '') or listing.get('url', '') in listing_url:
-                            listing_id = listing['id']
-                            listing_found = True
-                            print(f"🎯 Análise associada ao anúncio existente: {listing['title']}")
-                            break
-                    
-                    # Se o link não foi encontrado, salvar automaticamente na tabela user_listings
-                    if not listing_found:
-                        try:
-                            # Extrair título do primeiro resultado da análise competitiva
-                            listing_title = "Anúncio Analisado"
-                            if result.get('competitive_data') and len(result['competitive_data']) > 0:
-                                first_competitor = result['competitive_data'][0]
-                                if first_competitor.get('title'):
-                                    listing_title = first_competitor['title']
-                            
-                            # Salvar o link do anúncio automaticamente
-                            listing_id = db.save_user_listing(
-                                user_id=user_db_id,
-                                title=listing_title,
-                                url=listing_url,
-                                municipio_id=extracted_municipio_id,
-                                platform='airbnb',
-                                is_beachfront=beachfront,
-                                extraction_method='auto_analysis',
-                                last_scraped=datetime.now().isoformat()
-                            )
-                            
-                            if listing_id:
-                                print(f"✅ Link do anúncio salvo automaticamente: {listing_title} (ID: {listing_id})")
-                            else:
-                                print("⚠️ Erro ao salvar link do anúncio automaticamente")
-                                
-                        except Exception as save_error:
-                            print(f"⚠️ Erro ao salvar link automaticamente: {save_error}")
-                            # Continuar com a análise mesmo se não conseguir salvar o link
-                
-                analysis_id = db.save_analysis(result, user_id=user_db_id, listing_id=listing_id)
-                if analysis_id:
-                    result['id'] = analysis_id
-                    result['user_id'] = user_db_id
-                    result['listing_id'] = listing_id
-                    print(f"✅ Análise salva no banco com ID: {analysis_id}")
-                    
-                    # Salvar histórico de preços
-                    if result.get('pricing_suggestion', {}).get('suggested_price'):
-                        db.save_pricing_history(
-                            checkin,
-                            result['pricing_suggestion']['suggested_price'],
-                            result['pricing_suggestion'].get('average_competitor_price', 0),
-                            result['pricing_suggestion'].get('price_multiplier', 1.0)
-                        )
-                else:
-                    print("⚠️ Erro ao salvar análise no banco")
-            except Exception as e:
-                print(f"⚠️ Erro ao salvar no banco: {e}")
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Erro ao executar análise'
+        }), 500
+
+def _analysis_params(data):
+    """Parâmetros de uma análise de um período a partir do corpo (ou query string) do pedido"""
+    checkin = data.get('checkin')
+    checkout = data.get('checkout')
+    period_type = data.get('period_type', 'weekend')
+    
+    # Validar datas
+    if not checkin or not checkout:
+        # Usar próximo final de semana como padrão
+        periods = get_next_weekends_and_weekdays()
+        weekend_periods = [p for p in periods if p['type'] == 'weekend']
+        if weekend_periods:
+            checkin = weekend_periods[0]['checkin']
+            checkout = weekend_periods[0]['checkout']
+            period_type = 'weekend'
+    
+    return {
+        'checkin': checkin,
+        'checkout': checkout,
+        'adults': data.get('adults', 2),
+        'beachfront': data.get('beachfront', True),
+        'period_type': period_type,
+        'listing_url': (data.get('listing_url') or '').strip(),
+        'municipio_id': data.get('municipio_id'),
+        'user_db_id': session.get('user_db_id')
+    }
+
+def _submit_analysis(analysis_queue, params):
+    """
+    Enfileira a análise; pedidos iguais (mesmo usuário, anúncio, datas e hóspedes) em andamento viram um único job.
+    Execuções do monitoramento têm chave própria, para não se juntarem a uma análise manual e perderem o fingerprint
+    """
+    job_key = json.dumps([params['user_db_id'], params['listing_url'], params['checkin'], params['checkout'],
+                          params['adults'], params['beachfront']] + (['monitor'] if params.get('auto_generated') else []))
+    return analysis_queue.submit(params, job_key)
+
+@app.route('/api/run_analysis', methods=['POST'])
+def api_run_analysis():
+    """
+    API para executar análise sob demanda
+    A análise entra na fila de análises e a resposta traz o id do job na hora;
+    o andamento fica em /api/analysis_jobs/<job_id> (polling) ou .../events (SSE)
+    """
+    try:
+        params = _analysis_params(request.get_json() or {})
+        if not params['listing_url']:
+            return jsonify({
+                'success': False,
+                'error': 'Link do anúncio é obrigatório',
+                'message': 'Por favor, informe o link do anúncio do Airbnb para análise'
+            }), 400
         
-        # Atualizar dados globais (fallback)
-        latest_analysis = result
-        analysis_history.append(result)
+        period_type = params['period_type']
+        analysis_queue = get_analysis_queue(execute_analysis_job)
+        if analysis_queue is None:
+            # Sem fila disponível: executa na própria requisição
+            result = execute_analysis_job(params, lambda *args, **kwargs: None)
+            return jsonify({
+                'success': True,
+                'data': result,
+                'message': f'Análise executada com sucesso para {"final de semana" if period_type == "weekend" else "dias de semana"}'
+            })
         
-        # Manter apenas últimas 50 análises em memória
-        if len(analysis_history) > 50:
-            analysis_history.pop(0)
+        job = _submit_analysis(analysis_queue, params)
         
         return jsonify({
             'success': True,
-            'data': result,
-            'message': f'Análise executada com sucesso para {"final de semana" if period_type == "weekend" else "dias de semana"}'
-        })
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'coalesced': job['coalesced'],
+            'status_url': url_for('api_analysis_job', job_id=job['job_id']),
+            'events_url': url_for('api_analysis_job_events', job_id=job['job_id']),
+            'message': 'Análise enfileirada'
+        }), 202
         
     except Exception as e:
         return jsonify({
@@ -1486,75 +1666,166 @@ def api_run_analysis():
             'message': 'Erro ao executar análise'
         }), 500
 
-@app.route('/api/start_monitoring', methods=['POST'])
-def api_start_monitoring():
-    """API para iniciar monitoramento automático"""
-    global monitoring_active, monitoring_thread
+def _analysis_job_response(job):
+    """Corpo de resposta de um job (mesmo formato do antigo /api/run_analysis quando concluído)"""
+    response = {
+        'success': job['status'] != FAILED,
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'events': job['events']
+    }
+    if job['status'] == DONE:
+        period_type = job['params'].get('period_type')
+        response['data'] = job['result']
+        if job['params'].get('mode') == 'multi':
+            response['message'] = f"Análise de {len(job['params']['periods'])} períodos executada com sucesso"
+        else:
+            response['message'] = f'Análise executada com sucesso para {"final de semana" if period_type == "weekend" else "dias de semana"}'
+    elif job['status'] == FAILED:
+        response['error'] = job['error']
+        response['message'] = 'Erro ao executar análise'
+    return response
+
+@app.route('/api/analysis_jobs/<job_id>', methods=['GET'])
+def api_analysis_job(job_id):
+    """Estado de um job de análise (polling)"""
+    analysis_queue = get_analysis_queue(execute_analysis_job)
+    job = analysis_queue.get(job_id) if analysis_queue else None
+    if not job:
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    return jsonify(_analysis_job_response(job))
+
+@app.route('/api/analysis_jobs/<job_id>/events', methods=['GET'])
+def api_analysis_job_events(job_id):
+    """Andamento de um job de análise via Server-Sent Events"""
+    analysis_queue = get_analysis_queue(execute_analysis_job)
+    if not analysis_queue or not analysis_queue.get(job_id):
+        return jsonify({'success': False, 'error': 'Job não encontrado'}), 404
+    return _job_event_stream(analysis_queue, job_id)
+
+def _job_event_stream(analysis_queue, job_id):
+    """
+    Resposta SSE com os eventos de um job: um evento tipado por etapa
+    (event: listing_extracted, search_completed, weather_fetched, pricing_computed...),
+    numerados para o EventSource retomar de onde parou (Last-Event-ID), e no fim
+    um evento done ou failed com o mesmo corpo de /api/analysis_jobs/<job_id>
+    """
+    try:
+        sent = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        sent = 0
     
-    if monitoring_active:
-        return jsonify({
-            'success': False,
-            'message': 'Monitoramento já está ativo'
-        })
+    def stream():
+        nonlocal sent
+        # Primeiro byte na hora: estado atual do job e o id dele
+        job = analysis_queue.get(job_id)
+        yield "retry: 3000\n"
+        yield f"event: status\ndata: {json.dumps({'job_id': job_id, 'status': job['status']})}\n\n"
+        last_write = time.time()
+        while True:
+            job = analysis_queue.get(job_id)
+            for index, event in enumerate(job['events'][sent:], start=sent + 1):
+                yield f"id: {index}\nevent: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+                last_write = time.time()
+            sent = len(job['events'])
+            if job['status'] in FINISHED_STATUSES:
+                yield f"event: {job['status']}\ndata: {json.dumps(_analysis_job_response(job), default=str)}\n\n"
+                return
+            if time.time() - last_write > 15:
+                # Comentário para manter a conexão aberta em proxies
+                yield ": keep-alive\n\n"
+                last_write = time.time()
+            analysis_queue.wait_for_change(1.0)
     
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def run_monitoring_job(job):
+    """
+    Executa um job do agendador de monitoramento: análise do próximo final de
+    semana do anúncio, enviada para a fila de análises
+    Se as entradas do anúncio (dados extraídos, previsão, favoritos, período)
+    não mudaram desde a última análise, só registra um heartbeat
+    """
+    period = next_weekend()
+    with get_scraper_pool().acquire() as scraper:
+        scraper.favorite_competitors = favorite_competitors
+        fingerprint = scraper.get_listing_fingerprint(
+            job['listing_url'], period['checkin'], period['checkout'], job['adults'], job['beachfront']
+        )
+    scheduler = get_monitoring_scheduler(run_monitoring_job)
+    if scheduler and not scheduler.has_changed(job, fingerprint):
+        return 'unchanged'
+    
+    params = {
+        'checkin': period['checkin'],
+        'checkout': period['checkout'],
+        'adults': job['adults'],
+        'beachfront': job['beachfront'],
+        'period_type': 'weekend',
+        'listing_url': job['listing_url'],
+        'municipio_id': None,
+        'user_db_id': job['user_id'],
+        'auto_generated': True,
+        'fingerprint': fingerprint
+    }
+    print(f"🤖 Análise automática - {job['listing_url']} ({period['checkin']} a {period['checkout']})")
+    
+    analysis_queue = get_analysis_queue(execute_analysis_job)
+    if analysis_queue is None:
+        execute_analysis_job(params, lambda *args, **kwargs: None)
+        return 'ok'
+    
+    submitted = _submit_analysis(analysis_queue, params)
+    return f"queued:{submitted['job_id']}"
+
+def is_monitoring_active():
+    """Há algum anúncio com monitoramento automático ativo"""
+    scheduler = get_monitoring_scheduler(run_monitoring_job)
+    return bool(scheduler and scheduler.has_active_jobs())
+
+@app.route('/api/start_monitoring', methods=['POST'])
+def api_start_monitoring():
+    """
+    API para iniciar monitoramento automático de um anúncio
+    O job fica salvo no agendador (sobrevive a reinícios) e roda a cada cadence_hours
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         beachfront = data.get('beachfront', True)
+        adults = data.get('adults', 2)
+        cadence_hours = float(data.get('cadence_hours', 12))  # 2x ao dia
+        listing_url = (data.get('listing_url') or '').strip()
         
-        def monitor_loop():
-            global monitoring_active, latest_analysis, analysis_history
-            
-            scraper = AirbnbClimateScraper()
-            
-            while monitoring_active:
-                try:
-                    # Calcular próximo final de semana
-                    today = datetime.now()
-                    days_until_friday = (4 - today.weekday()) % 7
-                    if days_until_friday == 0 and today.weekday() >= 4:
-                        days_until_friday = 7
-                    
-                    next_friday = today + timedelta(days=days_until_friday)
-                    next_sunday = next_friday + timedelta(days=2)
-                    
-                    checkin = next_friday.strftime('%Y-%m-%d')
-                    checkout = next_sunday.strftime('%Y-%m-%d')
-                    
-                    # Executar análise
-                    result = scraper.run_competitive_analysis(checkin, checkout, beachfront)
-                    
-                    # Adicionar timestamp
-                    result['timestamp'] = datetime.now().isoformat()
-                    result['checkin'] = checkin
-                    result['checkout'] = checkout
-                    result['beachfront'] = beachfront
-                    result['auto_generated'] = True
-                    
-                    # Atualizar dados
-                    latest_analysis = result
-                    analysis_history.append(result)
-                    
-                    if len(analysis_history) > 50:
-                        analysis_history.pop(0)
-                    
-                    print(f"✅ Análise automática executada: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-                    
-                except Exception as e:
-                    print(f"❌ Erro na análise automática: {e}")
-                
-                # Aguardar 12 horas (2x ao dia)
-                for _ in range(720):  # 720 minutos = 12 horas
-                    if not monitoring_active:
-                        break
-                    time.sleep(60)  # 1 minuto
+        # Sem link informado, monitorar o anúncio da última análise
+        if not listing_url and latest_analysis:
+            listing_url = latest_analysis.get('listing_url') or ''
+        
+        if not listing_url:
+            return jsonify({
+                'success': False,
+                'message': 'Informe o link do anúncio ou execute uma análise antes de iniciar o monitoramento'
+            }), 400
         
-        monitoring_active = True
-        monitoring_thread = threading.Thread(target=monitor_loop, daemon=True)
-        monitoring_thread.start()
+        scheduler = get_monitoring_scheduler(run_monitoring_job)
+        if scheduler is None:
+            return jsonify({
+                'success': False,
+                'message': 'Agendador de monitoramento indisponível'
+            }), 503
+        
+        job = scheduler.upsert_job(
+            listing_url,
+            cadence_seconds=int(cadence_hours * 3600),
+            beachfront=beachfront,
+            adults=adults,
+            user_id=session.get('user_db_id')
+        )
         
         return jsonify({
             'success': True,
-            'message': 'Monitoramento automático iniciado'
+            'message': 'Monitoramento automático iniciado',
+            'job': job
         })
         
     except Exception as e:
@@ -1566,14 +1837,29 @@ def api_start_monitoring():
 
 @app.route('/api/stop_monitoring', methods=['POST'])
 def api_stop_monitoring():
-    """API para parar monitoramento automático"""
-    global monitoring_active
+    """API para parar monitoramento automático (de um anúncio ou de todos)"""
+    data = request.get_json(silent=True) or {}
+    listing_url = (data.get('listing_url') or '').strip() or None
     
-    monitoring_active = False
+    scheduler = get_monitoring_scheduler(run_monitoring_job)
+    stopped = scheduler.disable_job(listing_url) if scheduler else 0
     
     return jsonify({
         'success': True,
-        'message': 'Monitoramento automático parado'
+        'message': 'Monitoramento automático parado',
+        'stopped': stopped
+    })
+
+@app.route('/api/monitoring_jobs', methods=['GET'])
+def api_monitoring_jobs():
+    """Jobs de monitoramento cadastrados e estado do agendador"""
+    scheduler = get_monitoring_scheduler(run_monitoring_job)
+    if scheduler is None:
+        return jsonify({'success': False, 'error': 'Agendador de monitoramento indisponível'}), 503
+    return jsonify({
+        'success': True,
+        'jobs': scheduler.list_jobs(),
+        'scheduler': scheduler.stats()
     })
 
 @app.route('/api/get_latest', methods=['GET'])
@@ -1587,7 +1873,7 @@ def api_get_latest():
                 return jsonify({
                     'success': True,
                     'data': latest_db,
-                    'monitoring_active': monitoring_active
+                    'monitoring_active': is_monitoring_active()
                 })
         except Exception as e:
             print(f"Erro ao buscar última análise do banco: {e}")
@@ -1596,7 +1882,7 @@ def api_get_latest():
     return jsonify({
         'success': True,
         'data': latest_analysis,
-        'monitoring_active': monitoring_active
+        'monitoring_active': is_monitoring_active()
     })
 
 @app.route('/api/get_history', methods=['GET'])
@@ -1628,83 +1914,22 @@ def api_get_calendar_data():
     try:
         month = request.args.get('month', type=int)
         year = request.args.get('year', type=int)
+        listing_url = (request.args.get('listing_url') or '').strip() or None
         
         if not month or not year:
             return jsonify({'success': False, 'error': 'Mês e ano são obrigatórios'})
         
-        # Gerar dados para todos os dias do mês
-        from calendar import monthrange
-        _, days_in_month = monthrange(year, month)
-        
-        calendar_data = []
-        
-        for day in range(1, days_in_month + 1):
-            date_obj = datetime(year, month, day)
-            check_in = date_obj.strftime('%Y-%m-%d')
-            check_out = (date_obj + timedelta(days=1)).strftime('%Y-%m-%d')
-            
-            try:
-                # Usar o scraper para obter dados reais
-                scraper = AirbnbClimateScraper()
-                analysis_result = scraper.run_competitive_analysis(
-                    check_in, check_out, 2
-                )
-                
-                if analysis_result and 'pricing_suggestion' in analysis_result:
-                    pricing = analysis_result['pricing_suggestion']
-                    price = pricing.get('suggested_price', 200)
-                    rain_probability = analysis_result.get('rain_probability', 0)
-                    discount = pricing.get('discount_percentage', 0)
-                else:
-                    # Fallback para dados simulados
-                    base_price = 200
-                    day_of_week = date_obj.weekday()
-                    is_weekend = day_of_week >= 5
-                    
-                    price = base_price + (50 if is_weekend else 0)
-                    price += (day % 10) * 10  # Variação baseada no dia
-                    rain_probability = (day * 7) % 100
-                    discount = 5 + (day % 8)
-                
-            except Exception as e:
-                print(f"Erro ao obter dados para {check_in}: {e}")
-                # Dados simulados em caso de erro
-                base_price = 200
-                day_of_week = date_obj.weekday()
-                is_weekend = day_of_week >= 5
-                
-                price = base_price + (50 if is_weekend else 0)
-                price += (day % 10) * 10
-                rain_probability = (day * 7) % 100
-                discount = 5 + (day % 8)
-            
-            # Determinar ícone do clima
-            if rain_probability <= 30:
-                weather_icon = 'fas fa-sun'
-                weather_class = 'sun-icon'
-            elif rain_probability <= 60:
-                weather_icon = 'fas fa-cloud-sun'
-                weather_class = 'cloud-icon'
-            else:
-                weather_icon = 'fas fa-cloud-rain'
-                weather_class = 'rain-icon'
-            
-            calendar_data.append({
-                'day': day,
-                'date': check_in,
-                'price': int(price),
-                'rain_probability': rain_probability,
-                'discount': discount,
-                'weather_icon': weather_icon,
-                'weather_class': weather_class,
-                'is_weekend': date_obj.weekday() >= 5
-            })
+        # Um único snapshot da concorrência e uma única previsão por mês (resultado em cache)
+        snapshot = None if listing_url else latest_analysis
+        result = get_calendar_pricing_service().get_month(year, month, snapshot=snapshot, listing_url=listing_url)
         
         return jsonify({
             'success': True,
-            'data': calendar_data,
+            'data': result['data'],
             'month': month,
-            'year': year
+            'year': year,
+            'source': result['source'],
+            'cached': result['cached']
         })
         
     except Exception as e:
@@ -1746,16 +1971,14 @@ def api_similarity_analysis():
         print(f"📅 Período: {checkin_date} a {checkout_date}")
         print(f"🏠 Anúncio de referência: {reference_listing['title'][:50]}...")
         
-        # Criar instância do scraper
-        scraper = AirbnbClimateScraper()
-        
         # Executar análise competitiva com similaridade
-        competitive_result = scraper.get_competitive_analysis(
-            checkin_date=checkin_date,
-            checkout_date=checkout_date,
-            adults=adults,
-            reference_listing=reference_listing
-        )
+        with _request_scraper() as scraper:
+            competitive_result = scraper.get_competitive_analysis(
+                checkin_date=checkin_date,
+                checkout_date=checkout_date,
+                adults=adults,
+                reference_listing=reference_listing
+            )
         
         # Processar resultados
         if isinstance(competitive_result, dict) and 'listings' in competitive_result:
@@ -1821,6 +2044,9 @@ def api_similarity_analysis():
         
         return jsonify(response_data)
         
+    except TimeoutError as e:
+        print(f"⚠️ {e}")
+        return jsonify({'success': False, 'error': SCRAPER_BUSY_MESSAGE}), 503
     except Exception as e:
         print(f"❌ Erro na análise de similaridade: {str(e)}")
         return jsonify({
@@ -1999,18 +2225,11 @@ def api_update_data():
             })
         
         # Executar nova análise com dados atualizados da internet
-        scraper = AirbnbClimateScraper()
-        
-        # Passar favoritos para o scraper
-        scraper.favorite_competitors = favorite_competitors
-        
-        try:
+        with _request_scraper() as scraper:
+            # Passar favoritos para o scraper (removidos ao devolver ao pool)
+            scraper.favorite_competitors = favorite_competitors
             print(f"🌐 Buscando dados atualizados para {checkin} - {checkout}")
             result = scraper.run_competitive_analysis(checkin, checkout, beachfront, adults, listing_url)
-        finally:
-            # Limpar favoritos do scraper
-            if hasattr(scraper, 'favorite_competitors'):
-                delattr(scraper, 'favorite_competitors')
         
         # Adicionar informações do período
         result['timestamp'] = datetime.now().isoformat()
@@ -2085,6 +2304,9 @@ def api_update_data():
             }
         })
         
+    except TimeoutError as e:
+        print(f"⚠️ {e}")
+        return jsonify({'success': False, 'error': SCRAPER_BUSY_MESSAGE}), 503
     except Exception as e:
         print(f"❌ Erro ao atualizar dados: {e}")
         return jsonify({
@@ -2105,6 +2327,14 @@ def health_check():
                 'status': 'healthy',
                 'timestamp': datetime.now().isoformat(),
                 'database': 'connected',
+                'catalog_cache': db.catalog_cache.stats(),
+                'scraper_patterns': get_pattern_stats(),
+                'http_cache': get_response_cache().stats() if get_response_cache() else None,
+                'weather_store': get_weather_store().stats() if get_weather_store() else None,
+                'scraper_pool': get_scraper_pool().stats(),
+                'analysis_jobs': get_analysis_queue().stats() if get_analysis_queue() else None,
+                'monitoring': get_monitoring_scheduler().stats() if get_monitoring_scheduler() else None,
+                'mail_queue': get_mail_queue().stats() if get_mail_queue() else None,
                 'version': '1.0.0'
             }), 200
         else:
@@ -2644,14 +2874,26 @@ def get_listings_by_period():
         all_listings = db.get_all_public_listings()
         print(f"📋 [FILTRO] Total de anúncios encontrados: {len(all_listings)}")
         
-        # Para cada anúncio, verificar disponibilidade no período
+        # Calcular disponibilidade de todos os anúncios de uma vez (reservas e bloqueios em massa)
+        availability_summary = db.get_listings_availability_summary(
+            [listing['id'] for listing in all_listings], data_inicio, data_fim
+        )
+        
         listings_with_availability = []
         available_count = 0
         
         for listing in all_listings:
-            # Verificar se está disponível no período
-            is_available = db.check_availability(listing['id'], data_inicio, data_fim)
+            summary = availability_summary.get(listing['id'])
+            if summary is None:
+                # Fallback para a consulta individual se o cálculo em massa falhar
+                is_available = db.check_availability(listing['id'], data_inicio, data_fim)
+                summary = {
+                    'available': is_available,
+                    'available_period': db.get_available_period(listing['id'], data_inicio),
+                    'next_available_date': None if is_available else db.get_next_available_date(listing['id'], data_inicio)
+                }
             
+            is_available = summary['available']
             if is_available:
                 available_count += 1
             
@@ -2660,15 +2902,13 @@ def get_listings_by_period():
             listing_data = dict(listing)
             listing_data['available'] = is_available
             
-            # Buscar período de disponibilidade contínua sempre
-            available_period = db.get_available_period(listing['id'], data_inicio)
-            if available_period:
-                listing_data['available_period'] = available_period
+            # Período de disponibilidade contínua sempre
+            if summary['available_period']:
+                listing_data['available_period'] = summary['available_period']
             
-            # Se não disponível, buscar próxima data disponível
+            # Se não disponível, informar próxima data disponível
             if not is_available:
-                next_available = db.get_next_available_date(listing['id'], data_inicio)
-                listing_data['next_available_date'] = next_available
+                listing_data['next_available_date'] = summary['next_available_date']
             
             listings_with_availability.append(listing_data)
         
@@ -2721,30 +2961,25 @@ def get_listing_availability(listing_id):
                 'message': 'Mês/ano fora do intervalo permitido'
             }), 400
         
-        # Calcular primeiro e último dia do mês
-        first_day = datetime(year, month, 1).date()
-        if month == 12:
-            last_day = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-        else:
-            last_day = datetime(year, month + 1, 1).date() - timedelta(days=1)
+        # Mês inteiro de uma vez; com prefetch=1 inclui também os meses vizinhos
+        prefetch = request.args.get('prefetch', '0') in ('1', 'true')
+        month_prefix = f"{year:04d}-{month:02d}"
         
-        availability = {}
-        current_date = first_day
-        
-        while current_date <= last_day:
-            date_str = current_date.strftime('%Y-%m-%d')
-            # Verificar disponibilidade para cada dia
-            is_available = db.check_availability(listing_id, date_str, date_str)
-            availability[date_str] = is_available
-            current_date += timedelta(days=1)
+        days = db.get_month_availability_map(listing_id, year, month, prefetch_adjacent=prefetch)
+        availability = {d: v for d, v in days.items() if d.startswith(month_prefix)}
+        adjacent_availability = {d: v for d, v in days.items() if not d.startswith(month_prefix)}
         
         print(f"📅 [CALENDARIO] Disponibilidade calculada para {len(availability)} dias do mês {month}/{year}")
         
-        return jsonify({
+        response = {
             'success': True,
             'availability': availability,
             'listing_id': listing_id
-        })
+        }
+        if prefetch:
+            response['adjacent_availability'] = adjacent_availability
+        
+        return jsonify(response)
         
     except Exception as e:
         print(f"❌ [CALENDARIO] Erro ao buscar disponibilidade: {e}")
@@ -3099,12 +3334,17 @@ def create_authenticated_booking():
 
 @app.route('/api/monitor')
 def api_monitor():
-    """Endpoint para monitoramento automático"""
+    """
+    Endpoint para monitoramento automático (para cron externo)
+    Executa os jobs vencidos do agendador, se este processo for o líder
+    """
     try:
-        # Executar análise automática se configurado
-        # (implementar lógica de monitoramento aqui)
+        scheduler = get_monitoring_scheduler(run_monitoring_job)
+        executed = scheduler.run_due_jobs() if scheduler else 0
         return jsonify({
             'status': 'monitoring_executed',
+            'executed_jobs': executed,
+            'leader': scheduler.stats()['leader'] if scheduler else False,
             'timestamp': datetime.now().isoformat()
         }), 200
     except Exception as e:
@@ -3479,6 +3719,12 @@ def dynamic_pricing_page():
     """Página de gerenciamento de preços dinâmicos"""
     return render_template('dynamic_pricing.html')
 
+# Agendador do monitoramento automático (só o processo líder executa os jobs)
+if os.getenv('MONITORING_SCHEDULER_ENABLED', '1') == '1':
+    monitoring_scheduler = get_monitoring_scheduler(run_monitoring_job)
+    if monitoring_scheduler:
+        monitoring_scheduler.start()
+
 if __name__ == '__main__':
     print("🌐 Iniciando aplicação web...")
     print("📊 Acesse: http://localhost:5000")